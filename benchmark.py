@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Benchmarks de Desempenho
+Mede os caminhos críticos do sistema com dados sintéticos
+
+Uso:
+    python benchmark.py xlsx --rows 200000
+    python benchmark.py gallery --users 5000
+    python benchmark.py descriptors --identities 200
+    python benchmark.py engines
+    python benchmark.py ann --gallery 100000
+    python benchmark.py motion
+    python benchmark.py tiles
+    python benchmark.py buffers
+    python benchmark.py startup --startup-budget 1.0
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def measure(func, *args, trace_memory=False, **kwargs):
+    """Executa func e retorna (resultado, segundos, pico de memória em MB)"""
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    peak_mb = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = peak / (1024 * 1024)
+    return result, elapsed, peak_mb
+
+
+def print_result(label, elapsed, peak_mb=None, extra=""):
+    """Imprime uma linha de resultado padronizada"""
+    memory = f" | pico {peak_mb:8.1f} MB" if peak_mb is not None else ""
+    print(f"  {label:<28} {elapsed * 1000:10.1f} ms{memory}{extra}")
+
+
+def make_attendance_dataframe(rows, users=200):
+    """Cria registros de presença sintéticos no formato usado nos relatórios"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(42)
+    start = pd.Timestamp("2025-01-01 07:00:00")
+    offsets = np.sort(rng.integers(0, 365 * 24 * 3600, size=rows))
+    timestamps = start + pd.to_timedelta(offsets, unit="s")
+    user_ids = rng.integers(1, users + 1, size=rows).astype(str)
+
+    return pd.DataFrame({
+        'Timestamp': timestamps,
+        'Data': timestamps.normalize(),
+        'Hora': timestamps.strftime('%H:%M:%S'),
+        'Nome': np.char.add("Usuário ", user_ids),
+        'ID_Usuario': user_ids,
+        'Tipo': np.where(np.arange(rows) % 2 == 0, 'ENTRADA', 'SAÍDA'),
+    })
+
+
+def bench_xlsx(args):
+    """Compara a exportação XLSX padrão (to_excel) com a escrita contínua"""
+    from report_generator import ReportGenerator
+
+    print(f"📊 Exportação XLSX - {args.rows} registros")
+    data = make_attendance_dataframe(args.rows)
+    generator = ReportGenerator()
+    start_date = data['Data'].min().date()
+    end_date = data['Data'].max().date()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for label, streaming in (("openpyxl to_excel", False), ("write-only (streaming)", True)):
+            path = os.path.join(tmp_dir, f"bench_{int(streaming)}.xlsx")
+            _, elapsed, peak_mb = measure(generator.generate_xlsx_report, data, path,
+                                          start_date, end_date, "benchmark",
+                                          streaming=streaming, trace_memory=args.memory)
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            print_result(label, elapsed, peak_mb, f" | arquivo {size_mb:6.1f} MB")
+
+
+def bench_gallery(args):
+    """Compara a busca de metadados da galeria e mede o load_known_faces completo
+
+    A carga completa usa uma pasta faces/ sintética (uma imagem por usuário)
+    com o cache de templates já preenchido, como numa inicialização comum.
+    """
+    import json
+    import numpy as np
+    import cv2
+
+    print(f"👥 Metadados da galeria - {args.users} usuários")
+    users = {
+        str(i): {
+            'id': str(i),
+            'name': f"Usuário {i}",
+            'registered_date': "2025-01-01T08:00:00",
+            'active': True,
+            'last_seen': None,
+            'total_entries': 0,
+            'total_exits': 0
+        }
+        for i in range(args.users)
+    }
+
+    def legacy_lookup(user_ids):
+        # Comportamento anterior: um json.load de users.json por imagem
+        for user_id in user_ids:
+            with open("users.json", 'r', encoding='utf-8') as f:
+                json.load(f).get(user_id)
+
+    def roster_lookup(detector, user_ids):
+        roster = detector.get_user_roster()
+        for user_id in user_ids:
+            roster.get(user_id)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            os.mkdir("faces")
+            with open("users.json", 'w', encoding='utf-8') as f:
+                json.dump(users, f, indent=4, ensure_ascii=False)
+
+            from face_detector import FaceDetector
+            detector = FaceDetector()
+            user_ids = list(users)
+
+            _, elapsed, _ = measure(legacy_lookup, user_ids)
+            print_result("releitura por imagem", elapsed)
+            _, elapsed, _ = measure(roster_lookup, detector, user_ids)
+            print_result("cadastro em memória", elapsed)
+
+            # Pasta faces/<id>/ sintética com o cache de templates preenchido
+            from template_cache import TemplateCache
+            rng = np.random.default_rng(3)
+            cache = TemplateCache(detector.faces_dir, detector.descriptor.key)
+            dim = detector.descriptor.dim
+            for user_id in user_ids:
+                user_dir = detector.faces_dir / user_id
+                user_dir.mkdir()
+                image_file = user_dir / "amostra.png"
+                cv2.imwrite(str(image_file), rng.integers(0, 256, (32, 32), dtype=np.uint8))
+                cache.put(image_file, rng.random(dim, dtype=np.float32))
+            cache.save()
+
+            _, elapsed, peak_mb = measure(detector.load_known_faces, verbose=False,
+                                          trace_memory=args.memory)
+            print_result("galeria c/ cache (load)", elapsed, peak_mb,
+                         f" | {len(detector.gallery)} rostos")
+        finally:
+            os.chdir(cwd)
+
+
+def make_synthetic_faces(identities, probes_per_identity=3, size=140, seed=7):
+    """Cria rostos sintéticos: uma imagem base por identidade e capturas variadas
+
+    Cada identidade é uma textura suavizada em várias escalas; as capturas
+    aplicam deslocamento, brilho/contraste, desfoque e ruído diferentes.
+    Retorna (galeria, sondas, rótulos das sondas) em escala de cinza.
+    """
+    import numpy as np
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    margin = 8
+    inner = size - 2 * margin
+
+    def capture(base):
+        dy, dx = rng.integers(-4, 5, size=2)
+        crop = base[margin + dy:margin + dy + inner, margin + dx:margin + dx + inner].astype(np.float32)
+        crop = crop * rng.uniform(0.8, 1.2) + rng.uniform(-25, 25)
+        crop = cv2.GaussianBlur(crop, (0, 0), rng.uniform(0.3, 1.2))
+        crop += rng.normal(0, 6, crop.shape)
+        return np.clip(crop, 0, 255).astype(np.uint8)
+
+    gallery, probes, labels = [], [], []
+    for identity in range(identities):
+        base = np.zeros((size, size), dtype=np.float32)
+        for sigma, weight in ((2, 0.5), (6, 1.0), (14, 1.5)):
+            noise = rng.normal(0, 1, (size, size)).astype(np.float32)
+            base += weight * cv2.GaussianBlur(noise, (0, 0), sigma)
+        base = cv2.normalize(base, None, 30, 225, cv2.NORM_MINMAX)
+        gallery.append(capture(base))
+        for _ in range(probes_per_identity):
+            probes.append(capture(base))
+            labels.append(identity)
+    return gallery, probes, np.array(labels)
+
+
+def bench_descriptors(args):
+    """Compara velocidade e acerto dos descritores faciais disponíveis"""
+    import numpy as np
+    from sklearn.metrics.pairwise import cosine_similarity
+    from face_descriptors import DESCRIPTORS
+
+    print(f"🧬 Descritores faciais - {args.identities} identidades sintéticas")
+    gallery, probes, labels = make_synthetic_faces(args.identities)
+    side = gallery[0].shape[0]
+    box = np.array([[0, 0, side, side]])
+
+    # Quadro com 10 faces lado a lado (cenário de catraca cheia)
+    frame = np.hstack(probes[:10])
+    frame_boxes = np.array([[i * side, 0, side, side] for i in range(10)])
+
+    for name, descriptor_class in DESCRIPTORS.items():
+        descriptor = descriptor_class()
+        known = np.vstack([descriptor.extract_batch(face, box) for face in gallery])
+        queries = np.vstack([descriptor.extract_batch(face, box) for face in probes])
+
+        repeats = 50
+        _, elapsed, _ = measure(lambda: [descriptor.extract_batch(frame, frame_boxes)
+                                         for _ in range(repeats)])
+        per_face_ms = 1000 * elapsed / (repeats * len(frame_boxes))
+
+        similarities = cosine_similarity(queries, known)
+        best = similarities.argmax(axis=1)
+        best_similarity = similarities[np.arange(len(queries)), best]
+        genuine = similarities[np.arange(len(queries)), labels]
+        impostor_mask = np.ones_like(similarities, dtype=bool)
+        impostor_mask[np.arange(len(queries)), labels] = False
+        impostor = similarities[impostor_mask]
+
+        threshold = descriptor.default_threshold
+        rank1 = np.mean(best == labels)
+        accepted = best_similarity > threshold
+        false_accepts = np.mean(accepted & (best != labels))
+
+        print(f"  {name:<12} dim {descriptor.dim:5d} | {per_face_ms:6.3f} ms/face | "
+              f"rank-1 {rank1:6.1%} | aceitos corretos (> {threshold:.2f}) "
+              f"{np.mean(accepted & (best == labels)):6.1%} | falsos aceitos {false_accepts:6.1%}")
+        print(f"  {'':<12} similaridade genuína {genuine.mean():.3f} ± {genuine.std():.3f} | "
+              f"impostora {impostor.mean():.3f} ± {impostor.std():.3f}")
+
+
+def bench_engines(args):
+    """Compara os motores de detecção/embedding (lite x dnn) em várias resoluções"""
+    import glob
+    import json
+    from pathlib import Path
+    import numpy as np
+    import cv2
+    from face_descriptors import create_descriptor
+    from face_engines import create_dnn_engine
+
+    print("⚙️ Motores de reconhecimento")
+    # Mesmos arquivos que FaceDetector.list_gallery_images: faces/<id>.jpg e
+    # faces/<id>/*.jpg, ignorando diretórios ocultos (ex.: .templates)
+    paths = [path for path in sorted(glob.glob("faces/**/*", recursive=True))
+             if os.path.splitext(path)[1].lower() in ('.jpg', '.jpeg', '.png', '.bmp')
+             and not any(part.startswith('.') for part in Path(path).parts)]
+    images = [cv2.imread(path) for path in paths[:10]]
+    images = [image for image in images if image is not None]
+    if not images:
+        print("  ⚠️ Nenhuma imagem em faces/ - usando quadro sintético (sem faces)")
+        images = [np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)]
+
+    try:
+        with open('config.json', 'r', encoding='utf-8') as f:
+            dnn_settings = json.load(f).get('dnn_settings', {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        dnn_settings = {}
+
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    engines = [("lite", lambda gray, frame: cascade.detectMultiScale(gray, 1.1, 4),
+                create_descriptor("histogram"))]
+    dnn_detector, dnn_embedder = create_dnn_engine(dnn_settings)
+    if dnn_detector is not None or dnn_embedder is not None:
+        detect = dnn_detector.detect if dnn_detector is not None else engines[0][1]
+        engines.append(("dnn", detect, dnn_embedder or engines[0][2]))
+
+    repeats = 5
+    for width, height in ((640, 480), (1280, 720), (1920, 1080)):
+        frames = [cv2.resize(image, (width, height)) for image in images]
+        grays = [cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
+        for name, detect, descriptor in engines:
+            def run_detection():
+                return [detect(gray, frame) for gray, frame in zip(grays, frames)]
+
+            boxes, elapsed, _ = measure(lambda: [run_detection() for _ in range(repeats)])
+            boxes = boxes[0]
+            found = sum(len(frame_boxes) for frame_boxes in boxes)
+            per_frame_ms = 1000 * elapsed / (repeats * len(frames))
+
+            _, embed_elapsed, _ = measure(lambda: [descriptor.extract_batch(gray, frame_boxes, frame)
+                                                   for gray, frame, frame_boxes in zip(grays, frames, boxes)])
+            per_face_ms = 1000 * embed_elapsed / found if found else 0.0
+            print(f"  {name:<5} {width}x{height:<5} detecção {per_frame_ms:8.1f} ms/quadro | "
+                  f"{found:3d} faces em {len(frames)} quadros | "
+                  f"{descriptor.key} {per_face_ms:6.2f} ms/face")
+
+    if dnn_detector is not None and len(images) > 1:
+        frames = [cv2.resize(image, (640, 480)) for image in images]
+        _, sequential, _ = measure(lambda: [dnn_detector.detect(None, frame) for frame in frames])
+        _, batched, _ = measure(dnn_detector.detect_batch, frames)
+        print_result(f"dnn sequencial ({len(frames)} quadros)", sequential)
+        print_result(f"dnn em lote ({len(frames)} quadros)", batched)
+
+
+def bench_ann(args):
+    """Compara a busca exata na galeria com o índice IVF em vários nprobe"""
+    import numpy as np
+    from sklearn.metrics.pairwise import cosine_similarity
+    from gallery_index import IVFIndex
+
+    dim = 256
+    print(f"🔎 Índice da galeria - {args.gallery} templates de {dim} dimensões")
+    rng = np.random.default_rng(3)
+
+    # Templates agrupados (pessoas parecidas) + consultas ruidosas de templates existentes
+    centers = rng.normal(0, 1, (max(1, args.gallery // 100), dim)).astype(np.float32)
+    gallery = centers[rng.integers(0, len(centers), args.gallery)]
+    gallery += rng.normal(0, 1.0, gallery.shape).astype(np.float32)
+    queries = gallery[rng.integers(0, args.gallery, 200)]
+    queries = queries + rng.normal(0, 0.8, queries.shape).astype(np.float32)
+
+    # Uma consulta por vez, como em um quadro com poucas faces
+    exact, elapsed, _ = measure(lambda: np.array([cosine_similarity(query[None], gallery).argmax()
+                                                  for query in queries]))
+    print_result("busca exata (por face)", elapsed / len(queries))
+
+    index = IVFIndex()
+    _, elapsed, _ = measure(index.train, gallery)
+    print_result(f"treino ({len(index.centroids)} listas)", elapsed)
+    _, elapsed, _ = measure(index.build, gallery)
+    print_result("atribuição das listas", elapsed)
+
+    for nprobe in (1, 4, 8, 16, 32):
+        (rows, _), elapsed, _ = measure(index.search, queries, nprobe)
+        recall = np.mean(rows == exact)
+        print_result(f"IVF nprobe={nprobe} (por face)", elapsed / len(queries),
+                     extra=f" | revocação@1 {recall:6.1%}")
+
+
+def bench_motion(args):
+    """Mede o gate de movimento em uma cena vazia, com pessoas e vazia de novo"""
+    import numpy as np
+    import cv2
+    from frame_sources import SyntheticSource
+    from motion_gate import MotionGate
+
+    print("🚦 Gate de movimento - 10 s vazio, 10 s com movimento, 10 s vazio (30 fps)")
+    rng = np.random.default_rng(5)
+    empty = SyntheticSource(faces=0, sprites=[])
+    moving = SyntheticSource(faces=3, seed=2)
+    frames = []
+    for source in (empty, moving, empty):
+        for _ in range(300):
+            _, frame = source.read()
+            # Ruído de sensor para o quadro estático não ser idêntico
+            noise = rng.normal(0, 3, frame.shape)
+            frames.append(cv2.cvtColor(np.clip(frame + noise, 0, 255).astype(np.uint8),
+                                       cv2.COLOR_BGR2GRAY))
+
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    sample = frames[::30]
+    _, detect_elapsed, _ = measure(lambda: [cascade.detectMultiScale(gray, 1.1, 4) for gray in sample])
+    detect_ms = 1000 * detect_elapsed / len(sample)
+
+    gate = MotionGate()
+    decisions, elapsed, _ = measure(lambda: [gate.should_detect(gray, now=i / 30.0)
+                                             for i, gray in enumerate(frames)])
+    decisions = np.array(decisions).reshape(3, -1)
+    stats = gate.stats()
+    print_result("gate (por quadro)", elapsed / len(frames))
+    print_result("detecção Haar (por quadro)", detect_ms / 1000)
+    for label, phase in zip(("vazio", "movimento", "vazio de novo"), decisions):
+        print(f"  {label:<28} {phase.mean():10.1%} dos quadros detectados")
+    saved = stats['skipped'] * detect_ms - 1000 * elapsed
+    print(f"  {'economia estimada':<28} {saved:10.1f} ms em {len(frames)} quadros "
+          f"({stats['skip_rate']:.0%} sem detecção)")
+
+
+def bench_tiles(args):
+    """Compara detectMultiScale em uma chamada com a detecção em blocos paralelos"""
+    import numpy as np
+    import cv2
+    from frame_sources import SyntheticSource
+    from tiled_detection import TiledCascadeDetector
+
+    cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+    cascade = cv2.CascadeClassifier(cascade_path)
+    print(f"🧩 Detecção em blocos - {os.cpu_count()} CPUs, OpenCV com {cv2.getNumThreads()} threads")
+
+    def recall(reference, boxes):
+        """Fração das faces da chamada única também encontradas pelos blocos"""
+        found = 0
+        for rx, ry, rw, rh in reference:
+            for x, y, w, h in boxes:
+                ix = max(0, min(rx + rw, x + w) - max(rx, x))
+                iy = max(0, min(ry + rh, y + h) - max(ry, y))
+                if ix * iy > 0.5 * min(rw * rh, w * h):
+                    found += 1
+                    break
+        return found / len(reference) if len(reference) else 1.0
+
+    for width, height, sprite in ((1920, 1080, 160), (3840, 2160, 240)):
+        source = SyntheticSource(width=width, height=height, faces=8, seed=4, sprite_size=sprite,
+                                 sprites="gallery")
+        grays = [cv2.cvtColor(source.read()[1], cv2.COLOR_BGR2GRAY) for _ in range(3)]
+        print(f"  {width}x{height}:")
+        reference, elapsed, _ = measure(lambda: [cascade.detectMultiScale(gray, 1.1, 4) for gray in grays])
+        print_result("chamada única", elapsed / len(grays),
+                     extra=f" | {sum(len(boxes) for boxes in reference)} faces")
+
+        for rows, cols, threads in ((2, 2, 4), (3, 3, 4), (3, 3, 8)):
+            detector = TiledCascadeDetector(cascade_path, rows, cols, overlap=sprite + 80, threads=threads)
+            detector.detect(grays[0])  # Aquecer o pool e os classificadores
+            boxes, elapsed, _ = measure(lambda: [detector.detect(gray) for gray in grays])
+            hits = np.mean([recall(ref, found) for ref, found in zip(reference, boxes)])
+            print_result(f"blocos {rows}x{cols}, {threads} threads", elapsed / len(grays),
+                         extra=f" | {sum(len(found) for found in boxes)} faces | revocação {hits:.0%}")
+            detector.shutdown()
+
+
+def bench_buffers(args):
+    """Mede alocações por quadro no caminho captura -> detecção -> preview"""
+    import numpy as np
+    import cv2
+    from frame_sources import SyntheticSource
+    from buffer_pool import BufferPool
+    from preview_renderer import PreviewFrame
+
+    frames = 120
+    base_size, canvas_size = (640, 480), (480, 360)
+    print(f"♻️ Buffers - {frames} quadros 1280x720 (tracemalloc)")
+
+    def allocating(source):
+        _, frame = source.read()
+        current = frame.copy()
+        display = frame.copy()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        resized = cv2.resize(display, base_size, interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+        canvas = cv2.resize(rgb, canvas_size, interpolation=cv2.INTER_AREA)
+        return current, gray, canvas
+
+    pool = BufferPool()
+    state = {'current': None, 'canvas': np.empty((canvas_size[1], canvas_size[0], 3), dtype=np.uint8)}
+
+    def pooled(source):
+        buffer = pool.acquire((720, 1280, 3))
+        _, frame = source.read(buffer)
+        previous, state['current'] = state['current'], frame
+        pool.release(previous)
+        display = pool.acquire_like(frame)
+        np.copyto(display, frame)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=pool.acquire(frame.shape[:2]))
+        preview = PreviewFrame(display, base_size, pool)
+        preview.for_size(canvas_size, out=state['canvas'])
+        preview.release()
+        pool.release(gray)
+        pool.release(display)
+
+    for label, step in (("alocando a cada quadro", allocating), ("com pool de buffers", pooled)):
+        source = SyntheticSource(width=1280, height=720, faces=3)
+        step(source)  # Aquecer (o pool aloca seus buffers no primeiro quadro)
+        tracemalloc.start()
+        transient = 0
+        start = time.perf_counter()
+        for _ in range(frames):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            step(source)
+            _, peak = tracemalloc.get_traced_memory()
+            transient += peak - before
+        elapsed = time.perf_counter() - start
+        tracemalloc.stop()
+        per_frame_mb = transient / frames / (1024 * 1024)
+        print_result(label, elapsed / frames,
+                     extra=f" | {per_frame_mb:6.2f} MB/quadro | {per_frame_mb * 30:7.1f} MB/s a 30 fps")
+    print(f"  pool: {pool.stats()}")
+
+
+def bench_startup(args):
+    """Mede a partida a frio dos pontos de entrada contra um orçamento
+
+    Cada ponto de entrada é importado em um interpretador novo (melhor de
+    --repeat execuções). Retorna False se algum passar de --startup-budget,
+    o que faz o script terminar com código de saída 1. O mesmo orçamento
+    é verificado em CI por tests/test_startup.py. Pontos de entrada cuja
+    dependência não está instalada são ignorados.
+    """
+    from startup_profile import measure_import, parse_importtime, package_breakdown
+
+    entry_points = ("main", "detface_desktop", "web_camera")
+    print(f"🚀 Partida a frio - orçamento {args.startup_budget * 1000:.0f} ms, melhor de {args.repeat}")
+    within_budget = True
+    for module in entry_points:
+        runs = [measure_import(module) for _ in range(args.repeat)]
+        errors = [error for _, _, error in runs if error]
+        if errors:
+            status = "ignorado" if "ModuleNotFoundError" in errors[0] else "FALHOU"
+            within_budget &= status == "ignorado"
+            print(f"  {module:<28} {status}: {errors[0]}")
+            continue
+        best = min(elapsed for elapsed, _, _ in runs)
+        over = best > args.startup_budget
+        within_budget &= not over
+        _, lines, _ = measure_import(module, importtime=True)
+        heaviest = ", ".join(f"{package} {self_us / 1000:.0f} ms"
+                             for package, self_us in package_breakdown(parse_importtime(lines))[:3])
+        print_result(module, best, extra=f" | {'ACIMA DO ORÇAMENTO' if over else 'ok'} | {heaviest}")
+    return within_budget
+
+
+BENCHMARKS = {
+    'xlsx': (bench_xlsx, "Exportação XLSX de registros detalhados"),
+    'gallery': (bench_gallery, "Metadados de usuários no carregamento da galeria"),
+    'descriptors': (bench_descriptors, "Velocidade e acerto dos descritores faciais"),
+    'engines': (bench_engines, "Detecção e embedding: motor lite (Haar) x dnn"),
+    'ann': (bench_ann, "Busca exata x índice IVF em galerias grandes"),
+    'motion': (bench_motion, "Gate de movimento em cenas estáticas e com pessoas"),
+    'tiles': (bench_tiles, "Cascata em uma chamada x blocos em paralelo (1080p/4K)"),
+    'buffers': (bench_buffers, "Alocações por quadro com e sem pool de buffers"),
+    'startup': (bench_startup, "Partida a frio dos pontos de entrada (falha acima do orçamento)"),
+}
+
+
+def main():
+    """Função principal dos benchmarks"""
+    parser = argparse.ArgumentParser(description="Benchmarks de desempenho do DETFACE")
+    parser.add_argument('benchmark', nargs='*',
+                        help=f"Benchmarks a executar (padrão: todos): {', '.join(BENCHMARKS)}")
+    parser.add_argument('--rows', type=int, default=100000,
+                        help="Quantidade de registros sintéticos")
+    parser.add_argument('--users', type=int, default=5000,
+                        help="Quantidade de usuários sintéticos")
+    parser.add_argument('--identities', type=int, default=200,
+                        help="Quantidade de identidades faciais sintéticas")
+    parser.add_argument('--gallery', type=int, default=100000,
+                        help="Quantidade de templates sintéticos na galeria")
+    parser.add_argument('--memory', action='store_true',
+                        help="Medir pico de memória com tracemalloc (mais lento)")
+    parser.add_argument('--startup-budget', type=float, default=1.0,
+                        help="Tempo máximo de partida a frio por ponto de entrada, em segundos")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Execuções por ponto de entrada no benchmark de partida")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    unknown = [name for name in args.benchmark if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Benchmark desconhecido: {', '.join(unknown)}")
+
+    failed = []
+    for name in args.benchmark or list(BENCHMARKS):
+        func, _ = BENCHMARKS[name]
+        if func(args) is False:
+            failed.append(name)
+        print()
+
+    if failed:
+        print(f"❌ Fora do orçamento: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
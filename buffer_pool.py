@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Pool de Buffers
+Arrays reaproveitados entre quadros para evitar alocações no caminho quente
+"""
+
+import threading
+import numpy as np
+
+
+class BufferPool:
+    """Arrays reutilizáveis agrupados por (shape, dtype)
+
+    acquire() devolve um array livre do formato pedido (ou aloca um novo)
+    e release() o devolve ao pool. O conteúdo não é zerado: o chamador
+    deve sobrescrevê-lo por inteiro, tipicamente como dst= de uma chamada
+    do OpenCV. Cada formato guarda até max_free arrays livres.
+    """
+
+    def __init__(self, max_free=4):
+        """Cria o pool vazio"""
+        self.max_free = int(max_free)
+        self._lock = threading.Lock()
+        self._free = {}
+        self.allocated = 0
+        self.reused = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        """Retorna um array (não inicializado) com o formato pedido"""
+        key = (tuple(shape), np.dtype(dtype))
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                self.reused += 1
+                return free.pop()
+            self.allocated += 1
+        return np.empty(key[0], dtype=key[1])
+
+    def acquire_like(self, array):
+        """Retorna um array livre com o formato e tipo de array"""
+        return self.acquire(array.shape, array.dtype)
+
+    def release(self, array):
+        """Devolve um array ao pool (None é ignorado)"""
+        if array is None:
+            return
+        key = (array.shape, array.dtype)
+        with self._lock:
+            free = self._free.setdefault(key, [])
+            if len(free) < self.max_free:
+                free.append(array)
+
+    def stats(self):
+        """Arrays alocados e reaproveitados desde a criação do pool"""
+        with self._lock:
+            return {'allocated': self.allocated, 'reused': self.reused,
+                    'free': sum(len(free) for free in self._free.values())}
+
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Descoberta de Câmeras
+Localiza uma câmera funcional testando os candidatos em paralelo
+"""
+
+import json
+import queue
+import threading
+import time
+import datetime
+from pathlib import Path
+import cv2
+
+from user_store import write_json_atomic
+
+
+class CameraDiscovery:
+    """Descobre câmeras em paralelo e lembra a última que funcionou
+
+    Cada índice (dispositivo) é testado em sua própria thread daemon:
+    abrir uma câmera inexistente pode bloquear por segundos, então nenhum
+    dispositivo atrasa os demais e o que passar de probe_timeout é
+    descartado. Os backends de um mesmo índice são testados em sequência,
+    cada um liberando a câmera antes do próximo, e param no primeiro que
+    funcionar: quando discover() retorna, nenhum teste segura o dispositivo
+    escolhido. Entre os que funcionarem vence o de maior prioridade (a
+    ordem dos candidatos). A câmera encontrada é gravada em state_file e
+    testada primeiro, sozinha, na próxima inicialização (enquanto o
+    camera_index preferido no config.json não mudar).
+    """
+
+    DEFAULT_STATE_FILE = "camera_state.json"
+
+    def __init__(self, state_file=DEFAULT_STATE_FILE, probe_indices=5, probe_timeout=3.0,
+                 preferred_index=None):
+        """Configura a descoberta"""
+        self.state_file = Path(state_file)
+        self.probe_indices = int(probe_indices)
+        self.probe_timeout = float(probe_timeout)
+        self.preferred_index = preferred_index
+
+    @classmethod
+    def from_config(cls, config_file='config.json'):
+        """Cria a descoberta com as opções de camera_settings do config.json"""
+        try:
+            with open(config_file, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            config = {}
+        settings = config.get('camera_settings', {})
+        return cls(state_file=settings.get('state_file', cls.DEFAULT_STATE_FILE),
+                   probe_indices=settings.get('probe_indices', 5),
+                   probe_timeout=settings.get('probe_timeout_seconds', 3.0),
+                   preferred_index=config.get('camera_index'))
+
+    def candidates(self):
+        """Candidatos (índice, backend) em ordem de prioridade"""
+        indices = list(range(self.probe_indices))
+        if self.preferred_index in indices:
+            indices.remove(self.preferred_index)
+            indices.insert(0, self.preferred_index)
+
+        candidates = [(index, None) for index in indices]
+        for name in ('CAP_DSHOW', 'CAP_V4L2', 'CAP_GSTREAMER'):
+            backend = getattr(cv2, name, None)
+            if backend is not None:
+                candidates.append((0, backend))
+        return candidates
+
+    @staticmethod
+    def probe(index, backend=None):
+        """Abre a câmera e lê um quadro; retorna as informações ou None"""
+        cap = None
+        try:
+            cap = cv2.VideoCapture(index, backend) if backend is not None else cv2.VideoCapture(index)
+            if not cap.isOpened():
+                return None
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                return None
+            height, width = frame.shape[:2]
+            return {'index': index, 'backend': backend, 'width': width, 'height': height}
+        except Exception:
+            return None
+        finally:
+            if cap is not None:
+                cap.release()
+
+    def discover(self):
+        """Retorna a câmera funcional de maior prioridade (ou None)"""
+        cached = self.load_state()
+        # Uma troca de camera_index no config.json invalida o cache
+        if cached is not None and cached.get('preferred_index') == self.preferred_index:
+            info = self._run_probes([(cached['index'], cached.get('backend'))])
+            if info is not None:
+                print(f"✅ Câmera em cache disponível: {self.describe(info)}")
+                return info
+            print("⚠️ Câmera em cache indisponível, procurando outras...")
+
+        info = self._run_probes(self.candidates())
+        if info is not None:
+            print(f"✅ Câmera encontrada: {self.describe(info)}")
+            self.save_state(info)
+        else:
+            print("❌ Nenhuma câmera funcional encontrada")
+        return info
+
+    def _run_probes(self, candidates):
+        """Testa os dispositivos em paralelo respeitando o tempo limite"""
+        results = queue.Queue()
+        cancelled = threading.Event()
+        groups = {}
+        for position, (index, backend) in enumerate(candidates):
+            groups.setdefault(index, []).append((position, backend))
+        for index, group in groups.items():
+            threading.Thread(target=self._probe_device, args=(index, group, results, cancelled),
+                             daemon=True).start()
+
+        try:
+            outcomes = {}
+            deadline = time.monotonic() + self.probe_timeout
+            while len(outcomes) < len(candidates):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    position, info = results.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                outcomes[position] = info
+
+                # Parar assim que o melhor candidato ainda possível tiver respondido
+                for candidate in range(len(candidates)):
+                    if candidate not in outcomes:
+                        break
+                    if outcomes[candidate] is not None:
+                        return outcomes[candidate]
+
+            # Tempo esgotado: usar o melhor entre os que responderam
+            for position in sorted(outcomes):
+                if outcomes[position] is not None:
+                    return outcomes[position]
+            return None
+        finally:
+            # Testes atrasados não abrem mais nenhum backend
+            cancelled.set()
+
+    def _probe_device(self, index, group, results, cancelled):
+        """Testa em sequência os backends de um índice (thread de fundo)
+
+        probe() libera a câmera antes de o resultado ser publicado; depois
+        do primeiro sucesso (ou do cancelamento) os backends restantes não
+        são abertos e contam como indisponíveis.
+        """
+        for number, (position, backend) in enumerate(group):
+            if cancelled.is_set():
+                return
+            info = self.probe(index, backend)
+            results.put((position, info))
+            if info is not None:
+                for rest, _ in group[number + 1:]:
+                    results.put((rest, None))
+                return
+
+    def load_state(self):
+        """Lê a última câmera que funcionou"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return state if 'index' in state else None
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def save_state(self, info):
+        """Grava a câmera encontrada para a próxima inicialização"""
+        try:
+            state = dict(info, preferred_index=self.preferred_index,
+                         updated=datetime.datetime.now().isoformat())
+            write_json_atomic(self.state_file, state)
+        except Exception as e:
+            print(f"⚠️ Erro ao salvar estado da câmera: {e}")
+
+    @staticmethod
+    def describe(info):
+        """Descrição curta da câmera para logs e status"""
+        backend = f", backend {info['backend']}" if info.get('backend') is not None else ""
+        return f"índice {info['index']}{backend} ({info['width']}x{info['height']})"
+
+
+def load_capture_settings(config_file='config.json'):
+    """Lê o modo de captura desejado do config.json
+
+    Resolução em recognition_settings.camera_resolution; FPS, FOURCC e
+    tamanho do buffer em camera_settings. Valores ausentes (ou null) ficam
+    com o padrão do driver.
+    """
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        config = {}
+    resolution = config.get('recognition_settings', {}).get('camera_resolution', {})
+    settings = config.get('camera_settings', {})
+    return {
+        'width': resolution.get('width'),
+        'height': resolution.get('height'),
+        'fps': settings.get('fps'),
+        'fourcc': settings.get('fourcc'),
+        'buffer_size': settings.get('buffer_size'),
+    }
+
+
+def _fourcc_to_str(value):
+    """Converte o código FOURCC numérico em texto (ex.: 'MJPG')"""
+    value = int(value)
+    if value <= 0:
+        return "?"
+    return "".join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00") or "?"
+
+
+def configure_capture(cap, settings):
+    """Aplica o modo de captura pedido e retorna o que o driver aceitou
+
+    O FOURCC é aplicado antes da resolução, pois vários drivers só
+    oferecem resoluções/FPS altos em MJPG. Cada propriedade é lida de volta
+    depois de aplicada e o modo negociado é registrado no log.
+    """
+    if settings.get('fourcc'):
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*str(settings['fourcc'])[:4].ljust(4)))
+    if settings.get('width') and settings.get('height'):
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, int(settings['width']))
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, int(settings['height']))
+    if settings.get('fps'):
+        cap.set(cv2.CAP_PROP_FPS, float(settings['fps']))
+    if settings.get('buffer_size'):
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, int(settings['buffer_size']))
+
+    mode = {
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': cap.get(cv2.CAP_PROP_FPS),
+        'fourcc': _fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC)),
+        'buffer_size': int(cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+    }
+
+    requested = {key: value for key, value in settings.items() if value}
+    differs = [key for key, value in requested.items()
+               if str(mode[key]).upper() != str(value).upper() and not
+               (key == 'fps' and abs(mode['fps'] - float(value)) < 0.5)]
+    print(f"📷 Modo de captura: {mode['width']}x{mode['height']} @ {mode['fps']:.1f} fps, "
+          f"{mode['fourcc']}, buffer {mode['buffer_size']}")
+    if differs:
+        wanted = ", ".join(f"{key}={requested[key]}" for key in differs)
+        print(f"⚠️ O driver não aceitou: {wanted}")
+    return mode
+
+
+def open_camera(info, capture_settings=None):
+    """Abre a câmera descrita por info e aplica o modo de captura configurado"""
+    if info.get('backend') is not None:
+        cap = cv2.VideoCapture(info['index'], info['backend'])
+    else:
+        cap = cv2.VideoCapture(info['index'])
+
+    if cap.isOpened():
+        if capture_settings is None:
+            capture_settings = load_capture_settings()
+        try:
+            configure_capture(cap, capture_settings)
+        except cv2.error as e:
+            print(f"⚠️ Erro ao configurar captura, usando padrões do driver: {e}")
+    return cap
@@ -12,14 +12,18 @@ import threading
 import time
 import numpy as np
 from face_detector import FaceDetector
+from face_engines import configure_opencv_threads
 from user_manager import UserManager
 from report_generator import ReportGenerator
+from camera_discovery import CameraDiscovery
+from frame_sources import CameraSource, create_frame_source
 import os
 import csv
+import argparse
 from datetime import datetime
 
 class DetfaceDesktopApp:
-    def __init__(self, root):
+    def __init__(self, root, source_spec=None):
         self.root = root
         self.root.title("DETFACE - Sistema de Reconhecimento Facial")
         self.root.geometry("1200x800")
@@ -34,6 +38,8 @@ class DetfaceDesktopApp:
         self.is_capturing = False
         self.is_recognizing = False
         self.current_frame = None
+        self.camera_info = None
+        self.source_spec = source_spec or self.face_detector.frame_source_spec
         
         # Configurar interface
         self.setup_ui()
@@ -193,30 +199,32 @@ class DetfaceDesktopApp:
         log_scrollbar.config(command=self.log_text.yview)
         
     def init_camera(self):
-        """Inicializa a câmera"""
-        for i in range(5):
-            try:
-                cap = cv2.VideoCapture(i)
-                if cap.isOpened():
-                    ret, frame = cap.read()
-                    if ret:
-                        cap.release()
-                        self.camera_index = i
-                        self.update_status(f"Câmera encontrada no índice {i}")
-                        self.start_camera_btn.config(state=tk.NORMAL)
-                        return True
-                cap.release()
-            except:
-                continue
+        """Inicializa a câmera (descoberta paralela com cache)"""
+        if self.source_spec and not str(self.source_spec).startswith('camera'):
+            self.update_status(f"Fonte de quadros: {self.source_spec}")
+            self.start_camera_btn.config(state=tk.NORMAL)
+            return True
+        
+        self.camera_info = CameraDiscovery.from_config().discover()
+        if self.camera_info is not None:
+            self.update_status(f"Câmera encontrada: {CameraDiscovery.describe(self.camera_info)}")
+            self.start_camera_btn.config(state=tk.NORMAL)
+            return True
         
         self.update_status("Nenhuma câmera encontrada")
         return False
         
     def start_camera(self):
         """Inicia captura da câmera"""
+        if self.camera_info is None and not self.source_spec:
+            messagebox.showerror("Erro", "Nenhuma câmera encontrada")
+            return
         try:
-            self.camera = cv2.VideoCapture(self.camera_index)
-            if self.camera.isOpened():
+            if self.source_spec:
+                self.camera = create_frame_source(self.source_spec, self.camera_info)
+            else:
+                self.camera = CameraSource(self.camera_info)
+            if self.camera is not None and self.camera.isOpened():
                 self.is_capturing = True
                 self.start_camera_btn.config(state=tk.DISABLED)
                 self.stop_camera_btn.config(state=tk.NORMAL)
@@ -266,6 +274,8 @@ class DetfaceDesktopApp:
                 
                 # Converter para tkinter
                 self.display_frame(frame)
+            elif not isinstance(self.camera, CameraSource):
+                break  # Fim do vídeo, das imagens ou da sessão gravada
                 
             time.sleep(0.03)  # ~30 FPS
             
@@ -287,25 +297,22 @@ class DetfaceDesktopApp:
     def process_recognition(self, frame):
         """Processa reconhecimento facial no frame"""
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_detector.face_cascade.detectMultiScale(gray, 1.1, 4)
-        
-        for (x, y, w, h) in faces:
-            face_roi = gray[y:y+h, x:x+w]
-            features = self.face_detector.extract_face_features(face_roi)
-            
-            if features is not None and len(self.face_detector.known_face_features) > 0:
-                from sklearn.metrics.pairwise import cosine_similarity
-                similarities = []
-                for known_features in self.face_detector.known_face_features:
-                    similarity = cosine_similarity([features], [known_features])[0][0]
-                    similarities.append(similarity)
-                
-                best_match_idx = np.argmax(similarities)
-                best_similarity = similarities[best_match_idx]
+        faces = self.face_detector.detect_faces(gray, frame)
+        
+        # Extrair e comparar todas as faces do frame de uma vez, contra uma
+        # mesma galeria (um recarregamento pode trocá-la durante o quadro)
+        gallery = self.face_detector.gallery
+        features = self.face_detector.extract_faces_features_batch(gray, faces, frame)
+        best_indices, best_similarities = self.face_detector.match_faces(features, gallery)
+        
+        for i, (x, y, w, h) in enumerate(faces):
+            if best_indices is not None:
+                best_match_idx = best_indices[i]
+                best_similarity = best_similarities[i]
                 
                 if best_similarity > self.face_detector.recognition_threshold:
-                    name = self.face_detector.known_face_names[best_match_idx]
-                    user_id = self.face_detector.known_face_ids[best_match_idx]
+                    name = gallery.names[best_match_idx]
+                    user_id = gallery.ids[best_match_idx]
                     
                     # Verificar cooldown
                     current_time = time.time()
@@ -366,7 +373,7 @@ class DetfaceDesktopApp:
             
         try:
             # Salvar imagem
-            filename = f"faces/{user_id}.jpg"
+            filename = self.face_detector.new_sample_path(user_id)
             cv2.imwrite(filename, self.current_frame)
             
             # Validar e cadastrar usuário
@@ -449,6 +456,13 @@ class DetfaceDesktopApp:
         self.status_var.set(message)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DETFACE - Aplicação Desktop")
+    parser.add_argument("--source", help="Fonte de quadros (ex.: video:entrada.mp4, synthetic, replay:sessions/x?speed=2)")
+    args = parser.parse_args()
+    configure_opencv_threads()
     root = tk.Tk()
-    app = DetfaceDesktopApp(root)
-    root.mainloop()
\ No newline at end of file
+    app = DetfaceDesktopApp(root, source_spec=args.source)
+    root.mainloop()
+    # Janela já destruída: apenas interromper a captura e liberar o detector
+    app.is_capturing = False
+    app.face_detector.close()
\ No newline at end of file
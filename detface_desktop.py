@@ -7,43 +7,97 @@ Interface gráfica com abas separadas para cada funcionalidade
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import cv2
-from PIL import Image, ImageTk
 import threading
 import time
+import queue
 import numpy as np
 from face_detector import FaceDetector
+from face_engines import configure_opencv_threads
 from user_manager import UserManager
+from user_store import is_valid_user_id
 from report_generator import ReportGenerator
+from virtual_list import VirtualTreeview
+from camera_discovery import CameraDiscovery
+from frame_sources import CameraSource, create_frame_source
+from session_recorder import SessionRecorder
+from preview_renderer import LatestFrameSlot, CanvasImage, PreviewFrame, PreviewStats
+from buffer_pool import BufferPool
+import startup_profile
 import os
 import csv
+import argparse
+import multiprocessing
 from datetime import datetime, timedelta
 
 class DetfaceDesktopApp:
-    def __init__(self, root):
+    SEARCH_DEBOUNCE_MS = 250  # Pausa na digitação antes de filtrar
+    RENDER_INTERVAL_MS = 15  # Intervalo do loop de renderização no Tk
+    PREVIEW_BASE_SIZE = (640, 480)  # Imagem intermediária única do preview
+    
+    def __init__(self, root, source_spec=None):
         self.root = root
         self.root.title("DETFACE - Sistema de Reconhecimento Facial")
         self.root.geometry("1400x900")
         self.root.configure(bg="#f0f0f0")
         
         # Inicializar componentes
-        self.face_detector = FaceDetector()
+        self.face_detector = FaceDetector(load_gallery=False)
         self.user_manager = UserManager()
         self.report_generator = ReportGenerator()
+        self.face_detector.attach_user_manager(self.user_manager)
         
         # Variáveis de controle
         self.camera = None
         self.is_capturing = False
         self.is_recognizing = False
+        self._recognition_pending = False  # Pedido enquanto a galeria carrega
         self.current_frame = None
-        self.camera_index = 0
-        self.photo_reference = None  # Para manter referência da imagem
+        self._frame_lock = threading.Lock()  # Protege a troca de current_frame
+        self.camera_info = None
+        self.recorder = None
+        self._last_results = None  # Últimas faces detectadas (desenhadas em cena estática)
+        # Fonte de quadros (--source ou camera_settings.frame_source); None = câmera
+        self.source_spec = source_spec or self.face_detector.frame_source_spec
+        self._filter_job = None
+        self._record_counts = None
+        self._record_counts_version = None
+        
+        # Troca de dados entre a thread de captura e o loop do Tk
+        self.frame_slot = LatestFrameSlot(discard=lambda frames: frames[1].release())
+        self.ui_queue = queue.Queue()
+        self._rendered_sequence = 0
+        self.preview_target = "recognition"  # Aba com preview visível (ou None)
+        self.preview_stats = PreviewStats()
+        
+        # Buffers reaproveitados pela thread de captura (quadro, cinza, overlay)
+        # e imagens base do preview, devolvidas pelo loop do Tk após exibidas
+        self.buffer_pool = BufferPool()
         
         # Configurar interface
         self.setup_ui()
         
+        # Galeria em segundo plano: a janela fica utilizável de imediato
+        self.face_detector.start_gallery_loading(
+            progress_callback=lambda loaded, total: self.post_to_ui(self._on_gallery_progress),
+            done_callback=lambda error: self.post_to_ui(self._on_gallery_loaded, error))
+        self._on_gallery_progress()
+        
         # Tentar inicializar câmera
         self.init_camera()
         
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Loop de renderização na thread principal do Tk
+        self.root.after(self.RENDER_INTERVAL_MS, self.render_loop)
+        
+    def on_close(self):
+        """Encerra a aplicação gravando os dados pendentes"""
+        self.stop_camera()
+        self.face_detector.close()
+        self.user_manager.close()
+        self.report_generator.shutdown()
+        self.root.destroy()
+        
     def setup_ui(self):
         """Configura a interface principal"""
         # Estilo
@@ -75,6 +129,7 @@ class DetfaceDesktopApp:
         self.create_register_tab()
         self.create_admin_tab()
         self.create_reports_tab()
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
         # Status bar
         self.status_frame = ttk.Frame(main_frame)
@@ -83,12 +138,17 @@ class DetfaceDesktopApp:
         self.status_var = tk.StringVar(value="Sistema iniciado - Verificando câmera...")
         self.status_label = ttk.Label(self.status_frame, textvariable=self.status_var, 
                                      relief=tk.SUNKEN, anchor=tk.W)
-        self.status_label.pack(fill=tk.X)
+        self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        self.preview_stats_var = tk.StringVar(value="")
+        ttk.Label(self.status_frame, textvariable=self.preview_stats_var, 
+                  relief=tk.SUNKEN, anchor=tk.E).pack(side=tk.RIGHT, padx=(5, 0))
         
     def create_recognition_tab(self):
         """Cria aba de reconhecimento facial"""
         recognition_frame = ttk.Frame(self.notebook)
         self.notebook.add(recognition_frame, text="🎯 Reconhecimento")
+        self.recognition_tab = recognition_frame
         
         # Frame principal dividido
         main_container = ttk.Frame(recognition_frame)
@@ -101,6 +161,7 @@ class DetfaceDesktopApp:
         # Canvas para vídeo
         self.video_canvas = tk.Canvas(camera_frame, width=640, height=480, bg="black")
         self.video_canvas.pack(pady=(0, 10))
+        self.video_image = CanvasImage(self.video_canvas, (640, 480))
         
         # Botões da câmera
         camera_controls = ttk.Frame(camera_frame)
@@ -147,6 +208,7 @@ class DetfaceDesktopApp:
         """Cria aba de cadastro de usuários"""
         register_frame = ttk.Frame(self.notebook)
         self.notebook.add(register_frame, text="👤 Cadastrar Usuário")
+        self.register_tab = register_frame
         
         main_container = ttk.Frame(register_frame)
         main_container.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
@@ -157,6 +219,7 @@ class DetfaceDesktopApp:
         
         self.register_canvas = tk.Canvas(preview_frame, width=480, height=360, bg="black")
         self.register_canvas.pack(pady=(0, 10))
+        self.register_image = CanvasImage(self.register_canvas, (480, 360))
         
         # Botão para capturar
         capture_controls = ttk.Frame(preview_frame)
@@ -249,16 +312,16 @@ class DetfaceDesktopApp:
         ttk.Label(search_frame, text="Pesquisar:").pack(side=tk.LEFT)
         self.search_entry = ttk.Entry(search_frame, width=30)
         self.search_entry.pack(side=tk.LEFT, padx=(5, 5))
-        self.search_entry.bind('<KeyRelease>', self.filter_users)
+        self.search_entry.bind('<KeyRelease>', self.schedule_filter_users)
         
         ttk.Button(search_frame, text="🔍 Buscar", 
                   command=self.filter_users).pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(search_frame, text="🔄 Recarregar", 
                   command=self.refresh_users_list).pack(side=tk.LEFT)
         
-        # Treeview para lista de usuários
+        # Treeview virtual para lista de usuários
         columns = ("id", "name", "dept", "position", "date", "records")
-        self.users_tree = ttk.Treeview(users_frame, columns=columns, show="headings", height=15)
+        self.users_tree = VirtualTreeview(users_frame, columns=columns, height=15)
         
         # Configurar colunas
         self.users_tree.heading("id", text="ID")
@@ -275,12 +338,7 @@ class DetfaceDesktopApp:
         self.users_tree.column("date", width=120)
         self.users_tree.column("records", width=80)
         
-        # Scrollbar para a lista
-        users_scrollbar = ttk.Scrollbar(users_frame, orient=tk.VERTICAL, command=self.users_tree.yview)
-        self.users_tree.configure(yscrollcommand=users_scrollbar.set)
-        
-        self.users_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        users_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.users_tree.pack(fill=tk.BOTH, expand=True)
         
         # Botões de ação
         actions_frame = ttk.Frame(users_frame)
@@ -356,30 +414,69 @@ class DetfaceDesktopApp:
         self.load_recent_data()
         
     def init_camera(self):
-        """Inicializa a câmera"""
-        for i in range(5):
-            try:
-                cap = cv2.VideoCapture(i)
-                if cap.isOpened():
-                    ret, frame = cap.read()
-                    if ret and frame is not None:
-                        cap.release()
-                        self.camera_index = i
-                        self.update_status(f"Câmera encontrada no índice {i}")
-                        self.start_camera_btn.config(state=tk.NORMAL)
-                        return True
-                    cap.release()
-            except:
-                continue
+        """Procura a câmera em segundo plano sem travar a interface"""
+        if self.source_spec and not str(self.source_spec).startswith('camera'):
+            self.update_status(f"Fonte de quadros: {self.source_spec}")
+            self.start_camera_btn.config(state=tk.NORMAL)
+            return
+        self.update_status("Procurando câmera...")
+        threading.Thread(target=self._discover_camera, daemon=True).start()
+        
+    def _discover_camera(self):
+        """Descoberta paralela de câmeras (thread de fundo)"""
+        info = CameraDiscovery.from_config().discover()
+        self.post_to_ui(self._on_camera_discovered, info)
+        
+    def _on_camera_discovered(self, info):
+        """Atualiza a interface com o resultado da descoberta"""
+        self.camera_info = info
+        if info is not None:
+            self.update_status(f"Câmera encontrada: {CameraDiscovery.describe(info)}")
+            self.start_camera_btn.config(state=tk.NORMAL)
+        else:
+            self.update_status("Nenhuma câmera encontrada - Funcionalidades limitadas")
         
-        self.update_status("Nenhuma câmera encontrada - Funcionalidades limitadas")
-        return False
+    def reload_gallery(self):
+        """Recarrega a galeria em segundo plano (a atual segue em uso até a troca)"""
+        self.face_detector.start_gallery_loading(
+            done_callback=lambda error: self.post_to_ui(self._on_gallery_loaded, error))
+        
+    def _on_gallery_progress(self):
+        """Mostra o progresso da galeria no botão de reconhecimento"""
+        if not self.face_detector.gallery_ready.is_set():
+            self.recognize_btn.config(text=f"⏳ {self.face_detector.gallery_status_text()}")
+            
+    def _on_gallery_loaded(self, error):
+        """Galeria pronta: libera o reconhecimento (e o inicia se já foi pedido)"""
+        if error:
+            self.add_to_recognition_log(f"❌ Erro ao carregar galeria: {error}")
+        else:
+            self.add_to_recognition_log(f"📊 {self.face_detector.gallery_status_text()}")
+        if not self.is_recognizing:
+            self.recognize_btn.config(text="🎯 Iniciar Reconhecimento")
+        if self._recognition_pending:
+            self._recognition_pending = False
+            if self.is_capturing and not self.is_recognizing:
+                self.toggle_recognition()
         
     def start_camera(self):
         """Inicia captura da câmera"""
+        if self.camera_info is None and not self.source_spec:
+            messagebox.showerror("Erro", "Nenhuma câmera encontrada")
+            return
         try:
-            self.camera = cv2.VideoCapture(self.camera_index)
-            if self.camera.isOpened():
+            if self.source_spec:
+                self.camera = create_frame_source(self.source_spec, self.camera_info)
+            else:
+                self.camera = CameraSource(self.camera_info)
+            if self.camera is not None and self.camera.isOpened():
+                # Gravação opcional da sessão (recording_settings)
+                self.recorder = SessionRecorder.from_config()
+                if self.recorder is not None:
+                    self.recorder.start(self.face_detector.recording_meta())
+                self.face_detector.motion_gate.reset()
+                self.face_detector.frame_scheduler.reset()
+                self._last_results = None
                 self.is_capturing = True
                 self.start_camera_btn.config(state=tk.DISABLED)
                 self.stop_camera_btn.config(state=tk.NORMAL)
@@ -391,7 +488,7 @@ class DetfaceDesktopApp:
                 self.capture_thread = threading.Thread(target=self.capture_loop, daemon=True)
                 self.capture_thread.start()
                 
-                self.update_status("Câmera iniciada com sucesso")
+                self.update_status(f"Captura iniciada: {self.camera.describe()}")
                 self.add_to_recognition_log("📹 Câmera iniciada")
             else:
                 messagebox.showerror("Erro", "Não foi possível iniciar a câmera")
@@ -402,93 +499,212 @@ class DetfaceDesktopApp:
         """Para a captura da câmera"""
         self.is_capturing = False
         self.is_recognizing = False
+        self._recognition_pending = False
         
         if self.camera:
             self.camera.release()
             self.camera = None
+        if self.recorder is not None:
+            self.recorder.stop()
+            self.recorder = None
             
         self.start_camera_btn.config(state=tk.NORMAL)
         self.stop_camera_btn.config(state=tk.DISABLED)
         self.recognize_btn.config(state=tk.DISABLED, text="🎯 Iniciar Reconhecimento")
+        self._on_gallery_progress()
         self.capture_btn.config(state=tk.DISABLED)
         self.register_btn.config(state=tk.DISABLED)
         self.recognition_status.set("Parado")
         
         # Limpar canvas
+        self.frame_slot.clear()
         self.video_canvas.delete("all")
+        self.video_image.reset()
         self.video_canvas.create_text(320, 240, text="Câmera Parada", fill="white", font=("Arial", 16))
         
         self.register_canvas.delete("all")
+        self.register_image.reset()
         self.register_canvas.create_text(240, 180, text="Câmera Parada", fill="white", font=("Arial", 14))
         
         self.update_status("Câmera parada")
         self.add_to_recognition_log("⏹️ Câmera parada")
         
     def capture_loop(self):
-        """Loop principal de captura de frames"""
+        """Loop principal de captura de frames
+        
+        Executa em thread própria e nunca toca nos widgets do Tk: os quadros
+        vão para o frame_slot e as mensagens para a ui_queue.
+        """
+        pool = self.buffer_pool
+        frame_shape = None
         while self.is_capturing and self.camera:
-            ret, frame = self.camera.read()
-            if ret:
-                self.current_frame = frame.copy()
+            # Ler direto em um buffer do pool (a fonte pode devolver outro array)
+            buffer = pool.acquire(frame_shape) if frame_shape else None
+            ret, frame = self.camera.read(buffer)
+            if frame is not buffer:
+                pool.release(buffer)
+            if not ret:
+                if not isinstance(self.camera, CameraSource):
+                    # Vídeo, imagens ou sessão gravada chegaram ao fim
+                    self.post_to_ui(self.stop_camera)
+                    break
+                time.sleep(0.03)
+                continue
+            frame_shape = frame.shape
+            
+            # O quadro lido vira o atual; o anterior volta ao pool
+            with self._frame_lock:
+                previous, self.current_frame = self.current_frame, frame
+            pool.release(previous)
+            
+            # Processar reconhecimento se ativo (overlay desenhado em uma cópia)
+            display_frame = frame
+            gray = None
+            results = None
+            if self.is_recognizing:
+                display_frame = pool.acquire_like(frame)
+                np.copyto(display_frame, frame)
+                # Quadro fora do agendador ou cena estática: sem nova
+                # detecção, apenas redesenhar as últimas faces
+                detector = self.face_detector
+                detected = False
+                try:
+                    if detector.frame_scheduler.should_process():
+                        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=pool.acquire(frame.shape[:2]))
+                        if detector.motion_gate.should_detect(gray):
+                            started = time.perf_counter()
+                            results = detector.recognize_faces(frame, gray)
+                            detector.frame_scheduler.report(time.perf_counter() - started, len(results),
+                                                            detector.motion_gate.last_motion)
+                            self._last_results = results
+                            display_frame = self.process_recognition(display_frame, results)
+                            detected = True
+                        else:
+                            detector.frame_scheduler.report(None)
+                except Exception as e:
+                    # Um quadro com erro não pode derrubar a thread de captura
+                    results = None
+                    self._last_results = None
+                    self.post_to_ui(self.add_to_recognition_log, f"❌ Erro no reconhecimento: {e}")
+                if not detected and self._last_results:
+                    display_frame = self.process_recognition(display_frame, self._last_results,
+                                                             register=False)
+            
+            pool.release(gray)
+            
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.record(frame, self.camera.timestamp, results)
                 
-                # Processar reconhecimento se ativo
-                display_frame = frame.copy()
-                if self.is_recognizing:
-                    display_frame = self.process_recognition(display_frame)
+            # Preparar o preview só para a aba visível, com uma única
+            # redução + conversão RGB por quadro (fora da thread do Tk)
+            target = self.preview_target
+            if target is not None:
+                started = time.perf_counter()
+                source = display_frame if target == "recognition" else frame
+                preview = PreviewFrame(source, self.PREVIEW_BASE_SIZE, pool)
+                self.preview_stats.add(time.perf_counter() - started)
+                self.frame_slot.put((target, preview))
+            if display_frame is not frame:
+                pool.release(display_frame)
+                
+    def get_current_frame(self):
+        """Cópia do quadro atual da câmera (ou None)
+        
+        O quadro atual é um buffer do pool e volta a ser reescrito depois
+        de substituído; quem precisa dele fora da captura recebe uma cópia.
+        """
+        with self._frame_lock:
+            return None if self.current_frame is None else self.current_frame.copy()
+
+    def post_to_ui(self, func, *args):
+        """Agenda uma chamada na thread do Tk (seguro a partir de outras threads)"""
+        self.ui_queue.put((func, args))
+
+    def render_loop(self):
+        """Loop de renderização executado na thread principal via root.after"""
+        # Executar atualizações de interface enviadas por outras threads
+        while True:
+            try:
+                func, args = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Erro ao atualizar interface: {e}")
+                
+        # Exibir o quadro mais recente apenas na aba visível
+        sequence, frames = self.frame_slot.get(self._rendered_sequence)
+        if frames is not None:
+            self._rendered_sequence = sequence
+            target, preview = frames
+            if self.is_capturing and target == self.preview_target:
+                canvas_image = self.video_image if target == "recognition" else self.register_image
+                self.display_frame_on_canvas(preview, canvas_image)
+            # A imagem já foi copiada para o canvas: o buffer volta ao pool
+            preview.release()
                 
-                # Exibir nos canvas
-                self.display_frame_on_canvas(display_frame, self.video_canvas, (640, 480))
-                self.display_frame_on_canvas(frame, self.register_canvas, (480, 360))
+        # Custo do preview na barra de status (atualizado a cada segundo)
+        if self.preview_stats.elapsed() >= 1.0:
+            stats = self.preview_stats.snapshot()
+            gate = self.face_detector.motion_gate.stats(reset=True)
+            if self.is_capturing:
+                gate_text = ""
+                if self.is_recognizing and gate['enabled'] and gate['evaluated']:
+                    gate_text = f" | Gate: {gate['skip_rate']:.0%} sem detecção"
+                if self.is_recognizing:
+                    schedule = self.face_detector.frame_scheduler.stats()
+                    gate_text += (f" | Detecção 1/{schedule['stride']} ({schedule['state']}, "
+                                  f"{schedule['cost_ms']:.0f} ms, CPU {schedule['detection_cpu']:.0%})")
+                self.preview_stats_var.set(
+                    f"Preview: {stats['fps']:.0f} fps | {stats['ms_per_frame']:.1f} ms/quadro | "
+                    f"CPU preview {stats['preview_cpu']:.0f}% | processo {stats['process_cpu']:.0f}%"
+                    f"{gate_text}")
+            else:
+                self.preview_stats_var.set("")
                 
-            time.sleep(0.03)  # ~30 FPS
+        self.root.after(self.RENDER_INTERVAL_MS, self.render_loop)
 
-    def display_frame_on_canvas(self, frame, canvas, size):
-        """Exibe frame no canvas especificado"""
+    def on_tab_changed(self, event=None):
+        """Atualiza qual preview deve ser preparado conforme a aba visível"""
+        visible_tab = self.notebook.select()
+        if visible_tab == str(self.recognition_tab):
+            self.preview_target = "recognition"
+        elif visible_tab == str(self.register_tab):
+            self.preview_target = "register"
+        else:
+            self.preview_target = None
+
+    def display_frame_on_canvas(self, preview, canvas_image):
+        """Exibe o preview no canvas especificado"""
         try:
-            # Redimensionar frame
-            frame_resized = cv2.resize(frame, size)
-            frame_rgb = cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB)
-            
-            # Converter para PIL
-            image = Image.fromarray(frame_rgb)
-            photo = ImageTk.PhotoImage(image)
-            
-            # Atualizar canvas
-            canvas.delete("all")
-            canvas.create_image(size[0]//2, size[1]//2, image=photo)
-            
-            # Manter referência para evitar garbage collection
-            self.photo_reference = photo
+            started = time.perf_counter()
+            canvas_image.show_preview(preview)
+            self.preview_stats.add(time.perf_counter() - started, rendered=True)
             
         except Exception as e:
             print(f"Erro ao exibir frame: {e}")
 
-    def process_recognition(self, frame):
-        """Processa reconhecimento facial no frame"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_detector.face_cascade.detectMultiScale(gray, 1.1, 4)
-        
-        for (x, y, w, h) in faces:
-            face_roi = gray[y:y+h, x:x+w]
-            features = self.face_detector.extract_face_features(face_roi)
-            
-            if features is not None and len(self.face_detector.known_face_features) > 0:
-                from sklearn.metrics.pairwise import cosine_similarity
-                similarities = []
-                for known_features in self.face_detector.known_face_features:
-                    similarity = cosine_similarity([features], [known_features])[0][0]
-                    similarities.append(similarity)
-                
-                best_match_idx = np.argmax(similarities)
-                best_similarity = similarities[best_match_idx]
-                
-                if best_similarity > self.face_detector.recognition_threshold:
-                    name = self.face_detector.known_face_names[best_match_idx]
-                    user_id = self.face_detector.known_face_ids[best_match_idx]
+    def process_recognition(self, frame, results=None, register=True):
+        """Processa reconhecimento facial no frame
+        
+        Com register=False apenas desenha os resultados (sem registrar presença).
+        """
+        if results is None:
+            results = self.face_detector.recognize_faces(frame)
+        
+        for result in results:
+            x, y, w, h = result['box']
+            best_similarity = result['similarity']
+            if best_similarity is not None:
+                if result['user_id'] is not None:
+                    name = result['name']
+                    user_id = result['user_id']
                     
                     # Verificar cooldown
                     current_time = time.time()
-                    if (user_id not in self.face_detector.last_recognition_time or 
+                    if register and (user_id not in self.face_detector.last_recognition_time or 
                         current_time - self.face_detector.last_recognition_time[user_id] > 
                         self.face_detector.recognition_cooldown):
                         
@@ -499,9 +715,10 @@ class DetfaceDesktopApp:
                         # Determinar tipo de entrada/saída
                         attendance_type = self.face_detector.determine_attendance_type(user_id, datetime.now())
                         
-                        # Atualizar log
-                        self.add_to_recognition_log(f"✅ {attendance_type.upper()}: {name} ({best_similarity:.2f})")
-                        self.update_statistics()
+                        # Atualizar log (na thread do Tk)
+                        self.post_to_ui(self.add_to_recognition_log,
+                                        f"✅ {attendance_type.upper()}: {name} ({best_similarity:.2f})")
+                        self.post_to_ui(self.update_statistics)
                     
                     # Desenhar retângulo verde
                     cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
@@ -522,6 +739,16 @@ class DetfaceDesktopApp:
         
     def toggle_recognition(self):
         """Liga/desliga reconhecimento"""
+        if not self.face_detector.gallery_ready.is_set():
+            # Galeria carregando: o reconhecimento liga sozinho ao terminar
+            self._recognition_pending = not self._recognition_pending
+            if self._recognition_pending:
+                self.recognition_status.set("⏳ Aguardando galeria")
+                self.add_to_recognition_log("⏳ Reconhecimento inicia quando a galeria carregar")
+            else:
+                self.recognition_status.set("⚫ Parado")
+                self.add_to_recognition_log("⏸️ Início automático cancelado")
+            return
         if not self.is_recognizing:
             self.is_recognizing = True
             self.recognize_btn.config(text="⏹️ Parar Reconhecimento")
@@ -537,10 +764,11 @@ class DetfaceDesktopApp:
             
     def capture_for_registration(self):
         """Captura frame para cadastro"""
-        if self.current_frame is not None:
+        frame = self.get_current_frame()
+        if frame is not None:
             # Verificar se há faces detectadas
-            gray = cv2.cvtColor(self.current_frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_detector.face_cascade.detectMultiScale(gray, 1.1, 4)
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            faces = self.face_detector.detect_faces(gray, frame)
             
             if len(faces) > 0:
                 messagebox.showinfo("Sucesso", f"Face detectada! {len(faces)} face(s) encontrada(s).\nPreencha os dados e clique em 'Cadastrar Usuário'.")
@@ -563,21 +791,29 @@ class DetfaceDesktopApp:
             
         if not user_id:
             user_id = name.lower().replace(" ", "_")
+        if not is_valid_user_id(user_id):
+            messagebox.showerror("Erro", f"ID inválido: '{user_id}'\nUse letras, números, _ ou -.")
+            return
             
-        if self.current_frame is None:
+        frame = self.get_current_frame()
+        if frame is None:
             messagebox.showerror("Erro", "Nenhum frame disponível da câmera!")
             return
             
         try:
-            # Verificar se usuário já existe
-            existing_users = self.user_manager.get_all_users()
-            if any(user['id'] == user_id for user in existing_users):
-                messagebox.showerror("Erro", f"Usuário com ID '{user_id}' já existe!")
+            # Usuário existente: oferecer a imagem como nova amostra do rosto
+            existing_user = self.user_manager.get_user(user_id)
+            if existing_user is not None:
+                if messagebox.askyesno("Usuário existente",
+                                       f"Usuário com ID '{user_id}' já existe!\n"
+                                       f"Adicionar esta imagem como nova amostra de "
+                                       f"'{existing_user['name']}'?"):
+                    self.add_face_sample(user_id, existing_user['name'], frame)
                 return
             
             # Salvar imagem
-            filename = f"faces/{user_id}.jpg"
-            cv2.imwrite(filename, self.current_frame)
+            filename = self.face_detector.new_sample_path(user_id)
+            cv2.imwrite(filename, frame)
             
             # Validar e cadastrar usuário
             if self.face_detector.validate_captured_image(filename):
@@ -589,7 +825,7 @@ class DetfaceDesktopApp:
                     additional_info['position'] = position
                 
                 self.user_manager.add_user(name, user_id, additional_info)
-                self.face_detector.load_known_faces()
+                self.reload_gallery()
                 
                 messagebox.showinfo("Sucesso", f"Usuário '{name}' cadastrado com sucesso!")
                 
@@ -610,85 +846,99 @@ class DetfaceDesktopApp:
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao cadastrar usuário: {str(e)}")
 
+    def add_face_sample(self, user_id, name, frame):
+        """Adiciona o frame capturado como nova amostra de um usuário cadastrado"""
+        filename = self.face_detector.new_sample_path(user_id)
+        cv2.imwrite(filename, frame)
+        
+        if self.face_detector.validate_captured_image(filename):
+            self.reload_gallery()
+            self.register_btn.config(state=tk.DISABLED)
+            messagebox.showinfo("Sucesso", f"Nova amostra adicionada para '{name}'!")
+            self.add_to_recognition_log(f"📸 Nova amostra: {name}")
+        else:
+            os.remove(filename)
+            messagebox.showerror("Erro", "Nenhuma face válida detectada na imagem!")
+
     def refresh_users_list(self):
-        """Atualiza lista de usuários"""
-        # Limpar lista
-        for item in self.users_tree.get_children():
-            self.users_tree.delete(item)
-            
-        # Carregar usuários
-        users = self.user_manager.get_all_users()
-        for user in users:
-            # Contar registros do usuário
-            record_count = self.count_user_records(user['id'])
+        """Atualiza lista de usuários mantendo a busca digitada"""
+        self.filter_users()
+
+    def get_record_counts(self):
+        """Retorna a contagem de registros por usuário
+        
+        O arquivo de presença é lido uma única vez e a contagem só é
+        refeita quando ele muda.
+        """
+        try:
+            stat = os.stat("registro_presenca.csv")
+            version = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return {}
             
-            # Obter dados adicionais
-            dept = user.get('department', '-')
-            position = user.get('position', '-')
+        if self._record_counts is None or version != self._record_counts_version:
+            counts = {}
+            try:
+                with open("registro_presenca.csv", 'r', encoding='utf-8') as f:
+                    reader = csv.DictReader(f)
+                    for row in reader:
+                        counts[row['user_id']] = counts.get(row['user_id'], 0) + 1
+            except Exception as e:
+                print(f"Erro ao contar registros: {e}")
+            self._record_counts = counts
+            self._record_counts_version = version
             
-            self.users_tree.insert("", tk.END, values=(
-                user['id'], 
-                user['name'], 
-                dept,
-                position,
-                user['registered_date'], 
-                record_count
-            ))
+        return self._record_counts
 
     def count_user_records(self, user_id):
         """Conta registros de presença de um usuário"""
-        try:
-            if not os.path.exists("registro_presenca.csv"):
-                return 0
-            
-            count = 0
-            with open("registro_presenca.csv", 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['user_id'] == user_id:
-                        count += 1
-            return count
-        except:
-            return 0
+        return self.get_record_counts().get(user_id, 0)
+
+    def schedule_filter_users(self, event=None):
+        """Agenda a filtragem para quando o usuário parar de digitar"""
+        if self._filter_job is not None:
+            self.root.after_cancel(self._filter_job)
+        self._filter_job = self.root.after(self.SEARCH_DEBOUNCE_MS, self.filter_users)
 
     def filter_users(self, event=None):
         """Filtra usuários na lista"""
-        search_term = self.search_entry.get().lower()
-        
-        # Limpar lista
-        for item in self.users_tree.get_children():
-            self.users_tree.delete(item)
+        if self._filter_job is not None:
+            self.root.after_cancel(self._filter_job)
+            self._filter_job = None
             
-        # Carregar usuários filtrados
-        users = self.user_manager.get_all_users()
-        for user in users:
-            if (search_term in user['name'].lower() or 
-                search_term in user['id'].lower() or
-                search_term in user.get('department', '').lower() or
-                search_term in user.get('position', '').lower()):
-                
-                record_count = self.count_user_records(user['id'])
-                dept = user.get('department', '-')
-                position = user.get('position', '-')
+        search_term = self.search_entry.get()
+        self.show_users(self.user_manager.search_user_ids(search_term))
+
+    def show_users(self, user_ids):
+        """Exibe os usuários na lista
+        
+        A lista é virtual: apenas as linhas visíveis existem no Treeview e
+        somente as que mudaram desde a última exibição são atualizadas.
+        """
+        record_counts = self.get_record_counts()
+        rows = []
+        for user_id in user_ids:
+            user = self.user_manager.get_user(user_id)
+            if user is None:
+                continue
                 
-                self.users_tree.insert("", tk.END, values=(
-                    user['id'], 
-                    user['name'], 
-                    dept,
-                    position,
-                    user['registered_date'], 
-                    record_count
-                ))
+            rows.append((user_id, (
+                user['id'], 
+                user['name'], 
+                user.get('department', '-'),
+                user.get('position', '-'),
+                user['registered_date'], 
+                record_counts.get(user['id'], 0)
+            )))
+            
+        self.users_tree.set_rows(rows)
 
     def view_user_details(self):
         """Exibe detalhes do usuário selecionado"""
-        selection = self.users_tree.selection()
-        if not selection:
+        user_id = self.users_tree.selected_key()
+        if user_id is None:
             messagebox.showwarning("Aviso", "Selecione um usuário para ver detalhes")
             return
-            
-        item = self.users_tree.item(selection[0])
-        user_id = item['values'][0]
         
         # Criar janela de detalhes
         self.show_user_details_window(user_id)
@@ -733,9 +983,9 @@ class DetfaceDesktopApp:
         history_frame = ttk.LabelFrame(main_frame, text="Últimos Registros de Presença", padding=15)
         history_frame.pack(fill=tk.BOTH, expand=True)
         
-        # Lista de registros
+        # Lista de registros (virtual - o histórico pode ser muito longo)
         columns = ("date", "time", "type")
-        history_tree = ttk.Treeview(history_frame, columns=columns, show="headings", height=12)
+        history_tree = VirtualTreeview(history_frame, columns=columns, height=12)
         
         history_tree.heading("date", text="Data")
         history_tree.heading("time", text="Hora")
@@ -754,39 +1004,37 @@ class DetfaceDesktopApp:
         ttk.Button(main_frame, text="Fechar", command=details_window.destroy).pack(pady=(15, 0))
 
     def load_user_records(self, tree, user_id):
-        """Carrega registros de presença do usuário"""
+        """Carrega todo o histórico de presença do usuário (mais recente primeiro)"""
         try:
             if not os.path.exists("registro_presenca.csv"):
                 return
             
-            records = []
+            rows = []
             with open("registro_presenca.csv", 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
-                for row in reader:
+                for line_number, row in enumerate(reader):
                     if row['user_id'] == user_id:
-                        records.append(row)
+                        # "AAAA-MM-DD HH:MM:SS" -> ("DD/MM/AAAA", "HH:MM:SS")
+                        date_part, _, time_part = row['timestamp'].partition(' ')
+                        year, month, day = date_part.split('-')
+                        rows.append((line_number, (
+                            f"{day}/{month}/{year}",
+                            time_part,
+                            row['type'].upper()
+                        )))
             
-            # Mostrar últimos 50 registros
-            for record in records[-50:]:
-                timestamp = datetime.strptime(record['timestamp'], '%Y-%m-%d %H:%M:%S')
-                tree.insert("", 0, values=(
-                    timestamp.strftime('%d/%m/%Y'),
-                    timestamp.strftime('%H:%M:%S'),
-                    record['type'].upper()
-                ))
+            rows.reverse()
+            tree.set_rows(rows)
                 
         except Exception as e:
             print(f"Erro ao carregar registros: {e}")
 
     def edit_user(self):
         """Edita usuário selecionado"""
-        selection = self.users_tree.selection()
-        if not selection:
+        user_id = self.users_tree.selected_key()
+        if user_id is None:
             messagebox.showwarning("Aviso", "Selecione um usuário para editar")
             return
-            
-        item = self.users_tree.item(selection[0])
-        user_id = item['values'][0]
         
         self.show_edit_user_window(user_id)
 
@@ -840,8 +1088,8 @@ class DetfaceDesktopApp:
                 if new_position:
                     update_data['position'] = new_position
                 
+                # Nomes da galeria são atualizados via notificação do UserManager
                 self.user_manager.update_user(user_id, **update_data)
-                self.face_detector.load_known_faces()  # Recarregar nomes
                 
                 messagebox.showinfo("Sucesso", "Usuário atualizado com sucesso!")
                 edit_window.destroy()
@@ -859,14 +1107,13 @@ class DetfaceDesktopApp:
 
     def delete_user(self):
         """Exclui usuário selecionado"""
-        selection = self.users_tree.selection()
-        if not selection:
+        user_id = self.users_tree.selected_key()
+        if user_id is None:
             messagebox.showwarning("Aviso", "Selecione um usuário para excluir")
             return
             
-        item = self.users_tree.item(selection[0])
-        user_id = item['values'][0]
-        user_name = item['values'][1]
+        user_data = self.user_manager.get_user(user_id)
+        user_name = user_data['name'] if user_data else user_id
         
         # Confirmar exclusão
         if messagebox.askyesno("Confirmar Exclusão", 
@@ -877,8 +1124,8 @@ class DetfaceDesktopApp:
                               f"- Não afetará o histórico de registros"):
             
             try:
+                # A galeria é atualizada via notificação do UserManager
                 self.user_manager.remove_user(user_id)
-                self.face_detector.load_known_faces()
                 self.refresh_users_list()
                 self.update_statistics()
                 
@@ -957,21 +1204,47 @@ class DetfaceDesktopApp:
     def generate_weekly_report(self):
         """Gera relatório semanal"""
         try:
-            csv_file, pdf_file = self.report_generator.generate_weekly_report()
-            messagebox.showinfo("Sucesso", f"Relatório semanal gerado:\nCSV: {csv_file}\nPDF: {pdf_file}")
-            self.add_to_recognition_log("📊 Relatório semanal gerado")
+            start_date, end_date = self.report_generator.get_weekly_period()
+            job = self.report_generator.submit_period_report(start_date, end_date, "semanal")
+            self.update_status("Gerando relatório semanal...")
+            self.poll_report_job(job, "semanal", "📊")
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao gerar relatório semanal: {str(e)}")
 
     def generate_monthly_report(self):
         """Gera relatório mensal"""
         try:
-            csv_file, pdf_file = self.report_generator.generate_monthly_report()
-            messagebox.showinfo("Sucesso", f"Relatório mensal gerado:\nCSV: {csv_file}\nPDF: {pdf_file}")
-            self.add_to_recognition_log("📈 Relatório mensal gerado")
+            start_date, end_date = self.report_generator.get_monthly_period()
+            job = self.report_generator.submit_period_report(start_date, end_date, "mensal")
+            self.update_status("Gerando relatório mensal...")
+            self.poll_report_job(job, "mensal", "📈")
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao gerar relatório mensal: {str(e)}")
 
+    def poll_report_job(self, job, label, icon):
+        """Acompanha um relatório em segundo plano sem bloquear a interface"""
+        if not job.is_done():
+            self.update_status(f"Relatório {label}: {job.progress:.0%} - {job.message}")
+            self.root.after(200, self.poll_report_job, job, label, icon)
+            return
+            
+        if job.error:
+            self.update_status(f"Erro no relatório {label}")
+            messagebox.showerror("Erro", f"Erro ao gerar relatório {label}: {job.error}")
+        elif not job.result:
+            self.update_status(f"Relatório {label}: nenhum registro no período")
+            messagebox.showwarning("Aviso", f"Nenhum registro encontrado para o relatório {label}.")
+        else:
+            origin = " (cache)" if job.cached else ""
+            volumes = job.result.get('pdf_volumes', [])
+            volume_info = f" (+{len(volumes)} volumes)" if volumes else ""
+            self.update_status(f"Relatório {label} gerado{origin}")
+            messagebox.showinfo("Sucesso", f"Relatório {label} gerado{origin}:\n"
+                                           f"CSV: {job.result['csv']}\n"
+                                           f"XLSX: {job.result['xlsx']}\n"
+                                           f"PDF: {job.result['pdf']}{volume_info}")
+            self.add_to_recognition_log(f"{icon} Relatório {label} gerado")
+
     def generate_custom_report(self):
         """Gera relatório personalizado"""
         try:
@@ -1099,6 +1372,14 @@ class DetfaceDesktopApp:
         self.status_var.set(f"{datetime.now().strftime('%H:%M:%S')} - {message}")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="DETFACE - Aplicação Desktop")
+    parser.add_argument("--source", help="Fonte de quadros (ex.: video:entrada.mp4, synthetic, replay:sessions/x?speed=2)")
+    parser.add_argument(startup_profile.PROFILE_FLAG, action="store_true",
+                        help="Mostrar o tempo de importação por pacote e sair")
+    args = parser.parse_args()
+    startup_profile.run_if_requested("detface_desktop")
+    configure_opencv_threads()
     root = tk.Tk()
-    app = DetfaceDesktopApp(root)
+    app = DetfaceDesktopApp(root, source_spec=args.source)
     root.mainloop()
\ No newline at end of file
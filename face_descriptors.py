@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Descritores Faciais
+Backends plugáveis de extração de características das faces
+"""
+
+import threading
+import numpy as np
+import cv2
+
+
+class FaceDescriptor:
+    """Interface base dos descritores faciais
+
+    Um descritor recebe o frame em escala de cinza e as caixas (x, y, w, h)
+    das faces detectadas e retorna uma matriz (N, dim) float32, comparada
+    com a galeria por similaridade de cosseno. As faces são redimensionadas
+    para um buffer pré-alocado reaproveitado entre chamadas.
+
+    Subclasses definem name, version, face_size, dim, default_threshold e
+    implementam _describe(faces).
+    """
+
+    name = None
+    version = 1
+    face_size = (100, 100)  # (largura, altura)
+    dim = 0
+    default_threshold = 0.75
+
+    def __init__(self):
+        """Inicializa os buffers do descritor"""
+        self._lock = threading.Lock()
+        self._face_buffer = None
+        self._capacity = 0
+
+    @property
+    def key(self):
+        """Identificador do descritor e de sua versão (usado no cache de templates)"""
+        return f"{self.name}-v{self.version}"
+
+    def extract_batch(self, gray, boxes, frame=None):
+        """Extrai as características de todas as faces de um frame
+
+        frame é o quadro colorido original, usado apenas por descritores
+        que trabalham em cores.
+        """
+        count = len(boxes)
+        if count == 0:
+            return np.empty((0, self.dim), dtype=np.float32)
+
+        with self._lock:
+            if count > self._capacity:
+                self._capacity = max(count, 16)
+                width, height = self.face_size
+                self._face_buffer = np.empty((self._capacity, height, width), dtype=np.uint8)
+                self._allocate(self._capacity)
+
+            faces = self._face_buffer[:count]
+            for i, (x, y, w, h) in enumerate(boxes):
+                cv2.resize(gray[y:y+h, x:x+w], self.face_size, dst=faces[i])
+            return self._describe(faces)
+
+    def _allocate(self, capacity):
+        """Aloca buffers auxiliares para capacity faces (opcional)"""
+
+    def _describe(self, faces):
+        """Calcula as características de faces (N, altura, largura) uint8"""
+        raise NotImplementedError
+
+
+class HistogramDescriptor(FaceDescriptor):
+    """Histograma global de intensidade (256 bins) - descritor original
+
+    Rápido, mas descarta toda a informação espacial do rosto.
+    """
+
+    name = "histogram"
+    version = 1
+    face_size = (100, 100)
+    dim = 256
+    default_threshold = 0.75
+
+    def _allocate(self, capacity):
+        pixels = self.face_size[0] * self.face_size[1]
+        self._bin_buffer = np.empty((capacity, pixels), dtype=np.int32)
+        self._bin_offsets = (np.arange(capacity, dtype=np.int32) * self.dim)[:, None]
+
+    def _describe(self, faces):
+        count = len(faces)
+        # Deslocar os níveis de cinza de cada face para sua própria faixa de
+        # 256 bins, contando todas as faces em um único np.bincount
+        bins = self._bin_buffer[:count]
+        np.add(faces.reshape(count, -1), self._bin_offsets[:count], out=bins)
+        counts = np.bincount(bins.ravel(), minlength=count * self.dim)
+
+        hist = counts.reshape(count, self.dim).astype(np.float32)
+        hist /= hist.sum(axis=1, keepdims=True) + 1e-10
+        return hist
+
+
+def _uniform_lbp_table():
+    """Mapeia os 256 códigos LBP para 59 bins (58 uniformes + 1 não uniforme)"""
+    table = np.full(256, 58, dtype=np.int32)
+    next_bin = 0
+    for code in range(256):
+        bits = [(code >> i) & 1 for i in range(8)]
+        transitions = sum(bits[i] != bits[(i + 1) % 8] for i in range(8))
+        if transitions <= 2:
+            table[code] = next_bin
+            next_bin += 1
+    return table
+
+
+class LBPGridDescriptor(FaceDescriptor):
+    """LBP uniforme (8 vizinhos, raio 1) em uma grade espacial
+
+    O rosto é dividido em grid x grid células e cada célula contribui com um
+    histograma de 59 padrões uniformes, preservando onde cada textura
+    aparece. Todo o cálculo é vetorizado sobre o lote: os 8 vizinhos são
+    comparados com o centro em operações NumPy e os histogramas de todas
+    as células de todas as faces saem de um único np.bincount. Os
+    histogramas passam por raiz quadrada (kernel de Hellinger), o que
+    torna a similaridade de cosseno mais discriminativa.
+    """
+
+    name = "lbp_grid"
+    version = 1
+    grid = 8
+    cell = 12
+    bins = 59
+    face_size = (grid * cell + 2, grid * cell + 2)  # +1 pixel de borda por lado
+    dim = grid * grid * bins
+    default_threshold = 0.82
+
+    UNIFORM_TABLE = _uniform_lbp_table()
+
+    # Deslocamentos (linha, coluna) dos 8 vizinhos, em ordem circular
+    NEIGHBORS = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))
+
+    def __init__(self):
+        super().__init__()
+        side = self.grid * self.cell
+        rows = np.arange(side) // self.cell
+        cells = rows[:, None] * self.grid + rows[None, :]
+        self._cell_offsets = (cells * self.bins).astype(np.int32)
+
+    def _allocate(self, capacity):
+        side = self.grid * self.cell
+        self._codes = np.empty((capacity, side, side), dtype=np.uint8)
+        self._bits = np.empty((capacity, side, side), dtype=np.uint8)
+        self._compare = np.empty((capacity, side, side), dtype=bool)
+        self._bin_buffer = np.empty((capacity, side, side), dtype=np.int32)
+        self._face_offsets = (np.arange(capacity, dtype=np.int32) * self.dim)[:, None, None]
+
+    def _describe(self, faces):
+        count = len(faces)
+        side = self.grid * self.cell
+        center = faces[:, 1:-1, 1:-1]
+        codes = self._codes[:count]
+        bits = self._bits[:count]
+        compare = self._compare[:count]
+
+        codes.fill(0)
+        for bit, (dy, dx) in enumerate(self.NEIGHBORS):
+            neighbor = faces[:, 1 + dy:1 + dy + side, 1 + dx:1 + dx + side]
+            np.greater_equal(neighbor, center, out=compare)
+            np.left_shift(compare.view(np.uint8), bit, out=bits)
+            np.bitwise_or(codes, bits, out=codes)
+
+        # Código LBP -> bin uniforme -> bin global (face, célula, padrão)
+        bins = self._bin_buffer[:count]
+        np.take(self.UNIFORM_TABLE, codes, out=bins)
+        bins += self._cell_offsets
+        bins += self._face_offsets[:count]
+        counts = np.bincount(bins.ravel(), minlength=count * self.dim)
+
+        hist = counts.reshape(count, self.dim).astype(np.float32)
+        hist /= self.cell * self.cell
+        np.sqrt(hist, out=hist)
+        return hist
+
+
+DESCRIPTORS = {
+    HistogramDescriptor.name: HistogramDescriptor,
+    LBPGridDescriptor.name: LBPGridDescriptor,
+}
+
+
+def create_descriptor(name="histogram"):
+    """Cria o descritor pelo nome configurado (padrão: histograma)"""
+    descriptor_class = DESCRIPTORS.get(name)
+    if descriptor_class is None:
+        print(f"⚠️ Descritor desconhecido '{name}', usando 'histogram'")
+        descriptor_class = HistogramDescriptor
+    return descriptor_class()
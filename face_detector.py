@@ -12,168 +12,636 @@ import datetime
 import csv
 from pathlib import Path
 import time
-from sklearn.metrics.pairwise import cosine_similarity
+import threading
+import copy
+from user_store import UserStore, is_valid_user_id
+from face_descriptors import create_descriptor
+from face_engines import create_dnn_engine
+from template_cache import TemplateCache
+from gallery_index import IVFIndex
+from camera_discovery import CameraDiscovery, open_camera
+from frame_sources import CameraSource, create_frame_source, load_frame_source_spec
+from session_recorder import SessionRecorder
+from motion_gate import MotionGate
+from frame_scheduler import FrameScheduler
+from tiled_detection import TiledCascadeDetector
+
+
+def cosine_similarity(a, b):
+    """Similaridade de cosseno do scikit-learn, importado no primeiro uso
+    
+    O scikit-learn leva centenas de milissegundos para importar e só é
+    necessário quando há faces para comparar com a galeria.
+    """
+    from sklearn.metrics.pairwise import cosine_similarity as sklearn_cosine_similarity
+    return sklearn_cosine_similarity(a, b)
+
+
+class Gallery:
+    """Galeria imutável, publicada no detector com uma única atribuição
+    
+    Nomes e IDs por identidade; arquivos e dono por amostra (amostras da
+    mesma identidade ficam contíguas), a matriz (M, D) das amostras, o
+    início de cada identidade nela e o índice aproximado opcional.
+    Recarregar ou editar a galeria cria outra instância; o reconhecimento
+    lê FaceDetector.gallery uma vez por quadro e nunca mistura índices de
+    uma galeria com nomes de outra.
+    """
+    
+    def __init__(self, names=(), ids=(), features=None, files=(), owners=(), ann_index=None):
+        """Monta a galeria a partir das listas por identidade e por amostra"""
+        self.names = tuple(names)
+        self.ids = tuple(ids)
+        self.files = tuple(files)
+        self.owners = np.asarray(owners, dtype=np.int64)
+        self.matrix = None
+        self.segment_starts = None
+        if features is not None and len(features):
+            self.matrix = np.vstack(features).astype(np.float32)
+            self.segment_starts = np.flatnonzero(np.r_[True, self.owners[1:] != self.owners[:-1]])
+        self.ann_index = ann_index
+        
+    def __len__(self):
+        return len(self.ids)
+        
+    @property
+    def samples(self):
+        """Quantidade de amostras (templates) na galeria"""
+        return 0 if self.matrix is None else len(self.matrix)
+        
+    def renamed(self, names):
+        """Cópia da galeria com outros nomes de exibição (mesmas amostras)"""
+        gallery = copy.copy(self)
+        gallery.names = tuple(names)
+        return gallery
+
 
 class FaceDetector:
     """Classe responsável pela detecção e reconhecimento facial"""
     
-    def __init__(self):
-        """Inicializa o detector facial"""
-        self.known_face_features = []
-        self.known_face_names = []
-        self.known_face_ids = []
+    GALLERY_PROGRESS_INTERVAL = 0.1  # Segundos entre avisos de progresso da galeria
+    
+    def __init__(self, load_gallery=True):
+        """Inicializa o detector facial
+        
+        Com load_gallery=False a galeria não é carregada aqui: as interfaces
+        chamam start_gallery_loading() para carregá-la em segundo plano.
+        """
+        # Galeria atual (trocada inteira a cada recarregamento)
+        self.gallery = Gallery()
+        self.faces_dir = Path("faces")
         self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        self.recognition_threshold = 0.75
+        
+        # Motor configurável (recognition_settings.engine): "lite" usa Haar +
+        # descritor configurado; "dnn" usa os modelos de dnn_settings
+        settings = self.load_recognition_settings()
+        self.engine = settings.get('engine', 'lite')
+        self.dnn_detector = None
+        embedder = None
+        if self.engine == 'dnn':
+            self.dnn_detector, embedder = create_dnn_engine(self.load_dnn_settings())
+        self.descriptor = embedder or create_descriptor(settings.get('descriptor', 'histogram'))
+        self.recognition_threshold = float(settings.get('descriptor_threshold',
+                                                        self.descriptor.default_threshold))
+        
+        # Cascata em blocos paralelos para quadros largos (câmeras 1080p/4K)
+        tiled = settings.get('tiled_detection', {})
+        self.tiled_detector = None
+        self.tiled_min_width = int(tiled.get('min_width', 1280))
+        if tiled.get('enabled', False):
+            self.tiled_detector = TiledCascadeDetector(
+                cv2.data.haarcascades + 'haarcascade_frontalface_default.xml',
+                rows=tiled.get('rows', 2), cols=tiled.get('cols', 2),
+                overlap=tiled.get('overlap', 240), threads=tiled.get('threads', 4))
+        
+        # Índice aproximado (IVF) usado automaticamente em galerias grandes
+        self.ann_min_gallery_size = int(settings.get('ann_min_gallery_size', 20000))
+        self.ann_lists = int(settings.get('ann_lists', 0))
+        self.ann_nprobe = int(settings.get('ann_nprobe', 8))
+        self._ann_index_path = None
+        
+        # Gate de movimento: cenas estáticas não passam pela detecção
+        self.motion_gate = MotionGate.from_settings(settings.get('motion_gate'))
+        
+        # Intervalo entre detecções adaptado à carga e à atividade da cena
+        # (frame_skip do config.json é o intervalo base)
+        self.frame_scheduler = FrameScheduler.from_settings(settings)
+        
+        # Similaridade por identidade com várias amostras: "max" ou "mean"
+        self.template_aggregation = settings.get('template_aggregation', 'max')
         self.last_recognition_time = {}
         self.recognition_cooldown = 5  # segundos entre reconhecimentos do mesmo usuário
         self.camera_index = 0
         self.camera_backend = None
+        self.camera_info = {'index': 0, 'backend': None}
+        # Fonte de quadros alternativa (camera_settings.frame_source), ex.:
+        # "video:entrada.mp4" ou "replay:sessions/..."; None = câmera ao vivo
+        self.frame_source_spec = load_frame_source_spec()
+        self.user_manager = None
+        self.users_file = "users.json"
+        self._user_roster = None
+        self._roster_version = None
+        
+        # Estado do carregamento da galeria (imagens processadas / total)
+        self._gallery_lock = threading.Lock()
+        self.gallery_ready = threading.Event()
+        self.gallery_progress = (0, 0)
+        self.gallery_error = None
         
         # Carregar rostos conhecidos
-        self.load_known_faces()
+        if load_gallery:
+            self.load_known_faces()
+        
+    def attach_user_manager(self, user_manager):
+        """Associa o gerenciador de usuários
+        
+        O detector passa a usar o cadastro em memória do UserManager e a
+        atualizar nomes da galeria quando ele notifica alterações.
+        """
+        self.user_manager = user_manager
+        user_manager.add_change_listener(self.on_users_changed)
+        
+    @property
+    def known_face_names(self):
+        """Nomes de exibição por identidade da galeria atual"""
+        return self.gallery.names
+        
+    @property
+    def known_face_ids(self):
+        """IDs por identidade da galeria atual"""
+        return self.gallery.ids
+        
+    def on_users_changed(self, user_ids):
+        """Atualiza a galeria em memória após alterações no cadastro"""
+        gallery = self.gallery
+        roster = self.get_user_roster()
+        names = list(gallery.names)
+        removed = set()
+        for idx, user_id in enumerate(gallery.ids):
+            if user_id not in user_ids:
+                continue
+            if user_id in roster:
+                names[idx] = roster[user_id].get('name', user_id)
+            else:
+                removed.add(idx)
+                
+        if not removed:
+            self.gallery = gallery.renamed(names)
+            return
+            
+        # Usuários removidos saem da galeria sem recarregar as imagens
+        kept_ids = [idx for idx in range(len(gallery)) if idx not in removed]
+        renumber = {old: new for new, old in enumerate(kept_ids)}
+        keep = [row for row, owner in enumerate(gallery.owners) if owner not in removed]
+        ann_index = None
+        if gallery.ann_index is not None:
+            ann_index = gallery.ann_index.copy()
+            ann_index.keep_rows(keep)
+        self.gallery = Gallery([names[idx] for idx in kept_ids],
+                               [gallery.ids[idx] for idx in kept_ids],
+                               gallery.matrix[keep] if keep else None,
+                               [gallery.files[row] for row in keep],
+                               [renumber[gallery.owners[row]] for row in keep],
+                               ann_index)
+        if ann_index is not None:
+            self.save_ann_index(self.gallery)
+        
+    def load_recognition_settings(self):
+        """Carrega as configurações de reconhecimento do config.json"""
+        try:
+            with open('config.json', 'r', encoding='utf-8') as f:
+                return json.load(f).get('recognition_settings', {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        
+    def load_dnn_settings(self):
+        """Carrega as configurações do motor DNN do config.json"""
+        try:
+            with open('config.json', 'r', encoding='utf-8') as f:
+                return json.load(f).get('dnn_settings', {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        
+    def detect_faces(self, gray, frame=None):
+        """Detecta faces e retorna as caixas (x, y, w, h)
+        
+        Usa o detector DNN quando carregado e a cascata Haar caso contrário
+        (em blocos paralelos nos quadros com pelo menos tiled_min_width de
+        largura, se tiled_detection estiver ativo). frame é o quadro
+        colorido original (usado pelo detector DNN).
+        """
+        if self.dnn_detector is not None:
+            return self.dnn_detector.detect(gray, frame)
+        tiled_detector = self.tiled_detector
+        if tiled_detector is not None and gray.shape[1] >= self.tiled_min_width:
+            return tiled_detector.detect(gray)
+        
+        faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
+        if len(faces) == 0:
+            return np.empty((0, 4), dtype=np.int32)
+        return faces
+        
+    def close(self):
+        """Libera os recursos do detector (pool de threads da detecção em blocos)
+        
+        Chamado pelas interfaces ao encerrar, depois de parar a captura.
+        """
+        tiled_detector, self.tiled_detector = self.tiled_detector, None
+        if tiled_detector is not None:
+            tiled_detector.shutdown()
         
     def extract_face_features(self, face_roi):
-        """Extrai características do rosto usando histograma LBP simplificado"""
+        """Extrai características de um único rosto com o descritor configurado"""
         try:
-            # Redimensionar para tamanho padrão
-            face_roi = cv2.resize(face_roi, (100, 100))
-            
             # Converter para escala de cinza se necessário
             if len(face_roi.shape) == 3:
                 face_roi = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
             
-            # Calcular histograma
-            hist = cv2.calcHist([face_roi], [0], None, [256], [0, 256])
-            hist = hist.flatten()
-            
-            # Normalizar
-            hist = hist / (hist.sum() + 1e-10)
-            
-            return hist
+            h, w = face_roi.shape[:2]
+            return self.extract_faces_features_batch(face_roi, [(0, 0, w, h)])[0]
         except Exception as e:
             print(f"Erro ao extrair características: {e}")
             return None
         
-    def load_known_faces(self):
-        """Carrega todas as faces conhecidas da pasta faces/"""
-        faces_dir = Path("faces")
+    def extract_faces_features_batch(self, gray, boxes, frame=None):
+        """Extrai as características de todas as faces de um frame de uma vez
+        
+        Recebe o frame em escala de cinza e as caixas (x, y, w, h) e retorna
+        uma matriz (N, D) float32 calculada pelo descritor configurado.
+        """
+        return self.descriptor.extract_batch(gray, boxes, frame)
+        
+    def get_known_features_matrix(self):
+        """Retorna as amostras da galeria atual como uma matriz (M, D)"""
+        return self.gallery.matrix
+        
+    def match_faces(self, features, gallery=None):
+        """Compara um lote de faces com a galeria
+        
+        Retorna (índices de identidade, similaridades) da melhor
+        correspondência de cada face, ou (None, None) se não houver faces ou
+        galeria. A similaridade de uma identidade com várias amostras é o
+        máximo ou a média (template_aggregation) das similaridades com suas
+        amostras, reduzidas por segmento em uma única operação. Os índices
+        valem para gallery (padrão: a galeria atual, lida uma única vez).
+        """
+        gallery = gallery or self.gallery
+        known = gallery.matrix
+        if known is None or len(features) == 0:
+            return None, None
+        
+        starts = gallery.segment_starts
+        if gallery.ann_index is not None:
+            # O índice aponta a amostra mais próxima; a identidade dela é
+            # pontuada com todas as suas amostras
+            rows, _ = gallery.ann_index.search(features, self.ann_nprobe)
+            owners = gallery.owners[rows]
+            ends = np.r_[starts[1:], len(known)]
+            best_similarities = np.array([
+                self._aggregate(cosine_similarity(features[i:i+1], known[starts[owner]:ends[owner]]),
+                                np.array([0]))[0, 0]
+                for i, owner in enumerate(owners)], dtype=np.float32)
+            return owners, best_similarities
+        
+        similarities = self._aggregate(cosine_similarity(features, known), starts)
+        best_indices = similarities.argmax(axis=1)
+        best_similarities = similarities[np.arange(len(features)), best_indices]
+        return best_indices, best_similarities
+        
+    def _aggregate(self, similarities, starts):
+        """Reduz similaridades por amostra (N, M) a similaridades por identidade"""
+        if self.template_aggregation == 'mean':
+            counts = np.diff(np.r_[starts, similarities.shape[1]]).astype(similarities.dtype)
+            return np.add.reduceat(similarities, starts, axis=1) / counts
+        return np.maximum.reduceat(similarities, starts, axis=1)
+
+    def recognize_faces(self, frame, gray=None):
+        """Detecta e identifica as faces de um quadro BGR
+
+        Retorna uma lista com um dict por face: box (x, y, w, h), user_id e
+        name (None se abaixo do limiar) e similarity (None sem galeria).
+        """
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gallery = self.gallery  # Uma galeria consistente para o quadro inteiro
+        faces = self.detect_faces(gray, frame)
+        features = self.extract_faces_features_batch(gray, faces, frame)
+        best_indices, best_similarities = self.match_faces(features, gallery)
+
+        results = []
+        for i, (x, y, w, h) in enumerate(faces):
+            result = {'box': (int(x), int(y), int(w), int(h)), 'user_id': None, 'name': None,
+                      'similarity': None}
+            if best_indices is not None:
+                result['similarity'] = float(best_similarities[i])
+                if best_similarities[i] > self.recognition_threshold:
+                    result['user_id'] = gallery.ids[best_indices[i]]
+                    result['name'] = gallery.names[best_indices[i]]
+            results.append(result)
+        return results
+        
+    def recording_meta(self):
+        """Configuração do pipeline gravada junto com as sessões"""
+        return {'engine': self.engine, 'descriptor': self.descriptor.key,
+                'threshold': self.recognition_threshold,
+                'template_aggregation': self.template_aggregation}
+        
+    def list_gallery_images(self):
+        """Lista as imagens da galeria agrupadas por usuário
+        
+        Aceita o formato antigo (faces/<id>.jpg) e o de várias amostras
+        (faces/<id>/*.jpg); diretórios iniciados por ponto são ignorados.
+        """
+        image_extensions = {'.jpg', '.jpeg', '.png', '.bmp'}
+        groups = {}
+        for entry in sorted(self.faces_dir.iterdir()):
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir():
+                for image_file in sorted(entry.iterdir()):
+                    if image_file.suffix.lower() in image_extensions:
+                        groups.setdefault(entry.name, []).append(image_file)
+            elif entry.suffix.lower() in image_extensions:
+                groups.setdefault(entry.stem, []).append(entry)
+        return groups
+        
+    def new_sample_path(self, user_id):
+        """Caminho para uma nova amostra de rosto do usuário (faces/<id>/<data>.jpg)"""
+        if not is_valid_user_id(user_id):
+            raise ValueError(f"ID de usuário inválido: {user_id!r} (use letras, números, _ ou -)")
+        user_dir = self.faces_dir / user_id
+        user_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        return str(user_dir / f"{timestamp}.jpg")
+        
+    def load_known_faces(self, progress_callback=None, verbose=True):
+        """Carrega todas as faces conhecidas da pasta faces/
+        
+        A galeria nova é montada à parte e só substitui a atual no fim, então
+        o reconhecimento pode continuar durante um recarregamento.
+        progress_callback(carregadas, total) é chamado a cada
+        GALLERY_PROGRESS_INTERVAL segundos e ao terminar.
+        """
+        with self._gallery_lock:
+            self._load_known_faces(progress_callback, verbose)
+            self.gallery_ready.set()
+            
+    def _load_known_faces(self, progress_callback, verbose):
+        faces_dir = self.faces_dir
         if not faces_dir.exists():
             faces_dir.mkdir()
+            self.gallery_progress = (0, 0)
+            if progress_callback:
+                progress_callback(0, 0)
             return
             
-        print("🔄 Carregando rostos cadastrados...")
+        if verbose:
+            print("🔄 Carregando rostos cadastrados...")
         
-        self.known_face_features = []
-        self.known_face_names = []
-        self.known_face_ids = []
+        names, ids, features_list, files, owners = [], [], [], [], []
         
-        # Procurar por arquivos de imagem
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp']
-        image_files = []
+        # Procurar por imagens (uma ou várias amostras por usuário)
+        groups = self.list_gallery_images()
+        image_files = [image_file for files in groups.values() for image_file in files]
+        total = len(image_files)
+        loaded = 0
+        self.gallery_progress = (0, total)
+        last_report = time.monotonic()
+            
+        # Metadados carregados uma única vez para toda a galeria
+        roster = self.get_user_roster()
         
-        for ext in image_extensions:
-            image_files.extend(faces_dir.glob(f"*{ext}"))
+        # Características já extraídas por este descritor
+        template_cache = TemplateCache(faces_dir, self.descriptor.key)
+        template_cache.load()
         
-        for image_file in image_files:
-            try:
-                # Carregar imagem
-                image = cv2.imread(str(image_file))
-                if image is None:
-                    continue
+        for name, group_files in groups.items():
+            samples = []
+            for image_file in group_files:
+                try:
+                    features = template_cache.get(image_file)
+                    if features is None:
+                        features = self.extract_image_features(image_file)
+                        if features is None:
+                            print(f"⚠️ Nenhuma face encontrada em: {image_file.name}")
+                            continue
+                        template_cache.put(image_file, features)
+                    samples.append((image_file, features))
+                    
+                except Exception as e:
+                    print(f"❌ Erro ao carregar {image_file.name}: {str(e)}")
+                finally:
+                    loaded += 1
+                    self.gallery_progress = (loaded, total)
+                    if progress_callback and time.monotonic() - last_report >= self.GALLERY_PROGRESS_INTERVAL:
+                        last_report = time.monotonic()
+                        progress_callback(loaded, total)
+                    
+            if not samples:
+                continue
                 
-                # Detectar face na imagem
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
+            # Metadados do usuário (nome do arquivo ou diretório = ID)
+            user_data = roster.get(name)
+            display_name = user_data.get('name', name) if user_data else name
+            user_id = user_data.get('id', name) if user_data else name
+            
+            owner = len(ids)
+            names.append(display_name)
+            ids.append(user_id)
+            for image_file, features in samples:
+                features_list.append(features)
+                files.append(image_file.relative_to(faces_dir).as_posix())
+                owners.append(owner)
                 
-                if len(faces) > 0:
-                    # Usar a primeira face encontrada
-                    x, y, w, h = faces[0]
-                    face_roi = gray[y:y+h, x:x+w]
-                    
-                    # Extrair características
-                    features = self.extract_face_features(face_roi)
-                    if features is not None:
-                        # Extrair nome do arquivo (sem extensão)
-                        name = image_file.stem
-                        
-                        # Tentar carregar metadados do usuário
-                        user_data = self.get_user_metadata(name)
-                        display_name = user_data.get('name', name) if user_data else name
-                        user_id = user_data.get('id', name) if user_data else name
-                        
-                        self.known_face_features.append(features)
-                        self.known_face_names.append(display_name)
-                        self.known_face_ids.append(user_id)
-                        
-                        print(f"✅ Carregado: {display_name}")
-                else:
-                    print(f"⚠️ Nenhuma face encontrada em: {image_file.name}")
-                        
+            if verbose and len(samples) > 1:
+                print(f"✅ Carregado: {display_name} ({len(samples)} amostras)")
+            elif verbose:
+                print(f"✅ Carregado: {display_name}")
+                
+        try:
+            template_cache.prune(image_files)
+            template_cache.save()
+        except Exception as e:
+            print(f"⚠️ Erro ao salvar cache de templates: {e}")
+            
+        gallery = Gallery(names, ids, features_list, files, owners)
+        self._ann_index_path = template_cache.directory / f"{self.descriptor.key}.ivf.npz"
+        gallery.ann_index = self.build_ann_index(gallery)
+        
+        # Publicar a galeria nova de uma vez (o reconhecimento pode estar rodando)
+        self.gallery = gallery
+        
+        if progress_callback:
+            progress_callback(total, total)
+        if verbose:
+            print(f"📊 Total de rostos carregados: {len(gallery)} "
+                  f"({gallery.samples} amostras)")
+            
+    def start_gallery_loading(self, progress_callback=None, done_callback=None):
+        """Carrega a galeria em uma thread de fundo
+        
+        A interface fica disponível imediatamente; gallery_status() informa o
+        progresso e done_callback(erro) é chamado ao terminar (erro None em
+        caso de sucesso). Os callbacks rodam na thread de fundo.
+        """
+        def worker():
+            try:
+                self.load_known_faces(progress_callback, verbose=False)
             except Exception as e:
-                print(f"❌ Erro ao carregar {image_file.name}: {str(e)}")
+                print(f"❌ Erro ao carregar galeria: {e}")
+                self.gallery_error = str(e)
+                self.gallery_ready.set()  # Segue com a galeria vazia
+            if done_callback:
+                done_callback(self.gallery_error)
                 
-        print(f"📊 Total de rostos carregados: {len(self.known_face_features)}")
+        thread = threading.Thread(target=worker, daemon=True, name="detface-gallery")
+        thread.start()
+        return thread
         
-    def get_user_metadata(self, user_id):
-        """Carrega metadados do usuário do arquivo users.json"""
+    def gallery_status(self):
+        """Estado do carregamento: pronta, imagens carregadas/total e rostos"""
+        loaded, total = self.gallery_progress
+        return {'ready': self.gallery_ready.is_set(), 'loaded': loaded, 'total': total,
+                'faces': len(self.gallery), 'error': self.gallery_error}
+        
+    def gallery_status_text(self):
+        """Texto curto para botões e barras de status (ex.: "Carregando (3/120)")"""
+        status = self.gallery_status()
+        if status['ready']:
+            return f"Galeria pronta ({status['faces']} rostos)"
+        if not status['total']:
+            return "Carregando..."  # Galeria ainda sendo listada
+        return f"Carregando ({status['loaded']}/{status['total']})"
+        
+    def build_ann_index(self, gallery):
+        """Índice aproximado para a galeria, se ela passar do tamanho configurado
+        
+        Centróides e atribuições salvos são reaproveitados: apenas templates
+        novos são atribuídos às listas. O índice é retreinado quando não
+        existe, quando a dimensão muda ou quando a galeria cresceu mais de
+        4x desde o último treino. Retorna None para usar a busca exata.
+        """
+        if gallery.samples < self.ann_min_gallery_size:
+            return None
+        
+        try:
+            known = gallery.matrix
+            index, saved = IVFIndex.load(self._ann_index_path, self.ann_nprobe)
+            if (index is None or index.dim != known.shape[1]
+                    or len(known) > 4 * index.trained_size):
+                print(f"🔄 Treinando índice da galeria ({len(known)} templates)...")
+                index = IVFIndex(nlist=self.ann_lists, nprobe=self.ann_nprobe)
+                index.train(known)
+                saved = {}
+            
+            assignments = [saved.get(name, -1) for name in gallery.files]
+            index.build(known, assignments)
+            gallery.ann_index = index
+            self.save_ann_index(gallery)
+            print(f"⚡ Índice da galeria ativo: {len(index.centroids)} listas, nprobe {self.ann_nprobe}")
+            return index
+        except Exception as e:
+            print(f"⚠️ Erro no índice da galeria, usando busca exata: {e}")
+            return None
+            
+    def save_ann_index(self, gallery):
+        """Persiste o índice aproximado da galeria junto ao cache de templates"""
         try:
-            users_file = Path("users.json")
-            if users_file.exists():
-                with open(users_file, 'r', encoding='utf-8') as f:
-                    users_data = json.load(f)
-                    return users_data.get(user_id, None)
+            gallery.ann_index.save(self._ann_index_path, gallery.files)
         except Exception as e:
-            print(f"Erro ao carregar metadados do usuário {user_id}: {e}")
-        return None
+            print(f"⚠️ Erro ao salvar índice da galeria: {e}")
         
-    def check_camera(self):
-        """Verifica se a câmera está disponível"""
-        # Tentar diferentes índices de câmera
-        for camera_index in range(5):
+    def extract_image_features(self, image_file):
+        """Detecta a primeira face de uma imagem e extrai suas características"""
+        image = cv2.imread(str(image_file))
+        if image is None:
+            return None
+        
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        faces = self.detect_faces(gray, image)
+        if len(faces) == 0:
+            return None
+        
+        # Usar a primeira face encontrada
+        return self.extract_faces_features_batch(gray, faces[:1], image)[0]
+        
+    def get_user_roster(self):
+        """Retorna o cadastro de usuários em memória
+        
+        Usa o cadastro do UserManager associado, se houver; caso contrário
+        lê users.json uma vez e só relê quando o arquivo (ou o diário) muda.
+        """
+        if self.user_manager is not None:
+            return self.user_manager.users_data
+            
+        version = self._users_file_version()
+        if self._user_roster is None or version != self._roster_version:
             try:
-                cap = cv2.VideoCapture(camera_index)
-                if cap.isOpened():
-                    ret, frame = cap.read()
-                    if ret and frame is not None:
-                        cap.release()
-                        print(f"✅ Câmera encontrada no índice {camera_index}")
-                        self.camera_index = camera_index
-                        return True
-                    cap.release()
+                self._user_roster = UserStore(self.users_file).load()
             except Exception as e:
-                continue
+                print(f"Erro ao carregar metadados dos usuários: {e}")
+                self._user_roster = {}
+            self._roster_version = version
+        return self._user_roster
         
-        # Tentar com diferentes backends
-        for backend in [cv2.CAP_DSHOW, cv2.CAP_V4L2, cv2.CAP_GSTREAMER]:
+    def _users_file_version(self):
+        """Identifica a versão atual do cadastro pelo mtime/tamanho dos arquivos"""
+        version = []
+        store = UserStore(self.users_file)
+        for path in (store.users_file, store.journal_file):
             try:
-                cap = cv2.VideoCapture(0, backend)
-                if cap.isOpened():
-                    ret, frame = cap.read()
-                    if ret and frame is not None:
-                        cap.release()
-                        print(f"✅ Câmera encontrada com backend {backend}")
-                        self.camera_backend = backend
-                        self.camera_index = 0
-                        return True
-                    cap.release()
-            except Exception:
-                continue
-                
-        print("❌ Nenhuma câmera funcional encontrada")
-        return False
+                stat = path.stat()
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                version.append(None)
+        return tuple(version)
+        
+    def get_user_metadata(self, user_id):
+        """Retorna metadados do usuário do cadastro em memória"""
+        return self.get_user_roster().get(user_id)
+        
+    def check_camera(self):
+        """Verifica se a câmera está disponível (descoberta paralela com cache)"""
+        if self.frame_source_spec and not str(self.frame_source_spec).startswith('camera'):
+            print(f"🎞️ Usando fonte de quadros configurada: {self.frame_source_spec}")
+            return True
+        
+        info = CameraDiscovery.from_config().discover()
+        if info is None:
+            return False
+        
+        self.camera_info = info
+        self.camera_index = info['index']
+        self.camera_backend = info.get('backend')
+        return True
+        
+    def open_camera(self):
+        """Abre a câmera encontrada por check_camera"""
+        return open_camera(self.camera_info)
+        
+    def open_source(self):
+        """Abre a fonte de quadros configurada (padrão: a câmera encontrada)"""
+        if self.frame_source_spec:
+            try:
+                return create_frame_source(self.frame_source_spec, self.camera_info)
+            except (ValueError, OSError) as e:
+                print(f"❌ Erro ao abrir fonte de quadros '{self.frame_source_spec}': {e}")
+                return None
+        return CameraSource(self.camera_info)
     
-    def capture_user_face(self, name, user_id):
-        """Captura uma imagem do usuário para cadastro"""
+    def capture_user_face(self, name, user_id, source=None):
+        """Captura uma imagem do usuário para cadastro
+        
+        source pode ser qualquer FrameSource (ou cv2.VideoCapture); sem ela
+        é usada a fonte configurada. A fonte é liberada ao final.
+        """
         print(f"\n📷 Capturando foto para {name}...")
         print("Posicione seu rosto na câmera e pressione ESPAÇO para capturar ou ESC para cancelar")
         
-        if self.camera_backend:
-            cap = cv2.VideoCapture(self.camera_index, self.camera_backend)
-        else:
-            cap = cv2.VideoCapture(self.camera_index)
+        cap = source if source is not None else self.open_source()
             
-        if not cap.isOpened():
-            print("❌ Erro: Não foi possível acessar a câmera")
+        if cap is None or not cap.isOpened():
+            print("❌ Erro: Não foi possível acessar a fonte de quadros")
             return False
             
         captured = False
@@ -186,7 +654,7 @@ class FaceDetector:
                 
             # Detectar faces no frame
             gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
+            faces = self.detect_faces(gray, frame)
             
             # Desenhar retângulos ao redor das faces
             for (x, y, w, h) in faces:
@@ -200,7 +668,7 @@ class FaceDetector:
             if key == 32:  # ESPAÇO
                 if len(faces) > 0:
                     # Salvar imagem
-                    image_path = f"faces/{user_id}.jpg"
+                    image_path = self.new_sample_path(user_id)
                     cv2.imwrite(image_path, frame)
                     
                     # Validar imagem capturada
@@ -234,7 +702,7 @@ class FaceDetector:
                 return False
                 
             gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
+            faces = self.detect_faces(gray, image)
             
             # Verificar se pelo menos uma face foi detectada
             if len(faces) == 0:
@@ -251,79 +719,94 @@ class FaceDetector:
             print(f"Erro na validação da imagem: {e}")
             return False
     
-    def start_recognition(self):
-        """Inicia o processo de reconhecimento facial em tempo real"""
+    def process_scheduled_frame(self, frame, gray_buffer=None):
+        """Um quadro do loop ao vivo: agendador, gate de movimento e reconhecimento
+        
+        Retorna (resultados, cinza); resultados é None quando o agendador
+        pulou o quadro ou o gate o barrou. gray_buffer é reaproveitado para
+        a imagem em cinza e devolvido para o próximo quadro.
+        """
+        if not self.frame_scheduler.should_process():
+            return None, gray_buffer
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=gray_buffer)
+        if not self.motion_gate.should_detect(gray):
+            self.frame_scheduler.report(None)
+            return None, gray
+        started = time.perf_counter()
+        results = self.recognize_faces(frame, gray)
+        self.frame_scheduler.report(time.perf_counter() - started, len(results),
+                                    self.motion_gate.last_motion)
+        return results, gray
+        
+    def start_recognition(self, source=None):
+        """Inicia o processo de reconhecimento facial em tempo real
+        
+        source pode ser qualquer FrameSource (câmera, vídeo, imagens,
+        sintética ou sessão gravada); sem ela é usada a fonte configurada.
+        """
         print("\n🎥 Iniciando reconhecimento facial...")
         print("Pressione 'q' para sair")
         
-        if self.camera_backend:
-            cap = cv2.VideoCapture(self.camera_index, self.camera_backend)
-        else:
-            cap = cv2.VideoCapture(self.camera_index)
+        cap = source if source is not None else self.open_source()
             
-        if not cap.isOpened():
-            print("❌ Erro: Não foi possível acessar a câmera")
+        if cap is None or not cap.isOpened():
+            print("❌ Erro: Não foi possível acessar a fonte de quadros")
             return
             
-        frame_count = 0
+        # Gravação opcional (recording_settings) para reproduzir a sessão depois
+        recorder = SessionRecorder.from_config()
+        if recorder is not None:
+            recorder.start(self.recording_meta())
+            
+        self.frame_scheduler.reset()
+        
+        # Quadro e imagem em cinza reaproveitados a cada leitura (o loop é
+        # de uma única thread e o gravador copia o que precisa guardar)
+        frame_buffer = None
+        gray_buffer = None
         
         while True:
-            ret, frame = cap.read()
+            ret, frame = cap.read(frame_buffer)
             if not ret:
-                print("❌ Erro ao capturar frame")
+                if isinstance(cap, CameraSource):
+                    print("❌ Erro ao capturar frame")
+                else:
+                    print("🔚 Fim da fonte de quadros")
                 break
                 
-            frame_count += 1
-            
-            # Processar apenas a cada 3 frames para melhor performance
-            if frame_count % 3 == 0:
-                # Detectar faces
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
+            frame_buffer = frame
+            results, gray_buffer = self.process_scheduled_frame(frame, gray_buffer)
+            if recorder is not None:
+                recorder.record(frame, getattr(cap, 'timestamp', None), results)
                 
-                # Processar cada face detectada
-                for (x, y, w, h) in faces:
-                    face_roi = gray[y:y+h, x:x+w]
+            # Processar cada face detectada
+            for result in results or ():
+                x, y, w, h = result['box']
+                if result['similarity'] is None:
+                    # Só mostrar retângulo
+                    cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
+                elif result['user_id'] is not None:
+                    name = result['name']
+                    user_id = result['user_id']
                     
-                    # Extrair características da face
-                    features = self.extract_face_features(face_roi)
-                    
-                    if features is not None and len(self.known_face_features) > 0:
-                        # Comparar com faces conhecidas
-                        similarities = []
-                        for known_features in self.known_face_features:
-                            similarity = cosine_similarity([features], [known_features])[0][0]
-                            similarities.append(similarity)
-                        
-                        # Encontrar melhor correspondência
-                        best_match_idx = np.argmax(similarities)
-                        best_similarity = similarities[best_match_idx]
+                    # Verificar cooldown
+                    current_time = time.time()
+                    if (user_id not in self.last_recognition_time or 
+                        current_time - self.last_recognition_time[user_id] > self.recognition_cooldown):
                         
-                        if best_similarity > self.recognition_threshold:
-                            name = self.known_face_names[best_match_idx]
-                            user_id = self.known_face_ids[best_match_idx]
-                            
-                            # Verificar cooldown
-                            current_time = time.time()
-                            if (user_id not in self.last_recognition_time or 
-                                current_time - self.last_recognition_time[user_id] > self.recognition_cooldown):
-                                
-                                # Registrar presença
-                                self.register_attendance(user_id, name)
-                                self.last_recognition_time[user_id] = current_time
-                            
-                            # Desenhar retângulo verde e nome
-                            cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                            cv2.putText(frame, f"{name} ({best_similarity:.2f})", (x, y-10), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-                        else:
-                            # Face não reconhecida
-                            cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
-                            cv2.putText(frame, "Desconhecido", (x, y-10), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-                    else:
-                        # Só mostrar retângulo
-                        cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
+                        # Registrar presença
+                        self.register_attendance(user_id, name)
+                        self.last_recognition_time[user_id] = current_time
+                    
+                    # Desenhar retângulo verde e nome
+                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+                    cv2.putText(frame, f"{name} ({result['similarity']:.2f})", (x, y-10), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                else:
+                    # Face não reconhecida
+                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
+                    cv2.putText(frame, "Desconhecido", (x, y-10), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
             
             # Mostrar frame
             cv2.imshow('DETFACE - Reconhecimento Facial', frame)
@@ -333,7 +816,19 @@ class FaceDetector:
                 break
                 
         cap.release()
+        if recorder is not None:
+            recorder.stop()
         cv2.destroyAllWindows()
+        
+        gate = self.motion_gate.stats()
+        if gate['enabled'] and gate['evaluated']:
+            print(f"🚦 Gate de movimento: {gate['skipped']}/{gate['evaluated']} quadros sem detecção "
+                  f"({gate['skip_rate']:.0%}), {gate['ms_per_frame']:.2f} ms/quadro")
+        
+        schedule = self.frame_scheduler.stats()
+        if schedule['frames']:
+            print(f"⏱️ Agendador: {schedule['processed']}/{schedule['frames']} quadros processados, "
+                  f"intervalo final {schedule['stride']} ({schedule['state']})")
         print("🔚 Reconhecimento finalizado")
     
     def register_attendance(self, user_id, name):
@@ -364,6 +859,10 @@ class FaceDetector:
                     writer.writeheader()
                     
                 writer.writerow(attendance_record)
+                
+            # Atualizar estatísticas do usuário (gravação adiada se configurada)
+            if self.user_manager is not None:
+                self.user_manager.update_user_statistics(user_id, attendance_type)
             
             print(f"✅ {attendance_type.upper()}: {name} - {current_timestamp.strftime('%H:%M:%S')}")
             
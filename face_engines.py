@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Motores de Detecção e Embedding
+Backend opcional baseado em redes neurais (OpenCV DNN) executadas na CPU
+"""
+
+import json
+import threading
+from pathlib import Path
+import numpy as np
+import cv2
+
+from face_descriptors import FaceDescriptor
+
+
+def configure_opencv_threads(config_file='config.json'):
+    """Aplica dnn_settings.threads ao OpenCV na inicialização do programa
+
+    cv2.setNumThreads vale para o processo inteiro (cascata Haar, redes,
+    redimensionamentos), por isso é configurado uma única vez pelos pontos
+    de entrada e só quando o motor "dnn" está selecionado.
+    """
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        config = {}
+    if config.get('recognition_settings', {}).get('engine', 'lite') != 'dnn':
+        return
+    threads = config.get('dnn_settings', {}).get('threads')
+    if threads:
+        cv2.setNumThreads(int(threads))
+
+
+def _load_net(model_path, config_path=None):
+    """Carrega uma rede do OpenCV DNN para execução na CPU"""
+    net = cv2.dnn.readNet(str(model_path), str(config_path) if config_path else "")
+    net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+    net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+    return net
+
+
+class DNNFaceDetector:
+    """Detector facial por rede SSD (ex.: res10_300x300_ssd do OpenCV)
+
+    A rede recebe quadros BGR redimensionados para input_size e produz
+    detecções no formato SSD [imagem, classe, confiança, x1, y1, x2, y2]
+    com coordenadas relativas. Vários quadros podem ser processados em uma
+    única inferência com detect_batch.
+    """
+
+    def __init__(self, model_path, config_path=None, input_size=(300, 300),
+                 confidence=0.6, mean=(104.0, 177.0, 123.0), swap_rb=False):
+        """Carrega o modelo do detector"""
+        self.net = _load_net(model_path, config_path)
+        self.input_size = tuple(input_size)
+        self.confidence = float(confidence)
+        self.mean = tuple(mean)
+        self.swap_rb = bool(swap_rb)
+        self._lock = threading.Lock()
+
+    def detect(self, gray, frame=None):
+        """Detecta faces em um quadro e retorna as caixas (x, y, w, h)"""
+        if frame is None:
+            frame = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        return self.detect_batch([frame])[0]
+
+    def detect_batch(self, frames):
+        """Detecta faces em vários quadros com uma única inferência"""
+        blob = cv2.dnn.blobFromImages(frames, 1.0, self.input_size, self.mean, self.swap_rb, False)
+        with self._lock:
+            self.net.setInput(blob)
+            detections = self.net.forward().reshape(-1, 7)
+
+        results = []
+        for index, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            rows = detections[(detections[:, 0] == index) & (detections[:, 2] >= self.confidence)]
+            corners = np.clip(rows[:, 3:7], 0.0, 1.0) * np.array([width, height, width, height])
+            boxes = corners.astype(np.int32)
+            boxes[:, 2:] -= boxes[:, :2]
+            results.append(boxes[(boxes[:, 2] > 0) & (boxes[:, 3] > 0)])
+        return results
+
+
+class LandmarkAligner:
+    """Alinha recortes de face pelos 5 pontos do YuNet (olhos, nariz, boca)
+
+    O YuNet roda só na região de cada caixa (com margem), então funciona
+    com qualquer detector; FaceRecognizerSF.alignCrop gera o recorte de
+    112x112 no enquadramento em que o SFace foi treinado (e para o qual
+    vale o limiar 0.363).
+    """
+
+    def __init__(self, landmark_model, embedder_model, score_threshold=0.6, margin=0.25):
+        """Carrega o YuNet e o alinhador do SFace"""
+        self.detector = cv2.FaceDetectorYN.create(str(landmark_model), "", (320, 320),
+                                                  float(score_threshold))
+        self.recognizer = cv2.FaceRecognizerSF.create(str(embedder_model), "")
+        self.margin = float(margin)
+        self._lock = threading.Lock()
+
+    def align(self, frame, box):
+        """Recorte alinhado da face na caixa (x, y, w, h), ou None sem landmarks"""
+        x, y, w, h = (int(v) for v in box)
+        pad = int(max(w, h) * self.margin)
+        height, width = frame.shape[:2]
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(width, x + w + pad), min(height, y + h + pad)
+        roi = frame[y0:y1, x0:x1]
+        if roi.size == 0:
+            return None
+
+        with self._lock:
+            self.detector.setInputSize((roi.shape[1], roi.shape[0]))
+            _, faces = self.detector.detect(roi)
+            if faces is None or len(faces) == 0:
+                return None
+            # A face de maior confiança na região é a da caixa
+            return self.recognizer.alignCrop(roi, faces[np.argmax(faces[:, -1])])
+
+
+class DNNEmbedder(FaceDescriptor):
+    """Descritor por rede de embedding (ex.: SFace/ArcFace em ONNX)
+
+    As faces são recortadas do quadro colorido (alinhadas pelos landmarks
+    quando há um aligner) e enviadas à rede em lotes de até batch_size; os
+    embeddings saem normalizados (norma L2 = 1).
+    """
+
+    name = "dnn"
+    version = 1
+
+    def __init__(self, model_path, input_size=(112, 112), scale=1.0, mean=(0.0, 0.0, 0.0),
+                 swap_rb=True, threshold=0.363, batch_size=8, aligner=None):
+        """Carrega o modelo de embedding"""
+        super().__init__()
+        self.net = _load_net(model_path)
+        self.aligner = aligner
+        self.model_name = Path(model_path).stem
+        self.face_size = tuple(input_size)
+        self.scale = float(scale)
+        self.mean = tuple(mean)
+        self.swap_rb = bool(swap_rb)
+        self.batch_size = max(1, int(batch_size))
+        self.default_threshold = float(threshold)
+
+        # Descobrir a dimensão do embedding com uma inferência de teste
+        probe = np.zeros((self.face_size[1], self.face_size[0], 3), dtype=np.uint8)
+        self.dim = self._forward([probe]).shape[1]
+
+    @property
+    def key(self):
+        # Templates alinhados e não alinhados não são comparáveis
+        aligned = "-aligned" if self.aligner is not None else ""
+        return f"{self.name}-{self.model_name}{aligned}-v{self.version}"
+
+    def extract_batch(self, gray, boxes, frame=None):
+        """Extrai os embeddings de todas as faces de um quadro"""
+        if len(boxes) == 0:
+            return np.empty((0, self.dim), dtype=np.float32)
+        if frame is None:
+            frame = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+        crops = [self._crop(frame, box) for box in boxes]
+        embeddings = [self._forward(crops[start:start + self.batch_size])
+                      for start in range(0, len(crops), self.batch_size)]
+        return np.vstack(embeddings)
+
+    def _crop(self, frame, box):
+        """Recorte da face, alinhado quando possível"""
+        if self.aligner is not None:
+            aligned = self.aligner.align(frame, box)
+            if aligned is not None:
+                return aligned
+        x, y, w, h = box
+        return frame[y:y+h, x:x+w]
+
+    def _forward(self, crops):
+        """Executa a rede sobre um lote de recortes BGR"""
+        blob = cv2.dnn.blobFromImages(crops, self.scale, self.face_size, self.mean, self.swap_rb, False)
+        with self._lock:
+            self.net.setInput(blob)
+            output = self.net.forward()
+        output = output.reshape(len(crops), -1).astype(np.float32)
+        output /= np.linalg.norm(output, axis=1, keepdims=True) + 1e-10
+        return output
+
+
+def create_dnn_engine(settings):
+    """Cria o detector e o embedder DNN a partir de dnn_settings
+
+    Cada componente só é carregado se seu arquivo de modelo existir; o que
+    não puder ser carregado volta como None e o chamador usa o motor lite
+    (Haar + descritor configurado) no lugar.
+    """
+    detector = None
+    embedder = None
+
+    detector_model = settings.get('detector_model')
+    if detector_model and Path(detector_model).exists():
+        try:
+            detector = DNNFaceDetector(
+                detector_model,
+                settings.get('detector_config'),
+                input_size=settings.get('detector_input_size', (300, 300)),
+                confidence=settings.get('detector_confidence', 0.6),
+                mean=settings.get('detector_mean', (104.0, 177.0, 123.0)),
+                swap_rb=settings.get('detector_swap_rb', False))
+            print(f"✅ Detector DNN carregado: {Path(detector_model).name}")
+        except cv2.error as e:
+            print(f"⚠️ Erro ao carregar detector DNN, usando Haar: {e}")
+    else:
+        print(f"⚠️ Modelo do detector DNN não encontrado ({detector_model}), usando Haar")
+
+    embedder_model = settings.get('embedder_model')
+    if embedder_model and Path(embedder_model).exists():
+        aligner = None
+        landmark_model = settings.get('landmark_model')
+        if landmark_model and Path(landmark_model).exists():
+            try:
+                aligner = LandmarkAligner(landmark_model, embedder_model,
+                                          score_threshold=settings.get('landmark_confidence', 0.6))
+                print(f"✅ Alinhamento por landmarks: {Path(landmark_model).name}")
+            except cv2.error as e:
+                print(f"⚠️ Erro ao carregar modelo de landmarks, sem alinhamento: {e}")
+        else:
+            print(f"⚠️ Modelo de landmarks não encontrado ({landmark_model}): faces sem "
+                  f"alinhamento, o limiar do embedder pode precisar de ajuste")
+        try:
+            embedder = DNNEmbedder(
+                embedder_model,
+                input_size=settings.get('embedder_input_size', (112, 112)),
+                scale=settings.get('embedder_scale', 1.0),
+                mean=settings.get('embedder_mean', (0.0, 0.0, 0.0)),
+                swap_rb=settings.get('embedder_swap_rb', True),
+                threshold=settings.get('embedder_threshold', 0.363),
+                batch_size=settings.get('batch_size', 8),
+                aligner=aligner)
+            print(f"✅ Embedder DNN carregado: {Path(embedder_model).name} ({embedder.dim} dimensões)")
+        except cv2.error as e:
+            print(f"⚠️ Erro ao carregar embedder DNN, usando descritor configurado: {e}")
+    else:
+        print(f"⚠️ Modelo de embedding não encontrado ({embedder_model}), usando descritor configurado")
+
+    return detector, embedder
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Agendador de Quadros
+Escolhe dinamicamente a cada quantos quadros a detecção facial roda
+"""
+
+import math
+import threading
+import time
+
+
+class FrameScheduler:
+    """Intervalo adaptativo entre detecções (1 = todo quadro)
+
+    A cada quadro should_process() diz se a detecção deve rodar; depois de
+    rodar, report() informa quanto ela custou e se havia faces ou
+    movimento. Com médias móveis do custo da detecção e do intervalo entre
+    quadros, o intervalo é escolhido assim:
+
+    - orçamento de CPU: nunca menos que custo / (cpu_budget x intervalo),
+      para a detecção ocupar no máximo cpu_budget de um núcleo;
+    - ativo (faces ou movimento nos últimos active_hold_seconds): o menor
+      intervalo que o orçamento permitir, a partir de min_skip;
+    - ocioso: recua até max_skip, desde que uma face que apareça ainda
+      seja detectada dentro de latency_slo_ms (intervalo x período + custo),
+      e nunca abaixo de frame_skip do config.json;
+    - sobrecarregado: quando o orçamento exige mais que o SLO permite,
+      prevalece o orçamento.
+
+    Mudanças de estado são registradas no log e stats() expõe a decisão
+    atual para a barra de status.
+    """
+
+    SMOOTHING = 0.2  # Peso da amostra nova nas médias móveis
+
+    def __init__(self, frame_skip=2, enabled=True, cpu_budget=0.5, latency_slo_ms=500,
+                 min_skip=1, max_skip=10, active_hold_seconds=2.0, verbose=True):
+        """Configura o agendador"""
+        self.frame_skip = max(1, int(frame_skip))
+        self.enabled = bool(enabled)
+        self.cpu_budget = max(0.01, float(cpu_budget))
+        self.latency_slo = float(latency_slo_ms) / 1000
+        self.min_skip = max(1, int(min_skip))
+        self.max_skip = max(self.min_skip, int(max_skip))
+        self.active_hold = float(active_hold_seconds)
+        self.verbose = verbose
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Cria o agendador a partir de recognition_settings (frame_skip + scheduler)"""
+        settings = settings or {}
+        scheduler = settings.get('scheduler', {})
+        return cls(frame_skip=settings.get('frame_skip', 2),
+                   enabled=scheduler.get('enabled', False),
+                   cpu_budget=scheduler.get('cpu_budget', 0.5),
+                   latency_slo_ms=scheduler.get('latency_slo_ms', 500),
+                   min_skip=scheduler.get('min_skip', 1),
+                   max_skip=scheduler.get('max_skip', 10),
+                   active_hold_seconds=scheduler.get('active_hold_seconds', 2.0))
+
+    def reset(self):
+        """Volta ao intervalo base (ex.: ao reiniciar a captura)"""
+        with self._lock:
+            self.stride = self.frame_skip
+            self.state = "inicial"
+            self._countdown = 0
+            self._last_frame = None
+            self._frame_interval = None
+            self._cost = None
+            self._last_activity = None
+            self._frames = 0
+            self._processed = 0
+
+    def should_process(self, now=None):
+        """Chamado a cada quadro; True se a detecção deve rodar neste"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._last_frame is not None:
+                self._frame_interval = self._smooth(self._frame_interval, now - self._last_frame)
+            self._last_frame = now
+            self._frames += 1
+
+            if self._countdown > 0:
+                self._countdown -= 1
+                return False
+            self._countdown = self.stride - 1
+            self._processed += 1
+            return True
+
+    def report(self, seconds, faces=0, motion=False, now=None):
+        """Informa o custo da detecção e a atividade da cena
+
+        seconds=None indica que a detecção não rodou (ex.: barrada pelo gate
+        de movimento): só a atividade é atualizada.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if seconds is not None:
+                self._cost = self._smooth(self._cost, seconds)
+            if faces or motion:
+                self._last_activity = now
+            if self.enabled:
+                self._update(now)
+
+    def _update(self, now):
+        """Recalcula o intervalo e o estado a partir das médias atuais"""
+        if self._frame_interval is None or self._cost is None:
+            return
+        period = max(self._frame_interval, 1e-3)
+        budget_stride = max(1, math.ceil(self._cost / (self.cpu_budget * period)))
+        slo_stride = max(1, int((self.latency_slo - self._cost) / period))
+        active = self._last_activity is not None and now - self._last_activity < self.active_hold
+
+        if active:
+            stride, state = max(self.min_skip, budget_stride), "ativo"
+        else:
+            stride = max(self.frame_skip, min(self.max_skip, slo_stride))
+            stride, state = max(stride, budget_stride), "ocioso"
+        if budget_stride > max(slo_stride, self.min_skip):
+            state = "sobrecarregado"
+        stride = min(stride, max(self.max_skip, budget_stride))
+
+        if state != self.state and self.verbose:
+            print(f"⏱️ Agendador: {self.state} → {state}, detecção a cada {stride} quadro(s) "
+                  f"(custo {self._cost * 1000:.0f} ms, {1 / period:.0f} fps)")
+        if stride < self.stride:
+            self._countdown = min(self._countdown, stride - 1)
+        self.stride = stride
+        self.state = state
+
+    def _smooth(self, average, sample):
+        return sample if average is None else average + self.SMOOTHING * (sample - average)
+
+    def stats(self):
+        """Decisão atual e médias usadas para tomá-la"""
+        with self._lock:
+            period = self._frame_interval
+            return {
+                'enabled': self.enabled,
+                'state': self.state,
+                'stride': self.stride,
+                'fps': 1 / period if period else 0.0,
+                'cost_ms': 1000 * self._cost if self._cost is not None else 0.0,
+                'detection_cpu': (self._cost / (self.stride * period)
+                                  if period and self._cost is not None else 0.0),
+                'frames': self._frames,
+                'processed': self._processed,
+            }
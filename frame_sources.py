@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Fontes de Quadros
+Câmera, arquivo de vídeo, diretório de imagens, gerador sintético e
+reprodução de sessões gravadas atrás de uma mesma interface
+"""
+
+import json
+import time
+from pathlib import Path
+from urllib.parse import parse_qs
+import numpy as np
+import cv2
+
+from camera_discovery import CameraDiscovery, open_camera
+
+
+class FrameSource:
+    """Interface comum das fontes de quadros
+
+    Segue a mesma API usada do cv2.VideoCapture (read, isOpened, release),
+    de modo que os loops de captura aceitam qualquer fonte sem mudanças.
+    timestamp guarda o instante de captura (time.time()) do último quadro.
+    read(image) aceita um buffer de destino reaproveitável; fontes que não
+    conseguem usá-lo devolvem um array novo.
+    """
+
+    name = "source"
+
+    def __init__(self):
+        self.timestamp = None
+
+    def read(self, image=None):
+        """Retorna (ok, quadro BGR), gravando em image quando possível"""
+        raise NotImplementedError
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        """Libera os recursos da fonte"""
+
+    def describe(self):
+        """Descrição curta da fonte para logs e status"""
+        return self.name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class _Pacer:
+    """Espaça leituras para simular uma taxa de quadros"""
+
+    def __init__(self, fps=None):
+        self.interval = 1.0 / fps if fps else 0.0
+        self._next = None
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self._next is None:
+            self._next = now
+        elif self._next > now:
+            time.sleep(self._next - now)
+        self._next = max(self._next + self.interval, time.monotonic() - self.interval)
+
+
+class CameraSource(FrameSource):
+    """Câmera ao vivo (resultado de CameraDiscovery) com o modo configurado"""
+
+    name = "camera"
+
+    def __init__(self, info, capture_settings=None):
+        super().__init__()
+        self.info = info
+        self.cap = open_camera(info, capture_settings)
+
+    def read(self, image=None):
+        ret, frame = self.cap.read(image)
+        self.timestamp = time.time()
+        return ret, frame
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+    def describe(self):
+        return f"câmera {CameraDiscovery.describe(self.info)}"
+
+
+class VideoFileSource(FrameSource):
+    """Arquivo de vídeo, no ritmo original (realtime) ou o mais rápido possível"""
+
+    name = "video"
+
+    def __init__(self, path, realtime=False, loop=False):
+        super().__init__()
+        self.path = str(path)
+        self.loop = loop
+        self.cap = cv2.VideoCapture(self.path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if realtime else None
+        self._pacer = _Pacer(fps if fps and fps > 0 else None)
+
+    def read(self, image=None):
+        self._pacer.wait()
+        ret, frame = self.cap.read(image)
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(image)
+        self.timestamp = time.time()
+        return ret, frame
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+    def describe(self):
+        return f"vídeo {self.path}"
+
+
+class ImageDirectorySource(FrameSource):
+    """Imagens de um diretório em ordem alfabética"""
+
+    name = "images"
+    EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+
+    def __init__(self, directory, fps=None, loop=False):
+        super().__init__()
+        self.directory = Path(directory)
+        self.files = sorted(path for path in self.directory.iterdir()
+                            if path.suffix.lower() in self.EXTENSIONS) if self.directory.is_dir() else []
+        self.loop = loop
+        self.position = 0
+        self._pacer = _Pacer(fps)
+
+    def read(self, image=None):
+        if self.position >= len(self.files):
+            if not self.loop or not self.files:
+                return False, None
+            self.position = 0
+        self._pacer.wait()
+        frame = cv2.imread(str(self.files[self.position]))
+        self.position += 1
+        self.timestamp = time.time()
+        return frame is not None, frame
+
+    def isOpened(self):
+        return bool(self.files)
+
+    def describe(self):
+        return f"imagens {self.directory} ({len(self.files)})"
+
+
+class SyntheticSource(FrameSource):
+    """Gerador sintético com rostos (sprites) se movendo pelo quadro
+
+    Sem sprites informados, desenha rostos esquemáticos, e a sequência é
+    a mesma em qualquer máquina para uma mesma semente. Com
+    sprites="gallery", usa as imagens da galeria local (faces/) recortadas
+    na face detectada; o resultado então muda quando a galeria muda.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, width=640, height=480, faces=3, fps=None, frames=None, seed=0,
+                 sprites=None, sprite_size=120):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self.count = 0
+        self._pacer = _Pacer(fps)
+        rng = np.random.default_rng(seed)
+
+        if sprites == "gallery":
+            sprites = self.load_gallery_sprites()
+            if not sprites:
+                print("⚠️ Nenhuma face na galeria, usando rostos desenhados")
+        if not sprites:
+            sprites = [self.draw_face(sprite_size, rng) for _ in range(max(1, faces))]
+        self.sprites = [cv2.resize(sprite, (sprite_size, sprite_size)) for sprite in sprites]
+
+        limits = np.array([width - sprite_size, height - sprite_size], dtype=np.float32)
+        self.positions = rng.uniform(0, 1, (faces, 2)).astype(np.float32) * limits
+        self.velocities = rng.uniform(-6, 6, (faces, 2)).astype(np.float32)
+        self.limits = limits
+
+        # Fundo fixo com gradiente e ruído leve
+        gradient = np.linspace(60, 160, width, dtype=np.float32)[None, :, None]
+        noise = rng.normal(0, 8, (height, width, 3)).astype(np.float32)
+        self.background = np.clip(gradient + noise, 0, 255).astype(np.uint8)
+
+    @staticmethod
+    def load_gallery_sprites(faces_dir="faces", limit=10):
+        """Recorta as faces das imagens da galeria para usar como sprites"""
+        cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        sprites = []
+        for image_file in sorted(Path(faces_dir).rglob("*.jpg")):
+            if any(part.startswith('.') for part in image_file.parts):
+                continue
+            image = cv2.imread(str(image_file))
+            if image is None:
+                continue
+            found = cascade.detectMultiScale(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), 1.1, 4)
+            if len(found):
+                x, y, w, h = found[0]
+                # Margem para o detector reencontrar a face no quadro sintético
+                pad = w // 4
+                sprites.append(image[max(0, y - pad):y + h + pad, max(0, x - pad):x + w + pad])
+            if len(sprites) >= limit:
+                break
+        return sprites
+
+    @staticmethod
+    def draw_face(size, rng):
+        """Desenha um rosto esquemático (pele, olhos, boca)"""
+        sprite = np.full((size, size, 3), 200, dtype=np.uint8)
+        skin = tuple(int(v) for v in rng.integers(120, 220, 3))
+        center = (size // 2, size // 2)
+        cv2.ellipse(sprite, center, (size * 2 // 5, size // 2 - 4), 0, 0, 360, skin, -1)
+        for dx in (-size // 6, size // 6):
+            cv2.circle(sprite, (center[0] + dx, center[1] - size // 10), size // 14, (40, 40, 40), -1)
+        cv2.ellipse(sprite, (center[0], center[1] + size // 6), (size // 7, size // 18), 0, 0, 180, (60, 40, 120), 2)
+        return sprite
+
+    def read(self, image=None):
+        if self.frames is not None and self.count >= self.frames:
+            return False, None
+        self._pacer.wait()
+
+        if image is not None and image.shape == self.background.shape:
+            np.copyto(image, self.background)
+            frame = image
+        else:
+            frame = self.background.copy()
+        size = self.sprites[0].shape[0]
+        for i, (x, y) in enumerate(self.positions.astype(int)):
+            frame[y:y + size, x:x + size] = self.sprites[i % len(self.sprites)]
+
+        # Rebater nas bordas
+        self.positions += self.velocities
+        bounce = (self.positions < 0) | (self.positions > self.limits)
+        self.velocities[bounce] *= -1
+        np.clip(self.positions, 0, self.limits, out=self.positions)
+
+        self.count += 1
+        self.timestamp = time.time()
+        return True, frame
+
+    def describe(self):
+        return f"sintético {self.width}x{self.height} ({len(self.positions)} rostos)"
+
+
+class ReplaySource(FrameSource):
+    """Reprodução de uma sessão gravada (diretório com session.jsonl + JPEGs)
+
+    Cada linha de session.jsonl descreve um quadro: {"seq", "t", "file", ...}
+    com o instante de captura original em "t". speed=1 reproduz no ritmo
+    original, speed=2 duas vezes mais rápido e speed=0 sem esperas. O
+    registro do quadro atual fica em self.record (inclui as detecções
+    gravadas, quando existirem).
+    """
+
+    name = "replay"
+    INDEX_FILE = "session.jsonl"
+
+    def __init__(self, session_dir, speed=1.0, loop=False):
+        super().__init__()
+        self.session_dir = Path(session_dir)
+        self.speed = float(speed)
+        self.loop = loop
+        self.records = self.load_records(self.session_dir)
+        self.position = 0
+        self.record = None
+        self._start_wall = None
+        self._start_t = None
+
+    @classmethod
+    def load_records(cls, session_dir):
+        """Lê os registros de quadros da sessão em ordem de captura"""
+        records = []
+        index_file = Path(session_dir) / cls.INDEX_FILE
+        if not index_file.exists():
+            return records
+        with open(index_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Linha incompleta no fim da gravação
+                if (Path(session_dir) / record.get('file', '')).is_file():
+                    records.append(record)
+        records.sort(key=lambda record: record['t'])
+        return records
+
+    def read(self, image=None):
+        if self.position >= len(self.records):
+            if not self.loop or not self.records:
+                return False, None
+            self.position = 0
+            self._start_wall = None
+
+        record = self.records[self.position]
+        if self.speed > 0:
+            if self._start_wall is None:
+                self._start_wall = time.monotonic()
+                self._start_t = record['t']
+            due = self._start_wall + (record['t'] - self._start_t) / self.speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        frame = cv2.imread(str(self.session_dir / record['file']))
+        self.position += 1
+        self.record = record
+        self.timestamp = time.time()
+        return frame is not None, frame
+
+    def isOpened(self):
+        return bool(self.records)
+
+    def describe(self):
+        return f"sessão {self.session_dir} ({len(self.records)} quadros, {self.speed:g}x)"
+
+
+def parse_source_spec(spec):
+    """Separa 'tipo:argumento?opção=valor' em (tipo, argumento, opções)"""
+    spec, _, query = str(spec).partition('?')
+    kind, _, argument = spec.partition(':')
+    options = {key: values[-1] for key, values in parse_qs(query).items()}
+    return kind.strip().lower(), argument.strip(), options
+
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'sim')
+
+
+def create_frame_source(spec, camera_info=None):
+    """Cria uma fonte a partir de uma especificação textual
+
+    Exemplos:
+        camera                      câmera descoberta (ou camera_info)
+        camera:1                    câmera no índice 1
+        video:entrada.mp4?realtime=1&loop=1
+        images:capturas/?fps=10
+        synthetic?faces=5&fps=30&frames=300
+        synthetic?sprites=gallery   rostos recortados de faces/
+        replay:sessions/20250101_080000?speed=4
+    """
+    kind, argument, options = parse_source_spec(spec)
+    fps = float(options['fps']) if 'fps' in options else None
+    loop = _flag(options.get('loop', '0'))
+
+    if kind == 'camera':
+        if argument:
+            camera_info = {'index': int(argument), 'backend': None}
+        elif camera_info is None:
+            camera_info = CameraDiscovery.from_config().discover()
+            if camera_info is None:
+                return None
+        return CameraSource(camera_info)
+    if kind == 'video':
+        return VideoFileSource(argument, realtime=_flag(options.get('realtime', '0')), loop=loop)
+    if kind == 'images':
+        return ImageDirectorySource(argument, fps=fps, loop=loop)
+    if kind == 'synthetic':
+        return SyntheticSource(width=int(options.get('width', 640)), height=int(options.get('height', 480)),
+                               faces=int(options.get('faces', 3)), fps=fps,
+                               frames=int(options['frames']) if 'frames' in options else None,
+                               seed=int(options.get('seed', 0)),
+                               sprites="gallery" if options.get('sprites') == 'gallery' else None)
+    if kind == 'replay':
+        return ReplaySource(argument, speed=float(options.get('speed', 1.0)), loop=loop)
+
+    raise ValueError(f"Fonte de quadros desconhecida: {spec}")
+
+
+def load_frame_source_spec(config_file='config.json'):
+    """Fonte configurada em camera_settings.frame_source (None = câmera ao vivo)"""
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get('camera_settings', {}).get('frame_source')
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
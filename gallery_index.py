@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Índice Aproximado da Galeria
+Busca por vizinho mais próximo (IVF / k-means) para galerias muito grandes
+"""
+
+import copy
+import os
+import tempfile
+from pathlib import Path
+import numpy as np
+
+
+class IVFIndex:
+    """Índice de arquivo invertido (IVF) sobre os templates da galeria
+
+    Os templates (normalizados, de modo que o produto interno é a
+    similaridade de cosseno) são particionados por k-means esférico em
+    nlist listas. Uma busca compara a consulta apenas com os centróides e
+    depois com os templates das nprobe listas mais próximas: nprobe maior
+    aumenta a revocação e o custo (nprobe = nlist equivale à busca exata).
+
+    As linhas do índice são as posições dos templates na galeria. As
+    atribuições são salvas por nome de template, então recarregar a
+    galeria após um cadastro só compara os templates novos com os
+    centróides; keep_rows() remove templates renumerando as posições, como
+    as listas do FaceDetector.
+    """
+
+    VERSION = 1
+    CHUNK = 4096  # Linhas por bloco ao atribuir listas (limita memória)
+
+    def __init__(self, nlist=0, nprobe=8, iterations=10, seed=0):
+        """Configura o índice (nlist=0 escolhe ~sqrt(N) listas no treino)"""
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = None
+        self.trained_size = 0
+        self._list_rows = []
+        self._list_vectors = []
+        self.size = 0
+
+    @property
+    def dim(self):
+        return None if self.centroids is None else self.centroids.shape[1]
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-10)
+
+    def train(self, vectors):
+        """Calcula os centróides por k-means esférico sobre uma amostra"""
+        vectors = self._normalize(vectors)
+        count = len(vectors)
+        nlist = min(self.nlist or max(1, int(round(np.sqrt(count)))), count)
+        rng = np.random.default_rng(self.seed)
+
+        sample_size = min(count, nlist * 64)
+        sample = vectors[rng.choice(count, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.iterations):
+            assignments = self._nearest(sample, centroids)
+            order = np.argsort(assignments, kind='stable')
+            counts = np.bincount(assignments, minlength=nlist)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            filled = counts > 0
+            sums = np.add.reduceat(sample[order], starts[filled], axis=0)
+            centroids[filled] = self._normalize(sums)
+            # Listas vazias recebem um template aleatório da amostra
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                centroids[empty] = sample[rng.choice(sample_size, len(empty), replace=False)]
+
+        self.centroids = centroids
+        self.trained_size = count
+
+    def _nearest(self, vectors, centroids=None):
+        """Lista (centróide mais próximo) de cada vetor normalizado"""
+        centroids = self.centroids if centroids is None else centroids
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), self.CHUNK):
+            block = vectors[start:start + self.CHUNK]
+            assignments[start:start + self.CHUNK] = (block @ centroids.T).argmax(axis=1)
+        return assignments
+
+    def build(self, vectors, assignments=None):
+        """Distribui os templates nas listas (atribuições conhecidas são reaproveitadas)
+
+        assignments pode trazer a lista de cada template (-1 = desconhecida);
+        só os desconhecidos são comparados com os centróides.
+        """
+        vectors = self._normalize(vectors)
+        if assignments is None:
+            assignments = self._nearest(vectors)
+        else:
+            assignments = np.asarray(assignments, dtype=np.int32).copy()
+            unknown = np.flatnonzero((assignments < 0) | (assignments >= len(self.centroids)))
+            if len(unknown):
+                assignments[unknown] = self._nearest(vectors[unknown])
+
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=len(self.centroids))
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        self._list_rows = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        self._list_vectors = [vectors[rows] for rows in self._list_rows]
+        self.size = len(vectors)
+
+    def copy(self):
+        """Cópia independente das listas (para editar sem afetar buscas em curso)"""
+        index = copy.copy(self)
+        index._list_rows = list(self._list_rows)
+        index._list_vectors = list(self._list_vectors)
+        return index
+
+    def keep_rows(self, keep):
+        """Mantém apenas as linhas informadas (em ordem), renumerando-as"""
+        mapping = np.full(self.size, -1, dtype=np.int64)
+        mapping[np.asarray(keep, dtype=np.int64)] = np.arange(len(keep))
+        for list_id, rows in enumerate(self._list_rows):
+            new_rows = mapping[rows]
+            mask = new_rows >= 0
+            self._list_rows[list_id] = new_rows[mask]
+            self._list_vectors[list_id] = self._list_vectors[list_id][mask]
+        self.size = len(keep)
+
+    def assignments(self):
+        """Lista de cada linha da galeria"""
+        assignments = np.full(self.size, -1, dtype=np.int32)
+        for list_id, rows in enumerate(self._list_rows):
+            assignments[rows] = list_id
+        return assignments
+
+    def search(self, queries, nprobe=None):
+        """Retorna (linhas, similaridades) do template mais próximo de cada consulta"""
+        queries = self._normalize(queries)
+        nprobe = max(1, min(nprobe or self.nprobe, len(self.centroids)))
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+
+        best_rows = np.zeros(len(queries), dtype=np.int64)
+        best_similarities = np.full(len(queries), -1.0, dtype=np.float32)
+        for i, query in enumerate(queries):
+            for list_id in probes[i]:
+                if len(self._list_rows[list_id]) == 0:
+                    continue
+                scores = self._list_vectors[list_id] @ query
+                best = scores.argmax()
+                if scores[best] > best_similarities[i]:
+                    best_similarities[i] = scores[best]
+                    best_rows[i] = self._list_rows[list_id][best]
+        return best_rows, best_similarities
+
+    def save(self, path, names):
+        """Grava centróides e atribuições (por nome de template) de forma atômica"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, version=self.VERSION, centroids=self.centroids,
+                         trained_size=self.trained_size,
+                         names=np.array(names, dtype=str), assignments=self.assignments())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, nprobe=8):
+        """Carrega um índice salvo; retorna (índice, {nome: lista}) ou (None, {})"""
+        path = Path(path)
+        if not path.exists():
+            return None, {}
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data['version']) != cls.VERSION:
+                    return None, {}
+                index = cls(nlist=len(data['centroids']), nprobe=nprobe)
+                index.centroids = data['centroids'].astype(np.float32)
+                index.trained_size = int(data['trained_size'])
+                saved = dict(zip((str(name) for name in data['names']),
+                                 (int(list_id) for list_id in data['assignments'])))
+            return index, saved
+        except Exception as e:
+            print(f"⚠️ Índice da galeria inválido, recriando: {e}")
+            return None, {}
@@ -17,8 +17,11 @@ from pathlib import Path
 
 # Importar módulos do sistema
 from face_detector import FaceDetector
+from face_engines import configure_opencv_threads
 from report_generator import ReportGenerator
 from user_manager import UserManager
+from user_store import is_valid_user_id
+import startup_profile
 
 class DetfaceSystem:
     """Classe principal do sistema DETFACE"""
@@ -27,11 +30,22 @@ class DetfaceSystem:
         """Inicializa o sistema DETFACE"""
         self.setup_directories()
         self.load_config()
-        self.face_detector = FaceDetector()
+        self.face_detector = FaceDetector(load_gallery=False)
         self.report_generator = ReportGenerator()
         self.user_manager = UserManager()
+        self.face_detector.attach_user_manager(self.user_manager)
         self.running = False
         
+        # Galeria carregada em segundo plano: o menu aparece imediatamente
+        self.face_detector.start_gallery_loading(done_callback=self.on_gallery_loaded)
+        
+    def on_gallery_loaded(self, error):
+        """Registra o fim do carregamento da galeria (thread de fundo)"""
+        if error:
+            self.log_event(f"Erro ao carregar galeria: {error}", "ERROR")
+        else:
+            self.log_event(f"Galeria carregada: {self.face_detector.gallery_status_text()}")
+        
     def setup_directories(self):
         """Cria as pastas necessárias se não existirem"""
         directories = ['faces', 'logs', 'reports', 'backup']
@@ -81,7 +95,10 @@ class DetfaceSystem:
         print("              Controle de Presença e Permanência")
         print("="*60)
         print("\n🎯 OPÇÕES DISPONÍVEIS:")
-        print("1. 📹 Iniciar Reconhecimento Facial")
+        if self.face_detector.gallery_ready.is_set():
+            print("1. 📹 Iniciar Reconhecimento Facial")
+        else:
+            print(f"1. 📹 Iniciar Reconhecimento Facial (⏳ {self.face_detector.gallery_status_text()})")
         print("2. 👤 Cadastrar Novo Usuário")
         print("3. 📋 Listar Usuários Cadastrados")
         print("4. 📊 Gerar Relatório Semanal")
@@ -102,6 +119,9 @@ class DetfaceSystem:
             print("💡 Pressione 'q' para parar o reconhecimento")
             print("💡 Pressione 'SPACE' para capturar manualmente")
             
+            if not self.wait_for_gallery():
+                return
+                
             try:
                 self.face_detector.start_recognition()
                 self.log_event("Sistema de reconhecimento iniciado")
@@ -110,6 +130,26 @@ class DetfaceSystem:
                 self.log_event(error_msg, "ERROR")
                 print(f"❌ {error_msg}")
     
+    def wait_for_gallery(self):
+        """Aguarda a galeria mostrando o progresso; o reconhecimento inicia ao terminar
+        
+        Retorna False se o operador cancelar com Ctrl+C.
+        """
+        detector = self.face_detector
+        if detector.gallery_ready.is_set():
+            return True
+            
+        print("⏳ Galeria ainda carregando - o reconhecimento inicia automaticamente ao terminar "
+              "(Ctrl+C para voltar ao menu)")
+        try:
+            while not detector.gallery_ready.wait(0.5):
+                print(f"\r   {detector.gallery_status_text()}", end="", flush=True)
+        except KeyboardInterrupt:
+            print("\n↩️ Voltando ao menu")
+            return False
+        print(f"\r✅ {detector.gallery_status_text()}")
+        return True
+        
     def demo_recognition(self):
         """Simula o reconhecimento facial em modo demo"""
         print("\n🎮 MODO DEMO - Simulação de Reconhecimento Facial")
@@ -157,6 +197,9 @@ class DetfaceSystem:
         user_id = input("🆔 ID do usuário (opcional): ").strip()
         if not user_id:
             user_id = name.lower().replace(" ", "_")
+        if not is_valid_user_id(user_id):
+            print(f"❌ ID inválido: '{user_id}' (use letras, números, _ ou -)")
+            return
             
         if self.config.get("demo_mode", False):
             # Modo demo - não precisa capturar foto
@@ -331,9 +374,10 @@ class DetfaceSystem:
             # Backup das configurações
             shutil.copy2("config.json", f"{backup_dir}/config.json")
             
-            # Backup dos usuários
-            if os.path.exists("users.json"):
-                shutil.copy2("users.json", f"{backup_dir}/users.json")
+            # Backup dos usuários (snapshot + diário de alterações)
+            for users_file in ("users.json", "users.journal"):
+                if os.path.exists(users_file):
+                    shutil.copy2(users_file, f"{backup_dir}/{users_file}")
                 
             print(f"✅ Backup realizado em: {backup_dir}")
             self.log_event(f"Backup realizado: {backup_dir}")
@@ -437,6 +481,9 @@ class DetfaceSystem:
             except:
                 pass
                 
+        self.report_generator.shutdown()
+        self.face_detector.close()
+        self.user_manager.close()
         self.log_event("Sistema DETFACE encerrado")
         self.running = False
         print("✅ Sistema encerrado com sucesso!")
@@ -444,6 +491,9 @@ class DetfaceSystem:
 
 def main():
     """Função principal do sistema"""
+    # --profile-startup: mostra o custo de importação e encerra
+    startup_profile.run_if_requested("main")
+    configure_opencv_threads()
     try:
         system = DetfaceSystem()
         system.run()
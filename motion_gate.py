@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Gate de Movimento
+Evita rodar a detecção facial em cenas estáticas (corredor vazio)
+"""
+
+import threading
+import time
+import numpy as np
+import cv2
+
+
+class MotionGate:
+    """Decide se um quadro precisa passar pela detecção facial
+
+    O quadro em cinza é reduzido para width pixels de largura e comparado
+    com um fundo de média móvel (cv2.accumulateWeighted). Se a fração de
+    pixels que mudaram mais que pixel_threshold passar de min_changed, há
+    movimento e a detecção roda no mesmo quadro. Depois do movimento a
+    detecção continua por hold_seconds (a pessoa pode parar diante da
+    câmera) e, em cena estática, ainda roda a cada refresh_seconds para não
+    perder quem chegou devagar. O custo é de uma redução e algumas
+    operações em ~160x120 pixels por quadro.
+    """
+
+    def __init__(self, enabled=True, width=160, pixel_threshold=25, min_changed=0.01,
+                 learning_rate=0.05, hold_seconds=2.0, refresh_seconds=5.0):
+        """Configura o gate"""
+        self.enabled = bool(enabled)
+        self.width = int(width)
+        self.pixel_threshold = float(pixel_threshold)
+        self.min_changed = float(min_changed)
+        self.learning_rate = float(learning_rate)
+        self.hold_seconds = float(hold_seconds)
+        self.refresh_seconds = float(refresh_seconds)
+
+        self._lock = threading.Lock()
+        self._background = None
+        self._small = None
+        self._diff = None
+        self._last_motion = None
+        self._last_pass = None
+        self.last_motion = False  # Se o último quadro avaliado tinha movimento
+        self.reset_stats()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Cria o gate a partir de recognition_settings.motion_gate"""
+        settings = settings or {}
+        return cls(enabled=settings.get('enabled', False),
+                   width=settings.get('width', 160),
+                   pixel_threshold=settings.get('pixel_threshold', 25),
+                   min_changed=settings.get('min_changed', 0.01),
+                   learning_rate=settings.get('learning_rate', 0.05),
+                   hold_seconds=settings.get('hold_seconds', 2.0),
+                   refresh_seconds=settings.get('refresh_seconds', 5.0))
+
+    def reset_stats(self):
+        """Zera os contadores de quadros avaliados"""
+        self._evaluated = 0
+        self._passed = 0
+        self._motion = 0
+        self._busy = 0.0
+
+    def reset(self):
+        """Descarta o fundo aprendido (ex.: ao trocar de câmera)"""
+        with self._lock:
+            self._background = None
+            self._last_motion = None
+            self._last_pass = None
+
+    def should_detect(self, gray, now=None):
+        """Retorna True se o quadro (em cinza) deve passar pela detecção"""
+        if not self.enabled:
+            return True
+        now = time.monotonic() if now is None else now
+        started = time.perf_counter()
+
+        with self._lock:
+            height, width = gray.shape[:2]
+            size = (self.width, max(1, round(height * self.width / width)))
+            if self._small is None or self._small.shape[::-1] != size:
+                self._small = np.empty(size[::-1], dtype=np.uint8)
+                self._diff = np.empty(size[::-1], dtype=np.uint8)
+                self._background = None
+            cv2.resize(gray, size, dst=self._small, interpolation=cv2.INTER_AREA)
+
+            if self._background is None:
+                # Primeiro quadro: vira a referência (e passa por não haver detecção anterior)
+                self._background = self._small.astype(np.float32)
+                motion = False
+            else:
+                background = cv2.convertScaleAbs(self._background)
+                cv2.absdiff(self._small, background, dst=self._diff)
+                changed = np.count_nonzero(self._diff > self.pixel_threshold) / self._diff.size
+                motion = changed >= self.min_changed
+                cv2.accumulateWeighted(self._small, self._background, self.learning_rate)
+
+            self.last_motion = motion
+            if motion:
+                self._last_motion = now
+            passed = (motion or
+                      (self._last_motion is not None and now - self._last_motion < self.hold_seconds) or
+                      self._last_pass is None or
+                      now - self._last_pass >= self.refresh_seconds)
+            if passed:
+                self._last_pass = now
+
+            self._evaluated += 1
+            self._passed += passed
+            self._motion += motion
+            self._busy += time.perf_counter() - started
+        return passed
+
+    def stats(self, reset=False):
+        """Contadores do gate: quadros avaliados, detectados, ignorados e taxas"""
+        with self._lock:
+            evaluated = self._evaluated
+            stats = {
+                'enabled': self.enabled,
+                'evaluated': evaluated,
+                'detected': self._passed,
+                'skipped': evaluated - self._passed,
+                'motion_frames': self._motion,
+                'skip_rate': (evaluated - self._passed) / evaluated if evaluated else 0.0,
+                'ms_per_frame': 1000 * self._busy / evaluated if evaluated else 0.0,
+            }
+            if reset:
+                self.reset_stats()
+        return stats
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Renderização do Preview da Câmera
+Troca de quadros entre a thread de captura e o loop principal do Tk
+"""
+
+import threading
+import time
+import numpy as np
+import cv2
+from PIL import Image, ImageTk
+
+
+class LatestFrameSlot:
+    """Guarda apenas o quadro mais recente produzido pela thread de captura
+
+    A thread de captura sobrescreve o quadro a cada leitura e o loop de
+    renderização do Tk pega o mais novo quando estiver pronto, descartando
+    os intermediários em vez de acumular atraso.
+
+    get() transfere o quadro ao consumidor, que o devolve quando terminar
+    de usá-lo. Quadros substituídos ou limpos antes de serem consumidos vão
+    para discard (ex.: devolver o buffer ao pool), de modo que um buffer só
+    é reaproveitado quando ninguém mais o lê, por mais que o Tk atrase.
+    """
+
+    def __init__(self, discard=None):
+        """Inicializa o slot vazio"""
+        self._lock = threading.Lock()
+        self._frames = None
+        self._sequence = 0
+        self._discard = discard
+
+    def put(self, frames):
+        """Publica um novo quadro (chamado pela thread de captura)"""
+        with self._lock:
+            previous, self._frames = self._frames, frames
+            self._sequence += 1
+        self._drop(previous)
+
+    def get(self, last_sequence):
+        """Retorna (sequência, quadro) se houver quadro mais novo que last_sequence
+
+        O quadro retornado sai do slot e passa a pertencer ao chamador.
+        """
+        with self._lock:
+            if self._frames is None or self._sequence == last_sequence:
+                return last_sequence, None
+            frames, self._frames = self._frames, None
+            return self._sequence, frames
+
+    def clear(self):
+        """Descarta o quadro atual"""
+        with self._lock:
+            previous, self._frames = self._frames, None
+        self._drop(previous)
+
+    def _drop(self, frames):
+        """Entrega a discard um quadro que não chegou a ser consumido"""
+        if frames is not None and self._discard is not None:
+            self._discard(frames)
+
+
+class PreviewFrame:
+    """Quadro de preview convertido para RGB uma única vez
+
+    O quadro BGR da câmera é reduzido e convertido para RGB apenas uma vez,
+    no tamanho base; tamanhos menores são derivados dessa imagem
+    intermediária em vez de repetir o trabalho sobre o quadro original.
+    Com um BufferPool, a imagem base é gravada em um buffer do pool
+    (redução com dst= e conversão RGB no próprio buffer), devolvido por
+    release() quando o quadro não for mais usado.
+    """
+
+    def __init__(self, frame_bgr, base_size, pool=None):
+        """Reduz e converte o quadro para o tamanho base (largura, altura)"""
+        self.base_size = tuple(base_size)
+        width, height = self.base_size
+        base = pool.acquire((height, width, 3)) if pool is not None else None
+        resized = cv2.resize(frame_bgr, self.base_size, dst=base, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=resized)
+        self._images = {self.base_size: resized}
+        self._pool = pool
+
+    def release(self):
+        """Devolve a imagem base ao pool; o quadro não deve mais ser usado"""
+        if self._pool is not None:
+            self._pool.release(self._images.get(self.base_size))
+            self._pool = None
+        self._images = {}
+
+    def for_size(self, size, out=None):
+        """Retorna a imagem RGB no tamanho pedido
+
+        Com out, a redução é gravada nesse buffer (sem guardar no cache).
+        """
+        size = tuple(size)
+        if size == self.base_size:
+            return self._images[size]
+        if out is not None:
+            return cv2.resize(self._images[self.base_size], size, dst=out, interpolation=cv2.INTER_AREA)
+        if size not in self._images:
+            self._images[size] = cv2.resize(self._images[self.base_size], size,
+                                            interpolation=cv2.INTER_AREA)
+        return self._images[size]
+
+
+class PreviewStats:
+    """Mede o custo do preview para exibição na barra de status
+
+    Soma o tempo gasto preparando e desenhando quadros (em qualquer thread)
+    e o compara com o tempo decorrido e com o tempo de CPU do processo.
+    """
+
+    def __init__(self):
+        """Inicia uma janela de medição"""
+        self._lock = threading.Lock()
+        self._reset(time.perf_counter(), time.process_time())
+
+    def _reset(self, wall, cpu):
+        self._busy = 0.0
+        self._frames = 0
+        self._wall_start = wall
+        self._cpu_start = cpu
+
+    def add(self, seconds, rendered=False):
+        """Acumula tempo gasto no preview; rendered=True conta um quadro exibido"""
+        with self._lock:
+            self._busy += seconds
+            if rendered:
+                self._frames += 1
+
+    def elapsed(self):
+        """Segundos desde o início da janela de medição"""
+        return time.perf_counter() - self._wall_start
+
+    def snapshot(self):
+        """Retorna as métricas da janela atual e inicia uma nova"""
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        with self._lock:
+            elapsed = max(wall - self._wall_start, 1e-6)
+            stats = {
+                'fps': self._frames / elapsed,
+                'ms_per_frame': 1000 * self._busy / self._frames if self._frames else 0.0,
+                'preview_cpu': 100 * self._busy / elapsed,
+                'process_cpu': 100 * (cpu - self._cpu_start) / elapsed,
+            }
+            self._reset(wall, cpu)
+        return stats
+
+
+class CanvasImage:
+    """Imagem exibida em um canvas Tk reaproveitando o mesmo item
+
+    O PhotoImage e o item do canvas são criados uma única vez; os quadros
+    seguintes apenas atualizam os pixels com PhotoImage.paste.
+    """
+
+    def __init__(self, canvas, size):
+        """Associa a imagem a um canvas de tamanho (largura, altura)"""
+        self.canvas = canvas
+        self.size = size
+        self.photo = None
+        self.item = None
+        self._buffer = None
+
+    def show_preview(self, preview):
+        """Exibe um PreviewFrame reduzindo-o para um buffer próprio do canvas"""
+        width, height = self.size
+        if self._buffer is None or self._buffer.shape != (height, width, 3):
+            self._buffer = np.empty((height, width, 3), dtype=np.uint8)
+        self.show(preview.for_size(self.size, out=self._buffer))
+
+    def show(self, frame_rgb):
+        """Exibe um quadro RGB já no tamanho do canvas"""
+        image = Image.fromarray(frame_rgb)
+        if self.photo is None or self.item is None:
+            self.photo = ImageTk.PhotoImage(image)
+            self.canvas.delete("all")
+            self.item = self.canvas.create_image(self.size[0] // 2, self.size[1] // 2,
+                                                 image=self.photo)
+        else:
+            self.photo.paste(image)
+
+    def reset(self):
+        """Esquece o item atual (após o canvas ser limpo)"""
+        self.item = None
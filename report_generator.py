@@ -4,29 +4,98 @@ DETFACE - Gerador de Relatórios
 Responsável por gerar relatórios em CSV e PDF dos registros de presença
 """
 
-import pandas as pd
 import datetime
 from pathlib import Path
 import os
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
 import json
+import threading
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+
+def _render_report_part(part, data, filepath, start_date, end_date, period_type):
+    """Renderiza uma parte do relatório (executado em processo separado)
+
+    Retorna (parte, arquivo, arquivos extras); os extras são os volumes
+    do PDF quando os registros são divididos.
+    """
+    generator = ReportGenerator()
+    extra_files = []
+    if part == 'csv':
+        generator.generate_csv_report(data, filepath, start_date, end_date, period_type)
+    elif part == 'xlsx':
+        generator.generate_xlsx_report(data, filepath, start_date, end_date, period_type)
+    elif part == 'pdf':
+        extra_files = generator.generate_pdf_report(data, filepath, start_date, end_date,
+                                                    period_type) or []
+    return part, str(filepath), extra_files
+
+
+class ReportJob:
+    """Representa uma geração de relatório executada em segundo plano"""
+
+    def __init__(self, job_id, start_date, end_date, period_type, users=None):
+        self.job_id = job_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.period_type = period_type
+        self.users = users
+        self.status = "pendente"  # pendente, executando, concluido, erro
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.cached = False
+        self._done = threading.Event()
+
+    def is_done(self):
+        """Indica se o job já terminou (com sucesso ou erro)"""
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Aguarda o término do job e retorna o resultado"""
+        self._done.wait(timeout)
+        return self.result
+
 
 class ReportGenerator:
     """Classe responsável pela geração de relatórios"""
     
+    REPORT_PARTS = ('csv', 'xlsx', 'pdf')
+    EXCEL_MAX_ROWS = 1048576  # Limite de linhas por planilha do Excel
+    STREAMING_XLSX_THRESHOLD = 50000  # Acima disso usa escrita contínua
+    PDF_TABLE_ROWS = 40  # Linhas por tabela (aprox. uma página A4)
+    # report_settings que mudam o conteúdo dos arquivos (entram na chave do cache)
+    OUTPUT_SETTINGS = ('max_records_per_pdf', 'split_pdf_volumes', 'records_per_pdf_volume',
+                       'include_photos_in_reports')
+    
+    _detailed_table_style = None
+    
     def __init__(self):
         """Inicializa o gerador de relatórios"""
         self.reports_dir = Path("reports")
         self.reports_dir.mkdir(exist_ok=True)
         self.attendance_file = "registro_presenca.csv"
-        
+        self.report_settings = self.load_report_settings()
+        self.cache_file = self.reports_dir / "cache_index.json"
+        self._cache_lock = threading.Lock()
+        self._report_cache = None
+        self._executor = None
+        self._job_counter = itertools.count(1)
+        
+    def load_report_settings(self):
+        """Carrega as configurações de relatório do config.json"""
+        try:
+            with open('config.json', 'r', encoding='utf-8') as f:
+                return json.load(f).get('report_settings', {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+            
     def load_attendance_data(self):
         """Carrega os dados de presença do arquivo CSV"""
+        import pandas as pd
         if not os.path.exists(self.attendance_file):
             return pd.DataFrame()
             
@@ -39,17 +108,14 @@ class ReportGenerator:
             print(f"❌ Erro ao carregar dados: {str(e)}")
             return pd.DataFrame()
             
-    def generate_weekly_report(self):
-        """Gera relatório da última semana"""
-        # Calcular período da última semana
+    def get_weekly_period(self):
+        """Retorna o período (início, fim) da última semana"""
         end_date = datetime.date.today()
         start_date = end_date - datetime.timedelta(days=7)
+        return start_date, end_date
         
-        return self.generate_period_report(start_date, end_date, "semanal")
-        
-    def generate_monthly_report(self):
-        """Gera relatório do último mês"""
-        # Calcular período do último mês
+    def get_monthly_period(self):
+        """Retorna o período (início, fim) do último mês"""
         end_date = datetime.date.today()
         start_date = end_date.replace(day=1)  # Primeiro dia do mês atual
         
@@ -58,60 +124,330 @@ class ReportGenerator:
             # Último dia do mês anterior
             end_date = start_date - datetime.timedelta(days=1)
             start_date = end_date.replace(day=1)
+            
+        return start_date, end_date
+        
+    def generate_weekly_report(self):
+        """Gera relatório da última semana"""
+        start_date, end_date = self.get_weekly_period()
+        return self.generate_period_report(start_date, end_date, "semanal")
         
+    def generate_monthly_report(self):
+        """Gera relatório do último mês"""
+        start_date, end_date = self.get_monthly_period()
         return self.generate_period_report(start_date, end_date, "mensal")
         
-    def generate_period_report(self, start_date, end_date, period_type):
+    def generate_period_report(self, start_date, end_date, period_type, users=None):
         """Gera relatório para um período específico"""
+        job = self.submit_period_report(start_date, end_date, period_type, users)
+        result = job.wait()
+        
+        if job.error:
+            raise RuntimeError(job.error)
+        if not result:
+            return None, None
+            
+        return result['csv'], result['pdf']
+        
+    def get_data_version(self):
+        """Retorna identificador da versão atual do arquivo de presença"""
+        try:
+            stat = os.stat(self.attendance_file)
+            return f"{stat.st_mtime_ns}-{stat.st_size}"
+        except OSError:
+            return "0-0"
+            
+    def load_period_data(self, start_date, end_date, users=None):
+        """Carrega os registros do período, opcionalmente filtrados por usuários"""
         df = self.load_attendance_data()
         
         if df.empty:
             print("❌ Nenhum dado de presença encontrado")
-            return None, None
+            return None
             
         # Filtrar dados pelo período
         mask = (df['Data'].dt.date >= start_date) & (df['Data'].dt.date <= end_date)
         period_data = df[mask].copy()
         
+        # Filtrar por usuários se especificado
+        if users:
+            period_data = period_data[period_data['ID_Usuario'].isin(users)]
+            
         if period_data.empty:
             print(f"❌ Nenhum registro encontrado para o período {start_date} a {end_date}")
-            return None, None
+            return None
             
-        # Gerar relatórios
+        return period_data
+        
+    def submit_period_report(self, start_date, end_date, period_type, users=None,
+                             progress_callback=None, done_callback=None):
+        """Agenda a geração do relatório em segundo plano e retorna o job
+        
+        CSV, XLSX e PDF são renderizados em paralelo em processos separados.
+        progress_callback(progresso, mensagem) e done_callback(job) são
+        chamados a partir da thread do job, não da thread da interface.
+        """
+        job = ReportJob(next(self._job_counter), start_date, end_date, period_type,
+                        sorted(users) if users else None)
+        
+        thread = threading.Thread(target=self._run_report_job,
+                                  args=(job, progress_callback, done_callback),
+                                  daemon=True)
+        thread.start()
+        return job
+        
+    def _run_report_job(self, job, progress_callback, done_callback):
+        """Executa um job de relatório"""
+        def report_progress(progress, message):
+            job.progress = progress
+            job.message = message
+            if progress_callback:
+                try:
+                    progress_callback(progress, message)
+                except Exception as e:
+                    print(f"Erro no callback de progresso: {e}")
+        
+        job.status = "executando"
+        try:
+            # Os processos de renderização leem o config.json atual
+            self.report_settings = self.load_report_settings()
+            data_version = self.get_data_version()
+            cache_key = self._make_cache_key(job, data_version)
+            
+            cached = self._get_cached_report(cache_key)
+            if cached:
+                job.cached = True
+                job.result = cached
+                report_progress(1.0, "Relatório recuperado do cache")
+            else:
+                report_progress(0.05, "Carregando registros...")
+                period_data = self.load_period_data(job.start_date, job.end_date, job.users)
+                
+                if period_data is None:
+                    report_progress(1.0, "Nenhum registro encontrado")
+                else:
+                    job.result = self._render_report_parts(job, period_data, report_progress)
+                    self._store_cached_report(cache_key, job.result)
+                    report_progress(1.0, "Relatório concluído")
+                    
+            job.status = "concluido"
+        except Exception as e:
+            job.status = "erro"
+            job.error = str(e)
+            job.message = f"Erro ao gerar relatório: {e}"
+            print(f"❌ {job.message}")
+        finally:
+            job._done.set()
+            if done_callback:
+                try:
+                    done_callback(job)
+                except Exception as e:
+                    print(f"Erro no callback de conclusão: {e}")
+                    
+    def _render_report_parts(self, job, period_data, report_progress):
+        """Renderiza CSV, XLSX e PDF em paralelo"""
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        csv_filename = f"relatorio_{period_type}_{timestamp}.csv"
-        pdf_filename = f"relatorio_{period_type}_{timestamp}.pdf"
+        base_name = f"relatorio_{job.period_type}_{timestamp}_{job.job_id}"
+        paths = {part: self.reports_dir / f"{base_name}.{part}" for part in self.REPORT_PARTS}
         
-        csv_path = self.reports_dir / csv_filename
-        pdf_path = self.reports_dir / pdf_filename
-        
-        # Gerar CSV
-        self.generate_csv_report(period_data, csv_path, start_date, end_date, period_type)
-        
-        # Gerar PDF
-        self.generate_pdf_report(period_data, pdf_path, start_date, end_date, period_type)
-        
-        return str(csv_path), str(pdf_path)
+        result = {}
+        executor = None
+        pool_error = None
+        try:
+            executor = self._get_executor()
+            futures = [
+                executor.submit(_render_report_part, part, period_data, paths[part],
+                                job.start_date, job.end_date, job.period_type)
+                for part in self.REPORT_PARTS
+            ]
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            # Sem suporte a processos (ex.: ambiente restrito)
+            pool_error = e
+        else:
+            try:
+                for future in as_completed(futures):
+                    part, path, extra_files = future.result()
+                    result[part] = path
+                    if extra_files:
+                        result[f"{part}_volumes"] = extra_files
+                    done = sum(1 for name in self.REPORT_PARTS if name in result)
+                    report_progress(0.1 + 0.9 * done / len(self.REPORT_PARTS),
+                                    f"{part.upper()} gerado")
+            except BrokenProcessPool as e:
+                # Processo de trabalho encerrado; erros da renderização em si
+                # chegam com o tipo original e são propagados
+                pool_error = e
+                
+        if pool_error is not None:
+            print(f"⚠️ Geração paralela indisponível ({pool_error}), gerando sequencialmente")
+            self._discard_executor(executor)
+            for part in self.REPORT_PARTS:
+                if part not in result:
+                    _, result[part], extra_files = _render_report_part(
+                        part, period_data, paths[part], job.start_date, job.end_date,
+                        job.period_type)
+                    if extra_files:
+                        result[f"{part}_volumes"] = extra_files
+                    done = sum(1 for name in self.REPORT_PARTS if name in result)
+                    report_progress(0.1 + 0.9 * done / len(self.REPORT_PARTS),
+                                    f"{part.upper()} gerado")
+                    
+        return result
+        
+    def _get_executor(self):
+        """Retorna o pool de processos usado na renderização
+        
+        Os processos são iniciados com "spawn": um fork do processo das
+        interfaces (captura, gravação adiada e galeria em outras threads)
+        pode herdar locks ocupados e travar.
+        """
+        with self._cache_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=len(self.REPORT_PARTS),
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+        
+    def _discard_executor(self, executor):
+        """Encerra um pool quebrado para que o próximo job crie outro"""
+        with self._cache_lock:
+            if executor is not None and self._executor is executor:
+                self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            
+    def shutdown(self):
+        """Finaliza o pool de processos de renderização"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            
+    def _make_cache_key(self, job, data_version):
+        """Monta a chave de cache (período, filtro de usuários, versão dos dados
+        e as configurações de report_settings que mudam os arquivos gerados)"""
+        users = ",".join(str(user) for user in job.users) if job.users else "*"
+        settings = ",".join(f"{name}={self.report_settings.get(name)}"
+                            for name in self.OUTPUT_SETTINGS)
+        return f"{job.period_type}|{job.start_date}|{job.end_date}|{users}|{data_version}|{settings}"
+        
+    def _load_report_cache(self):
+        """Carrega o índice de relatórios já gerados"""
+        if self._report_cache is None:
+            self._report_cache = {}
+            if self.cache_file.exists():
+                try:
+                    with open(self.cache_file, 'r', encoding='utf-8') as f:
+                        self._report_cache = json.load(f)
+                except (json.JSONDecodeError, OSError):
+                    self._report_cache = {}
+        return self._report_cache
+        
+    def _get_cached_report(self, cache_key):
+        """Retorna os arquivos de um relatório em cache, se ainda existirem"""
+        with self._cache_lock:
+            cached = self._load_report_cache().get(cache_key)
+            if cached and self._report_files_exist(cached):
+                return dict(cached)
+            return None
+            
+    @staticmethod
+    def _report_files_exist(result):
+        """True se todos os arquivos do relatório existem (incluindo volumes do PDF)"""
+        paths = []
+        for value in result.values():
+            paths.extend(value if isinstance(value, list) else [value])
+        return all(os.path.exists(path) for path in paths)
+        
+    def _store_cached_report(self, cache_key, result):
+        """Guarda os arquivos gerados no índice de cache"""
+        with self._cache_lock:
+            cache = self._load_report_cache()
+            cache[cache_key] = result
+            
+            # Descartar entradas cujos arquivos não existem mais
+            for key in [k for k, v in cache.items() if not self._report_files_exist(v)]:
+                del cache[key]
+                
+            try:
+                with open(self.cache_file, 'w', encoding='utf-8') as f:
+                    json.dump(cache, f, indent=4, ensure_ascii=False)
+            except OSError as e:
+                print(f"⚠️ Não foi possível salvar o cache de relatórios: {e}")
+        
+    def get_detailed_report(self, data):
+        """Retorna os registros detalhados ordenados por data e hora"""
+        detailed_report = data[['Data', 'Hora', 'Nome', 'ID_Usuario', 'Tipo']].copy()
+        return detailed_report.sort_values(['Data', 'Hora'])
         
     def generate_csv_report(self, data, filepath, start_date, end_date, period_type):
         """Gera relatório em formato CSV"""
-        # Criar relatório detalhado
-        detailed_report = data[['Data', 'Hora', 'Nome', 'ID_Usuario', 'Tipo']].copy()
-        detailed_report = detailed_report.sort_values(['Data', 'Hora'])
+        detailed_report = self.get_detailed_report(data)
+        detailed_report.to_csv(filepath, index=False, encoding='utf-8')
+        
+    def generate_xlsx_report(self, data, filepath, start_date, end_date, period_type,
+                             streaming=None):
+        """Gera relatório em formato XLSX com abas detalhada e de resumo
+        
+        Com streaming=None o modo de escrita contínua é escolhido
+        automaticamente para relatórios grandes.
+        """
+        import pandas as pd
+        detailed_report = self.get_detailed_report(data)
         
         # Criar resumo por usuário
         summary = self.create_user_summary(data)
         
-        # Salvar CSV com múltiplas abas (sheets)
-        with pd.ExcelWriter(str(filepath).replace('.csv', '.xlsx'), engine='openpyxl') as writer:
+        if streaming is None:
+            streaming = len(detailed_report) > self.STREAMING_XLSX_THRESHOLD
+            
+        if streaming:
+            self.write_streaming_xlsx(detailed_report, summary, filepath)
+            return
+            
+        with pd.ExcelWriter(str(filepath), engine='openpyxl') as writer:
             detailed_report.to_excel(writer, sheet_name='Detalhado', index=False)
             summary.to_excel(writer, sheet_name='Resumo', index=False)
             
-        # Salvar também em CSV simples
-        detailed_report.to_csv(filepath, index=False, encoding='utf-8')
+    def write_streaming_xlsx(self, detailed_report, summary, filepath):
+        """Escreve o XLSX em modo write-only (memória constante)
+        
+        A aba 'Detalhado' é dividida em 'Detalhado_2', 'Detalhado_3'...
+        sempre que atinge o limite de linhas do Excel.
+        """
+        import pandas as pd
+        from openpyxl import Workbook
+        
+        workbook = Workbook(write_only=True)
+        columns = list(detailed_report.columns)
+        rows_per_sheet = self.EXCEL_MAX_ROWS - 1  # Uma linha para o cabeçalho
+        
+        sheet = None
+        sheet_rows = 0
+        sheet_number = 0
+        for row in detailed_report.itertuples(index=False, name=None):
+            if sheet is None or sheet_rows >= rows_per_sheet:
+                sheet_number += 1
+                sheet_name = 'Detalhado' if sheet_number == 1 else f'Detalhado_{sheet_number}'
+                sheet = workbook.create_sheet(sheet_name)
+                sheet.append(columns)
+                sheet_rows = 0
+                
+            sheet.append([value.to_pydatetime() if isinstance(value, pd.Timestamp) else value
+                          for value in row])
+            sheet_rows += 1
+            
+        if sheet is None:
+            workbook.create_sheet('Detalhado').append(columns)
+            
+        summary_sheet = workbook.create_sheet('Resumo')
+        summary_sheet.append(list(summary.columns))
+        for row in summary.itertuples(index=False, name=None):
+            summary_sheet.append(list(row))
+            
+        workbook.save(str(filepath))
         
     def create_user_summary(self, data):
         """Cria resumo por usuário"""
+        import pandas as pd
         summary_data = []
         
         for user_id in data['ID_Usuario'].unique():
@@ -160,47 +496,183 @@ class ReportGenerator:
                 
         return round(total_hours, 2)
         
+    @classmethod
+    def get_detailed_table_style(cls):
+        """Estilo das tabelas detalhadas (criado no primeiro PDF gerado)"""
+        if cls._detailed_table_style is None:
+            from reportlab.lib import colors
+            from reportlab.platypus import TableStyle
+            cls._detailed_table_style = TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 10),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ])
+        return cls._detailed_table_style
+        
+    def get_pdf_styles(self):
+        """Retorna os estilos de parágrafo usados nos PDFs"""
+        from reportlab.lib import colors
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.enums import TA_CENTER, TA_LEFT
+        styles = getSampleStyleSheet()
+        return {
+            'normal': styles['Normal'],
+            'title': ParagraphStyle(
+                'CustomTitle',
+                parent=styles['Heading1'],
+                alignment=TA_CENTER,
+                spaceAfter=30,
+                fontSize=16,
+                textColor=colors.darkblue
+            ),
+            'heading': ParagraphStyle(
+                'CustomHeading',
+                parent=styles['Heading2'],
+                alignment=TA_LEFT,
+                spaceAfter=12,
+                fontSize=12,
+                textColor=colors.darkblue
+            ),
+            'footer': ParagraphStyle(
+                'Footer',
+                parent=styles['Normal'],
+                alignment=TA_CENTER,
+                fontSize=8,
+                textColor=colors.grey
+            ),
+        }
+        
     def generate_pdf_report(self, data, filepath, start_date, end_date, period_type):
-        """Gera relatório em formato PDF"""
-        doc = SimpleDocTemplate(str(filepath), pagesize=A4)
-        elements = []
+        """Gera relatório em formato PDF
+        
+        Por padrão o PDF traz apenas os report_settings.max_records_per_pdf
+        registros mais recentes. Com report_settings.split_pdf_volumes, todos
+        os registros são divididos em volumes numerados com no máximo
+        records_per_pdf_volume registros cada; quando há mais de um volume, o
+        arquivo principal vira um índice com o resumo e a lista de volumes.
+        Retorna a lista de volumes gerados.
+        """
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+        styles = self.get_pdf_styles()
+        filepath = Path(filepath)
+        
+        if not self.report_settings.get('split_pdf_volumes', False):
+            max_records = max(1, int(self.report_settings.get('max_records_per_pdf', 50)))
+            # Limitar aos registros mais recentes para não sobrecarregar o PDF
+            recent_data = data.nlargest(max_records, 'Timestamp') if len(data) > max_records else data
+            elements = self.build_pdf_header(data, start_date, end_date, period_type, styles)
+            elements.append(Paragraph("Registros Detalhados", styles['heading']))
+            elements.extend(self.build_detailed_tables(recent_data))
+            if len(data) > max_records:
+                elements.append(Spacer(1, 10))
+                elements.append(Paragraph(
+                    f"<i>Nota: Mostrando apenas os {max_records} registros mais recentes "
+                    f"de {len(data)} total.</i>",
+                    styles['normal']
+                ))
+            elements.extend(self.build_pdf_footer(styles))
+            SimpleDocTemplate(str(filepath), pagesize=A4).build(elements)
+            return []
+        
+        max_records = max(1, int(self.report_settings.get('records_per_pdf_volume', 5000)))
+        data = data.sort_values('Timestamp')
+        total_records = len(data)
+        volume_ranges = [(start, min(start + max_records, total_records))
+                         for start in range(0, total_records, max_records)]
+        
+        if len(volume_ranges) <= 1:
+            # Relatório pequeno - resumo e registros no mesmo arquivo
+            elements = self.build_pdf_header(data, start_date, end_date, period_type, styles)
+            elements.append(Paragraph("Registros Detalhados", styles['heading']))
+            elements.extend(self.build_detailed_tables(data))
+            elements.extend(self.build_pdf_footer(styles))
+            SimpleDocTemplate(str(filepath), pagesize=A4).build(elements)
+            return []
+            
+        # Volumes com os registros detalhados, gerados um de cada vez
+        volumes = []
+        for number, (start, end) in enumerate(volume_ranges, 1):
+            chunk = data.iloc[start:end]
+            volume_path = filepath.with_name(f"{filepath.stem}_vol{number:03d}.pdf")
+            
+            elements = [
+                Paragraph(f"DETFACE - Relatório {period_type.title()} - "
+                          f"Volume {number}/{len(volume_ranges)}", styles['title']),
+                Paragraph(
+                    f"<b>Período:</b> {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}<br/>"
+                    f"<b>Registros:</b> {start + 1} a {end} de {total_records}",
+                    styles['normal']
+                ),
+                Spacer(1, 20),
+            ]
+            elements.extend(self.build_detailed_tables(chunk))
+            elements.extend(self.build_pdf_footer(styles))
+            SimpleDocTemplate(str(volume_path), pagesize=A4).build(elements)
+            
+            volumes.append({
+                'file': volume_path.name,
+                'first': chunk['Timestamp'].iloc[0],
+                'last': chunk['Timestamp'].iloc[-1],
+                'records': end - start,
+            })
+            
+        # Arquivo principal - índice e resumo
+        elements = self.build_pdf_header(data, start_date, end_date, period_type, styles)
+        elements.append(Paragraph("Índice de Volumes", styles['heading']))
+        
+        index_data = [['Volume', 'Arquivo', 'De', 'Até', 'Registros']]
+        for number, volume in enumerate(volumes, 1):
+            index_data.append([
+                str(number),
+                volume['file'],
+                volume['first'].strftime('%d/%m/%Y %H:%M'),
+                volume['last'].strftime('%d/%m/%Y %H:%M'),
+                str(volume['records'])
+            ])
+            
+        for start in range(0, len(index_data) - 1, self.PDF_TABLE_ROWS):
+            index_table = Table([index_data[0]] + index_data[start + 1:start + 1 + self.PDF_TABLE_ROWS],
+                                colWidths=[0.7*inch, 2.6*inch, 1.3*inch, 1.3*inch, 0.8*inch],
+                                repeatRows=1)
+            index_table.setStyle(self.get_detailed_table_style())
+            elements.append(index_table)
+            
+        elements.extend(self.build_pdf_footer(styles))
+        SimpleDocTemplate(str(filepath), pagesize=A4).build(elements)
         
-        # Estilos
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            alignment=TA_CENTER,
-            spaceAfter=30,
-            fontSize=16,
-            textColor=colors.darkblue
-        )
+        return [str(filepath.with_name(volume['file'])) for volume in volumes]
         
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            alignment=TA_LEFT,
-            spaceAfter=12,
-            fontSize=12,
-            textColor=colors.darkblue
-        )
+    def build_pdf_header(self, data, start_date, end_date, period_type, styles):
+        """Monta título, informações do período e resumo por usuário"""
+        from reportlab.lib import colors
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
+        elements = []
         
         # Título
-        title = Paragraph(f"DETFACE - Relatório {period_type.title()}", title_style)
-        elements.append(title)
+        elements.append(Paragraph(f"DETFACE - Relatório {period_type.title()}", styles['title']))
         
         # Informações do período
         period_info = Paragraph(
             f"<b>Período:</b> {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}<br/>"
             f"<b>Data de Geração:</b> {datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S')}<br/>"
             f"<b>Total de Registros:</b> {len(data)}",
-            styles['Normal']
+            styles['normal']
         )
         elements.append(period_info)
         elements.append(Spacer(1, 20))
         
         # Resumo Executivo
-        elements.append(Paragraph("Resumo Executivo", heading_style))
+        elements.append(Paragraph("Resumo Executivo", styles['heading']))
         
         summary = self.create_user_summary(data)
         if not summary.empty:
@@ -215,24 +687,26 @@ class ReportGenerator:
                 f"• <b>Total de saídas:</b> {total_exits}<br/>"
                 f"• <b>Tempo total registrado:</b> {total_time:.2f} horas<br/>"
                 f"• <b>Média de tempo por usuário:</b> {(total_time/total_users if total_users > 0 else 0):.2f} horas",
-                styles['Normal']
+                styles['normal']
             )
             elements.append(summary_text)
             elements.append(Spacer(1, 20))
             
             # Tabela de resumo por usuário
-            elements.append(Paragraph("Resumo por Usuário", heading_style))
+            elements.append(Paragraph("Resumo por Usuário", styles['heading']))
             
             summary_table_data = [['Nome', 'Entradas', 'Saídas', 'Tempo (h)']]
-            for _, row in summary.iterrows():
+            for name, entries, exits, hours in summary[['Nome', 'Total_Entradas', 'Total_Saidas',
+                                                        'Tempo_Total_Horas']].itertuples(index=False):
                 summary_table_data.append([
-                    row['Nome'][:20],  # Limitar tamanho do nome
-                    str(row['Total_Entradas']),
-                    str(row['Total_Saidas']),
-                    f"{row['Tempo_Total_Horas']:.1f}"
+                    name[:20],  # Limitar tamanho do nome
+                    str(entries),
+                    str(exits),
+                    f"{hours:.1f}"
                 ])
                 
-            summary_table = Table(summary_table_data, colWidths=[3*inch, 1*inch, 1*inch, 1*inch])
+            summary_table = Table(summary_table_data, colWidths=[3*inch, 1*inch, 1*inch, 1*inch],
+                                  repeatRows=1)
             summary_table.setStyle(TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
                 ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
@@ -248,87 +722,52 @@ class ReportGenerator:
             
             elements.append(summary_table)
             elements.append(Spacer(1, 20))
-        
-        # Registros detalhados
-        elements.append(Paragraph("Registros Detalhados", heading_style))
-        
-        # Limitar a 50 registros mais recentes para não sobrecarregar o PDF
-        recent_data = data.nlargest(50, 'Timestamp') if len(data) > 50 else data
-        
-        if not recent_data.empty:
-            table_data = [['Data', 'Hora', 'Nome', 'Tipo']]
             
-            for _, row in recent_data.iterrows():
+        return elements
+        
+    def build_detailed_tables(self, data):
+        """Monta os registros detalhados em tabelas de uma página cada
+        
+        Tabelas pequenas evitam que o reportlab precise dividir uma tabela
+        gigante entre páginas, o que é lento e consome muita memória.
+        """
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Table
+        tables = []
+        header = ['Data', 'Hora', 'Nome', 'Tipo']
+        columns = data[['Data', 'Hora', 'Nome', 'Tipo']]
+        
+        for start in range(0, len(columns), self.PDF_TABLE_ROWS):
+            table_data = [header]
+            for record_date, record_time, name, record_type in \
+                    columns.iloc[start:start + self.PDF_TABLE_ROWS].itertuples(index=False):
                 table_data.append([
-                    row['Data'].strftime('%d/%m/%Y'),
-                    row['Hora'],
-                    row['Nome'][:25],  # Limitar tamanho do nome
-                    row['Tipo']
+                    record_date.strftime('%d/%m/%Y'),
+                    record_time,
+                    name[:25],  # Limitar tamanho do nome
+                    record_type
                 ])
                 
             detailed_table = Table(table_data, colWidths=[1.5*inch, 1*inch, 2.5*inch, 1*inch])
-            detailed_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ]))
-            
-            elements.append(detailed_table)
+            detailed_table.setStyle(self.get_detailed_table_style())
+            tables.append(detailed_table)
             
-            if len(data) > 50:
-                note = Paragraph(
-                    f"<i>Nota: Mostrando apenas os 50 registros mais recentes de {len(data)} total.</i>",
-                    styles['Normal']
-                )
-                elements.append(Spacer(1, 10))
-                elements.append(note)
+        return tables
         
-        # Rodapé
-        elements.append(Spacer(1, 30))
+    def build_pdf_footer(self, styles):
+        """Monta o rodapé padrão dos PDFs"""
+        from reportlab.platypus import Paragraph, Spacer
         footer = Paragraph(
             "Relatório gerado automaticamente pelo sistema DETFACE<br/>"
             "Sistema de Reconhecimento Facial para Controle de Presença",
-            ParagraphStyle(
-                'Footer',
-                parent=styles['Normal'],
-                alignment=TA_CENTER,
-                fontSize=8,
-                textColor=colors.grey
-            )
+            styles['footer']
         )
-        elements.append(footer)
-        
-        # Construir PDF
-        doc.build(elements)
+        return [Spacer(1, 30), footer]
         
+
     def generate_custom_report(self, start_date, end_date, users=None, report_type="custom"):
         """Gera relatório personalizado"""
-        df = self.load_attendance_data()
-        
-        if df.empty:
-            print("❌ Nenhum dado de presença encontrado")
-            return None, None
-            
-        # Filtrar por período
-        mask = (df['Data'].dt.date >= start_date) & (df['Data'].dt.date <= end_date)
-        filtered_data = df[mask].copy()
-        
-        # Filtrar por usuários se especificado
-        if users:
-            filtered_data = filtered_data[filtered_data['ID_Usuario'].isin(users)]
-            
-        if filtered_data.empty:
-            print("❌ Nenhum registro encontrado para os critérios especificados")
-            return None, None
-            
-        return self.generate_period_report(start_date, end_date, report_type)
+        return self.generate_period_report(start_date, end_date, report_type, users)
         
     def get_attendance_statistics(self):
         """Retorna estatísticas gerais de presença"""
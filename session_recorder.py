@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Gravação e Reprodução de Sessões
+Grava quadros da câmera e os resultados do reconhecimento em um buffer
+circular em disco e os reproduz pelo pipeline atual para medir desempenho
+"""
+
+import os
+import json
+import shutil
+import argparse
+import tempfile
+import threading
+import queue
+import time
+import datetime
+from collections import deque
+from pathlib import Path
+import numpy as np
+import cv2
+
+from frame_sources import ReplaySource
+from user_store import write_json_atomic
+
+
+def load_recording_settings(config_file='config.json'):
+    """Lê as opções de gravação (recording_settings) do config.json"""
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get('recording_settings', {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+class SessionRecorder:
+    """Grava uma sessão (session.jsonl + um JPEG por quadro) com limite de disco
+
+    Cada quadro vira uma linha {"seq", "t", "file", "faces"} em
+    session.jsonl, com o instante de captura em "t" e os resultados do
+    reconhecimento em "faces" (None quando o quadro não foi processado).
+    A compressão e a escrita acontecem em uma thread própria: record()
+    apenas copia o quadro para uma fila limitada e, se o disco não
+    acompanhar, descarta o quadro (contado em dropped) em vez de atrasar a
+    captura. Os quadros mais antigos são apagados quando a sessão passa de
+    max_seconds ou max_megabytes, e só as keep_sessions sessões mais
+    recentes são mantidas no diretório base.
+    """
+
+    INDEX_FILE = ReplaySource.INDEX_FILE
+    META_FILE = "meta.json"
+
+    def __init__(self, base_dir="sessions", max_seconds=600, max_megabytes=500, jpeg_quality=85,
+                 keep_sessions=5, queue_size=64):
+        """Configura o gravador (a gravação começa em start())"""
+        self.base_dir = Path(base_dir)
+        self.max_seconds = float(max_seconds)
+        self.max_bytes = int(float(max_megabytes) * 1024 * 1024)
+        self.jpeg_quality = int(jpeg_quality)
+        self.keep_sessions = int(keep_sessions)
+        self.queue_size = int(queue_size)
+        self.session_dir = None
+        self.recorded = 0
+        self.dropped = 0
+        self._queue = None
+        self._thread = None
+        self._seq = 0
+
+    @classmethod
+    def from_config(cls, config_file='config.json'):
+        """Cria o gravador se recording_settings.enabled for true (senão None)"""
+        settings = load_recording_settings(config_file)
+        if not settings.get('enabled', False):
+            return None
+        return cls(base_dir=settings.get('directory', 'sessions'),
+                   max_seconds=settings.get('max_seconds', 600),
+                   max_megabytes=settings.get('max_megabytes', 500),
+                   jpeg_quality=settings.get('jpeg_quality', 85),
+                   keep_sessions=settings.get('keep_sessions', 5))
+
+    @property
+    def is_recording(self):
+        return self._thread is not None
+
+    def start(self, meta=None):
+        """Cria o diretório da sessão e inicia a thread de escrita"""
+        if self.is_recording:
+            return self.session_dir
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.prune_sessions(self.keep_sessions - 1)
+
+        name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.session_dir = self.base_dir / name
+        self.session_dir.mkdir()
+        write_json_atomic(self.session_dir / self.META_FILE,
+                          dict(meta or {}, started=datetime.datetime.now().isoformat()))
+
+        self.recorded = 0
+        self.dropped = 0
+        self._seq = 0
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+        print(f"⏺️ Gravando sessão em {self.session_dir}")
+        return self.session_dir
+
+    def record(self, frame, timestamp=None, faces=None):
+        """Enfileira um quadro com seu instante de captura e resultados"""
+        if not self.is_recording or frame is None:
+            return False
+        entry = {'seq': self._seq, 't': timestamp if timestamp is not None else time.time()}
+        if faces is not None:
+            entry['faces'] = [{'box': [int(v) for v in face['box']], 'user_id': face.get('user_id'),
+                               'similarity': face.get('similarity')} for face in faces]
+        else:
+            entry['faces'] = None
+        self._seq += 1
+        try:
+            self._queue.put_nowait((entry, frame.copy()))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def stop(self):
+        """Grava os quadros pendentes, compacta o índice e encerra"""
+        if not self.is_recording:
+            return None
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._compact_index()
+        print(f"⏹️ Sessão gravada: {self.recorded} quadros ({self.dropped} descartados) em {self.session_dir}")
+        return self.session_dir
+
+    def _writer(self):
+        """Comprime e grava os quadros; apaga os mais antigos fora do limite"""
+        window = deque()  # (t, arquivo, bytes)
+        total_bytes = 0
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
+        with open(self.session_dir / self.INDEX_FILE, 'a', encoding='utf-8') as index:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                entry, frame = item
+                ok, encoded = cv2.imencode('.jpg', frame, params)
+                if not ok:
+                    self.dropped += 1
+                    continue
+                entry['file'] = f"{entry['seq']:08d}.jpg"
+                (self.session_dir / entry['file']).write_bytes(encoded.tobytes())
+                index.write(json.dumps(entry) + "\n")
+                index.flush()
+                self.recorded += 1
+
+                window.append((entry['t'], entry['file'], len(encoded)))
+                total_bytes += len(encoded)
+                while len(window) > 1 and (total_bytes > self.max_bytes or
+                                           entry['t'] - window[0][0] > self.max_seconds):
+                    _, old_file, size = window.popleft()
+                    total_bytes -= size
+                    try:
+                        (self.session_dir / old_file).unlink()
+                    except OSError:
+                        pass
+
+    def _compact_index(self):
+        """Reescreve session.jsonl só com os quadros que ainda existem"""
+        index_file = self.session_dir / self.INDEX_FILE
+        records = ReplaySource.load_records(self.session_dir)
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.session_dir), prefix=".session.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+            os.replace(tmp_path, index_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def prune_sessions(self, keep):
+        """Apaga as sessões mais antigas, mantendo as keep mais recentes"""
+        sessions = sorted(path for path in self.base_dir.iterdir()
+                          if path.is_dir() and (path / self.INDEX_FILE).exists())
+        for path in sessions[:max(0, len(sessions) - max(0, keep))]:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _iou(a, b):
+    """Interseção sobre união de duas caixas (x, y, w, h)"""
+    ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+def compare_faces(recorded, current, min_iou=0.5):
+    """Compara os resultados gravados com os atuais de um quadro
+
+    Pareia as caixas por IoU (guloso, maior primeiro) e retorna
+    (faltando, sobrando, identidades trocadas, maior diferença de similaridade).
+    """
+    pairs = sorted(((_iou(r['box'], c['box']), i, j) for i, r in enumerate(recorded)
+                    for j, c in enumerate(current)), reverse=True)
+    used_recorded, used_current = set(), set()
+    changed = 0
+    max_delta = 0.0
+    for iou, i, j in pairs:
+        if iou < min_iou:
+            break
+        if i in used_recorded or j in used_current:
+            continue
+        used_recorded.add(i)
+        used_current.add(j)
+        if recorded[i].get('user_id') != current[j].get('user_id'):
+            changed += 1
+        if recorded[i].get('similarity') is not None and current[j].get('similarity') is not None:
+            max_delta = max(max_delta, abs(recorded[i]['similarity'] - current[j]['similarity']))
+    return len(recorded) - len(used_recorded), len(current) - len(used_current), changed, max_delta
+
+
+def replay_session(face_detector, session_dir, speed=1.0):
+    """Reproduz uma sessão pelo pipeline atual no ritmo original
+
+    Uma thread entrega os quadros no instante em que foram capturados
+    (dividido por speed) em uma vaga única, como a câmera ao vivo: se o
+    pipeline ainda estiver ocupado quando chega o próximo quadro, o
+    anterior é descartado e contado como perda. Cada quadro entregue passa
+    pelo mesmo caminho do loop ao vivo (agendador, gate de movimento e
+    reconhecimento); os que o agendador ou o gate pulam são contados à
+    parte e reaproveitam os últimos resultados, como na tela. A latência de
+    cada quadro vai da sua chegada até o fim desse caminho. Os resultados
+    são comparados com os gravados nos quadros que foram processados na
+    gravação.
+    Com speed=0 a reprodução anda em passo com o pipeline (sem perdas),
+    útil para comparar todos os quadros o mais rápido possível.
+    """
+    source = ReplaySource(session_dir, speed=speed)
+    if not source.isOpened():
+        raise ValueError(f"Sessão vazia ou inexistente: {session_dir}")
+
+    slot = {'item': None, 'done': False}
+    condition = threading.Condition()
+    dropped = 0
+
+    def produce():
+        nonlocal dropped
+        while True:
+            ok, frame = source.read()
+            with condition:
+                if speed <= 0:
+                    while slot['item'] is not None:
+                        condition.wait()
+                if not ok:
+                    slot['done'] = True
+                else:
+                    if slot['item'] is not None:
+                        dropped += 1
+                    slot['item'] = (source.record, frame, time.perf_counter())
+                condition.notify()
+            if not ok:
+                break
+
+    # Agendador e gate começam do zero, como ao iniciar a captura
+    face_detector.frame_scheduler.reset()
+    face_detector.motion_gate.reset()
+    face_detector.motion_gate.reset_stats()
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    latencies = []
+    detection_latencies = []
+    gray_buffer = None
+    last_results = []
+    compared = frames_with_diffs = missing = extra = changed = 0
+    max_delta = 0.0
+    while True:
+        with condition:
+            while slot['item'] is None and not slot['done']:
+                condition.wait()
+            if slot['item'] is None:
+                break
+            record, frame, arrived = slot['item']
+            slot['item'] = None
+            condition.notify()
+
+        results, gray_buffer = face_detector.process_scheduled_frame(frame, gray_buffer)
+        latency = time.perf_counter() - arrived
+        latencies.append(latency)
+        if results is not None:
+            detection_latencies.append(latency)
+            last_results = results
+        current = last_results
+
+        if record.get('faces') is not None:
+            miss, more, swaps, delta = compare_faces(record['faces'], current)
+            compared += 1
+            frames_with_diffs += bool(miss or more or swaps)
+            missing += miss
+            extra += more
+            changed += swaps
+            max_delta = max(max_delta, delta)
+    producer.join()
+
+    latencies_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    detection_ms = np.array(detection_latencies) * 1000 if detection_latencies else np.zeros(1)
+    gate_skipped = face_detector.motion_gate.stats()['skipped']
+    total = len(source.records)
+    return {
+        'frames': total,
+        'processed': len(latencies),
+        'detected': len(detection_latencies),
+        'scheduler_skipped': len(latencies) - len(detection_latencies) - gate_skipped,
+        'gate_skipped': gate_skipped,
+        'dropped': dropped,
+        'drop_rate': dropped / total if total else 0.0,
+        'latency_p50_ms': float(np.percentile(latencies_ms, 50)),
+        'latency_p95_ms': float(np.percentile(latencies_ms, 95)),
+        'latency_max_ms': float(latencies_ms.max()),
+        'detection_latency_p50_ms': float(np.percentile(detection_ms, 50)),
+        'detection_latency_p95_ms': float(np.percentile(detection_ms, 95)),
+        'compared_frames': compared,
+        'frames_with_diffs': frames_with_diffs,
+        'missing_faces': missing,
+        'extra_faces': extra,
+        'identity_changes': changed,
+        'max_similarity_delta': max_delta,
+    }
+
+
+def print_replay_report(report):
+    """Exibe o relatório de reprodução"""
+    print("\n📼 RELATÓRIO DE REPRODUÇÃO")
+    print(f"   Quadros: {report['frames']} | processados: {report['processed']} | "
+          f"perdidos: {report['dropped']} ({report['drop_rate']:.1%})")
+    print(f"   Com detecção: {report['detected']} | pulados pelo agendador: "
+          f"{report['scheduler_skipped']} | barrados pelo gate: {report['gate_skipped']}")
+    print(f"   Latência ponta a ponta: p50 {report['latency_p50_ms']:.1f} ms | "
+          f"p95 {report['latency_p95_ms']:.1f} ms | máx {report['latency_max_ms']:.1f} ms")
+    print(f"   Latência dos quadros com detecção: p50 {report['detection_latency_p50_ms']:.1f} ms | "
+          f"p95 {report['detection_latency_p95_ms']:.1f} ms")
+    print(f"   Comparados com a gravação: {report['compared_frames']} quadros, "
+          f"{report['frames_with_diffs']} com diferenças")
+    print(f"   Faces faltando: {report['missing_faces']} | a mais: {report['extra_faces']} | "
+          f"identidades trocadas: {report['identity_changes']} | "
+          f"maior Δ similaridade: {report['max_similarity_delta']:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DETFACE - reprodução de sessões gravadas")
+    parser.add_argument("session", help="Diretório da sessão (com session.jsonl)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Velocidade da reprodução (1 = original, 0 = sem esperas)")
+    parser.add_argument("--json", action="store_true", help="Imprimir o relatório em JSON")
+    args = parser.parse_args()
+
+    from face_detector import FaceDetector
+
+    session_dir = Path(args.session)
+    try:
+        with open(session_dir / SessionRecorder.META_FILE, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        meta = {}
+
+    detector = FaceDetector()
+    if meta.get('descriptor') and meta['descriptor'] != detector.descriptor.key:
+        print(f"⚠️ Sessão gravada com o descritor {meta['descriptor']}, "
+              f"pipeline atual usa {detector.descriptor.key}")
+
+    report = replay_session(detector, session_dir, args.speed)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_replay_report(report)
+
+
+if __name__ == "__main__":
+    main()
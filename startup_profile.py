@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Perfil de Inicialização
+Mede o tempo de importação dos pontos de entrada em um processo novo
+(python -X importtime) e mostra quais pacotes pesam na partida
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+PROFILE_FLAG = "--profile-startup"
+
+
+def profile_requested(argv=None):
+    """True se a linha de comando pediu o perfil de inicialização"""
+    return PROFILE_FLAG in (sys.argv if argv is None else argv)
+
+
+def measure_import(module, cwd=None, importtime=False):
+    """Importa module em um interpretador novo e mede a partida a frio
+
+    Retorna (segundos de relógio, linhas do -X importtime, erro). O erro é
+    a última linha do traceback quando a importação falha (ex.:
+    ModuleNotFoundError de uma dependência ausente), senão None.
+    """
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", f"import {module}"]
+
+    start = time.perf_counter()
+    process = subprocess.run(command, cwd=cwd, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+
+    lines = process.stderr.splitlines()
+    timings = [line for line in lines if line.startswith("import time:")]
+    error = None
+    if process.returncode != 0:
+        other = [line for line in lines if not line.startswith("import time:") and line.strip()]
+        error = other[-1] if other else f"código de saída {process.returncode}"
+    return elapsed, timings, error
+
+
+def parse_importtime(lines):
+    """Converte as linhas do -X importtime em (módulo, próprio us, acumulado us, nível)"""
+    entries = []
+    for line in lines:
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # Cabeçalho
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        level = (len(name) - len(stripped)) // 2
+        entries.append((stripped, int(parts[0]), int(parts[1]), level))
+    return entries
+
+
+def package_breakdown(entries):
+    """Soma o tempo próprio de importação por pacote de topo (numpy, pandas...)"""
+    totals = {}
+    for name, self_us, _, _ in entries:
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def print_startup_profile(module, top=15):
+    """Imprime o tempo de partida de module e os pacotes mais caros"""
+    elapsed, lines, error = measure_import(module, importtime=True)
+    print(f"🚀 Perfil de inicialização: {module}")
+    if error:
+        print(f"❌ Falha ao importar {module}: {error}")
+        return False
+
+    entries = parse_importtime(lines)
+    imported_us = sum(self_us for _, self_us, _, _ in entries)
+    print(f"  Partida a frio: {elapsed * 1000:.0f} ms "
+          f"(importações {imported_us / 1000:.0f} ms, {len(entries)} módulos)")
+    print(f"  {'Pacote':<28} {'ms':>9} {'%':>6}")
+    for package, self_us in package_breakdown(entries)[:top]:
+        share = self_us / imported_us if imported_us else 0.0
+        print(f"  {package:<28} {self_us / 1000:9.1f} {share:6.1%}")
+    return True
+
+
+def run_if_requested(module, argv=None):
+    """Nos pontos de entrada: com --profile-startup imprime o perfil e encerra"""
+    if profile_requested(argv):
+        sys.exit(0 if print_startup_profile(module) else 1)
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or ["main", "detface_desktop", "web_camera"]:
+        print_startup_profile(name)
+        print()
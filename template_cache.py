@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Cache de Templates Faciais
+Guarda as características extraídas de cada imagem da galeria em disco
+"""
+
+import os
+import tempfile
+from pathlib import Path
+import numpy as np
+
+
+class TemplateCache:
+    """Cache das características da galeria, por versão do descritor
+
+    Cada descritor (nome + versão) tem seu próprio arquivo em
+    faces/.templates/<chave>.npz, então trocar de descritor (ou mudar sua
+    versão) nunca reaproveita características incompatíveis. Uma entrada
+    vale enquanto o mtime e o tamanho da imagem não mudarem.
+    """
+
+    def __init__(self, faces_dir, descriptor_key):
+        """Inicializa o cache para o descritor informado"""
+        self.directory = Path(faces_dir) / ".templates"
+        self.path = self.directory / f"{descriptor_key}.npz"
+        self._entries = {}   # caminho relativo -> (versão, características)
+        self._dirty = False
+
+    def load(self):
+        """Carrega o cache do disco (cache inválido é descartado)"""
+        self._entries = {}
+        self._dirty = False
+        if not self.path.exists():
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                for name, stamp, features in zip(data['names'], data['stamps'], data['features']):
+                    self._entries[str(name)] = (tuple(int(v) for v in stamp), features)
+        except Exception as e:
+            print(f"⚠️ Cache de templates inválido, recriando: {e}")
+            self._entries = {}
+
+    @staticmethod
+    def _stamp(image_file):
+        stat = os.stat(image_file)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _name(self, image_file):
+        return Path(image_file).relative_to(self.directory.parent).as_posix()
+
+    def get(self, image_file):
+        """Retorna as características em cache da imagem, se ainda válidas"""
+        entry = self._entries.get(self._name(image_file))
+        if entry is None:
+            return None
+        try:
+            if entry[0] != self._stamp(image_file):
+                return None
+        except OSError:
+            return None
+        return entry[1]
+
+    def put(self, image_file, features):
+        """Guarda as características extraídas de uma imagem"""
+        self._entries[self._name(image_file)] = (self._stamp(image_file),
+                                                 np.asarray(features, dtype=np.float32))
+        self._dirty = True
+
+    def prune(self, image_files):
+        """Descarta entradas de imagens que não existem mais"""
+        valid = {self._name(image_file) for image_file in image_files}
+        stale = [name for name in self._entries if name not in valid]
+        for name in stale:
+            del self._entries[name]
+        self._dirty = self._dirty or bool(stale)
+
+    def save(self):
+        """Grava o cache de forma atômica, se houve alterações"""
+        if not self._dirty:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        names = list(self._entries)
+        stamps = np.array([self._entries[name][0] for name in names], dtype=np.int64).reshape(-1, 2)
+        features = (np.stack([self._entries[name][1] for name in names])
+                    if names else np.empty((0, 0), dtype=np.float32))
+
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.directory), prefix=f".{self.path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, names=np.array(names, dtype=str), stamps=stamps, features=features)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
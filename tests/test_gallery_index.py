@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Testes do Índice Aproximado da Galeria
+Revocação do IVF contra a busca exata e remoção de templates
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gallery_index import IVFIndex
+
+
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class IVFIndexTest(unittest.TestCase):
+    """Galeria sintética agrupada (como templates de várias pessoas)"""
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        centers = rng.normal(size=(60, 48))
+        labels = rng.integers(0, len(centers), 3000)
+        self.gallery = normalize(centers[labels] + rng.normal(scale=0.35, size=(3000, 48))).astype(np.float32)
+        picks = rng.choice(len(self.gallery), 300, replace=False)
+        self.queries = normalize(self.gallery[picks] + rng.normal(scale=0.3, size=(300, 48))).astype(np.float32)
+
+        self.index = IVFIndex(nlist=40, nprobe=4, seed=1)
+        self.index.train(self.gallery)
+        self.index.build(self.gallery)
+
+    def exact(self, gallery, queries):
+        scores = queries @ gallery.T
+        return scores.argmax(axis=1), scores.max(axis=1)
+
+    def test_full_probe_equals_exact_search(self):
+        rows, similarities = self.index.search(self.queries, nprobe=self.index.nlist)
+        exact_rows, exact_similarities = self.exact(self.gallery, self.queries)
+        np.testing.assert_array_equal(rows, exact_rows)
+        np.testing.assert_allclose(similarities, exact_similarities, atol=1e-5)
+
+    def test_recall_with_few_probes(self):
+        exact_rows, _ = self.exact(self.gallery, self.queries)
+        recall = {nprobe: np.mean(self.index.search(self.queries, nprobe=nprobe)[0] == exact_rows)
+                  for nprobe in (1, 4, 10)}
+        self.assertGreaterEqual(recall[4], 0.85)
+        self.assertGreaterEqual(recall[10], 0.93)
+        self.assertLessEqual(recall[1], recall[4])
+        self.assertLessEqual(recall[4], recall[10])
+
+    def test_keep_rows_removes_and_renumbers(self):
+        keep = np.flatnonzero(np.arange(len(self.gallery)) % 3 != 0)
+        original_assignments = self.index.assignments()
+        edited = self.index.copy()
+        edited.keep_rows(keep)
+
+        self.assertEqual(edited.size, len(keep))
+        np.testing.assert_array_equal(edited.assignments(), original_assignments[keep])
+        rows, _ = edited.search(self.queries, nprobe=edited.nlist)
+        exact_rows, _ = self.exact(self.gallery[keep], self.queries)
+        np.testing.assert_array_equal(rows, exact_rows)
+
+        # A cópia não altera o índice em uso
+        self.assertEqual(self.index.size, len(self.gallery))
+        np.testing.assert_array_equal(self.index.assignments(), original_assignments)
+
+    def test_build_reuses_saved_assignments(self):
+        names = [f"t{i}" for i in range(len(self.gallery))]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "gallery_index.npz"
+            self.index.save(path, names)
+            loaded, saved = IVFIndex.load(path)
+
+        # Template novo sem atribuição salva: comparado com os centróides
+        names.append("novo")
+        gallery = np.vstack([self.gallery, self.queries[:1]])
+        loaded.build(gallery, [saved.get(name, -1) for name in names])
+        np.testing.assert_array_equal(loaded.assignments()[:-1], self.index.assignments())
+        self.assertEqual(loaded.search(self.queries[:1], nprobe=loaded.nlist)[0][0], len(gallery) - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Teste de Orçamento de Inicialização
+Falha se a partida a frio de um ponto de entrada passar do orçamento
+
+Uso:
+    python -m unittest discover tests
+    DETFACE_STARTUP_BUDGET=0.8 python -m pytest tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from startup_profile import measure_import, package_breakdown, parse_importtime
+
+STARTUP_BUDGET = float(os.environ.get("DETFACE_STARTUP_BUDGET", "1.0"))  # segundos
+REPEAT = 3  # Melhor de REPEAT execuções (descarta ruído da máquina)
+
+
+class StartupBudgetTest(unittest.TestCase):
+    """Importação a frio de main.py, detface_desktop.py e web_camera.py"""
+
+    def assert_within_budget(self, module):
+        runs = [measure_import(module) for _ in range(REPEAT)]
+        errors = [error for _, _, error in runs if error]
+        if errors and "ModuleNotFoundError" in errors[0]:
+            self.skipTest(f"dependência ausente: {errors[0]}")
+        self.assertFalse(errors, f"falha ao importar {module}: {errors[:1]}")
+
+        best = min(elapsed for elapsed, _, _ in runs)
+        if best > STARTUP_BUDGET:
+            _, lines, _ = measure_import(module, importtime=True)
+            heaviest = ", ".join(f"{package} {self_us / 1000:.0f} ms"
+                                 for package, self_us in package_breakdown(parse_importtime(lines))[:5])
+            self.fail(f"{module}: partida a frio {best * 1000:.0f} ms > orçamento "
+                      f"{STARTUP_BUDGET * 1000:.0f} ms ({heaviest})")
+
+    def test_main(self):
+        self.assert_within_budget("main")
+
+    def test_detface_desktop(self):
+        self.assert_within_budget("detface_desktop")
+
+    def test_web_camera(self):
+        self.assert_within_budget("web_camera")
+
+
+if __name__ == "__main__":
+    unittest.main()
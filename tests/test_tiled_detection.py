@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Testes da Detecção em Blocos
+Supressão de caixas repetidas e cobertura dos blocos sobrepostos
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tiled_detection import TiledCascadeDetector, non_max_suppression
+
+
+def as_set(boxes):
+    return {tuple(int(v) for v in box) for box in boxes}
+
+
+class NonMaxSuppressionTest(unittest.TestCase):
+    """Caixas (x, y, w, h) como as devolvidas pelos blocos"""
+
+    def test_contained_box_is_removed(self):
+        # IoU baixa (0.25), mas a menor está inteira dentro da maior
+        boxes = [(110, 110, 50, 50), (100, 100, 100, 100)]
+        self.assertEqual(as_set(non_max_suppression(boxes)), {(100, 100, 100, 100)})
+
+    def test_partial_containment_below_threshold_is_kept(self):
+        # Metade da caixa menor fora da maior: containment 0.5, IoU ~0.11
+        boxes = [(100, 100, 100, 100), (175, 120, 50, 50)]
+        self.assertEqual(as_set(non_max_suppression(boxes)), as_set(boxes))
+
+    def test_duplicates_keep_largest(self):
+        boxes = [(100, 100, 80, 80), (104, 98, 84, 84), (98, 102, 78, 78)]
+        self.assertEqual(as_set(non_max_suppression(boxes)), {(104, 98, 84, 84)})
+
+    def test_disjoint_boxes_are_kept(self):
+        boxes = [(0, 0, 40, 40), (40, 0, 40, 40), (300, 200, 90, 90)]
+        self.assertEqual(as_set(non_max_suppression(boxes)), as_set(boxes))
+
+    def test_small_inputs(self):
+        self.assertEqual(non_max_suppression([]).shape, (0, 4))
+        np.testing.assert_array_equal(non_max_suppression([(1, 2, 3, 4)]), [[1, 2, 3, 4]])
+
+
+class TileCoverageTest(unittest.TestCase):
+    """Toda face de até overlap pixels cabe inteira em algum bloco"""
+
+    def test_faces_up_to_overlap_fit_in_a_tile(self):
+        rng = np.random.default_rng(2)
+        for rows, cols, overlap, width, height in ((2, 2, 240, 1920, 1080), (3, 4, 120, 1280, 720),
+                                                   (1, 3, 101, 640, 480)):
+            detector = TiledCascadeDetector("unused.xml", rows, cols, overlap, threads=1)
+            tiles = detector.tiles(width, height)
+            detector.shutdown()
+            for _ in range(500):
+                size = int(rng.integers(1, overlap + 1))
+                x = int(rng.integers(0, width - size + 1))
+                y = int(rng.integers(0, height - size + 1))
+                with self.subTest(grid=(rows, cols), face=(x, y, size)):
+                    self.assertTrue(any(tx <= x and ty <= y and x + size <= tx + tw and y + size <= ty + th
+                                        for tx, ty, tw, th in tiles))
+
+
+if __name__ == "__main__":
+    unittest.main()
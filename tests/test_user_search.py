@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Testes do Índice de Busca de Usuários
+O índice de trigramas deve dar o mesmo resultado de uma varredura por substring
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from user_search import UserSearchIndex
+
+SYLLABLES = ["an", "ba", "car", "da", "el", "fer", "gu", "li", "ma", "na", "ro", "sil", "ta", "vi"]
+DEPARTMENTS = ["Financeiro", "TI", "Recursos Humanos", "Operações", ""]
+
+
+def brute_force(users, query, fields=UserSearchIndex.FIELDS):
+    """Varredura de referência, na ordem de inserção"""
+    query = query.lower().strip()
+    return [user_id for user_id, user in users.items()
+            if any(query in str(user.get(field) or '').lower() for field in fields)]
+
+
+class UserSearchIndexTest(unittest.TestCase):
+    """Consultas curtas (varredura) e longas (trigramas) contra a referência"""
+
+    def setUp(self):
+        rng = random.Random(11)
+        self.users = {}
+        for number in range(400):
+            user_id = f"{rng.choice(['A', 'B', 'func'])}{number:04d}"
+            name = " ".join("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).title()
+                            for _ in range(2))
+            self.users[user_id] = {'id': user_id, 'name': name,
+                                   'department': rng.choice(DEPARTMENTS),
+                                   'position': rng.choice(["Analista", "Gerente", None])}
+        self.index = UserSearchIndex()
+        self.index.build(self.users)
+        self.queries = ["", " ", "a", "Z", "an", "ro", "0", "12", "ana", "MAR", "func00",
+                        "ti", "recursos h", "sil ", "xyz", "B03", "gerente", "analista"]
+        for user in list(self.users.values())[:30]:
+            self.queries.append(user['name'][1:5])
+
+    def test_matches_brute_force(self):
+        for query in self.queries:
+            with self.subTest(query=query):
+                self.assertEqual(self.index.search(query), brute_force(self.users, query))
+
+    def test_field_subset(self):
+        for query in self.queries:
+            with self.subTest(query=query):
+                self.assertEqual(self.index.search(query, ('name', 'id')),
+                                 brute_force(self.users, query, ('name', 'id')))
+
+    def test_updates_and_removals(self):
+        user_id = next(iter(self.users))
+        self.users[user_id] = dict(self.users[user_id], name="Zuleica Quintas")
+        self.index.add(user_id, self.users[user_id])
+        removed = list(self.users)[5]
+        del self.users[removed]
+        self.index.remove(removed)
+
+        self.assertEqual(len(self.index), len(self.users))
+        for query in self.queries + ["zul", "quintas", "zu"]:
+            with self.subTest(query=query):
+                self.assertEqual(self.index.search(query), brute_force(self.users, query))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Testes do Armazenamento de Usuários
+Diário de alterações, compactação e recuperação após queda
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from user_store import UserStore
+
+
+class UserStoreTest(unittest.TestCase):
+    """Snapshot + diário: o que foi gravado sempre volta no load()"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.users_file = Path(self.tmp_dir.name) / "users.json"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_journal_replay(self):
+        store = UserStore(self.users_file)
+        store.put("1", {"id": "1", "name": "Ana", "total_entries": 0})
+        store.patch("1", {"total_entries": 3})
+        store.put("2", {"id": "2", "name": "Bruno"})
+        store.delete("2")
+        self.assertEqual(UserStore(self.users_file).load(),
+                         {"1": {"id": "1", "name": "Ana", "total_entries": 3}})
+
+    def test_compact_keeps_records_appended_after_mark(self):
+        store = UserStore(self.users_file)
+        users = {"1": {"id": "1", "name": "Ana", "total_entries": 0}}
+        store.put("1", users["1"])
+
+        # Cópia tirada aqui; outra thread grava antes da compactação
+        mark = store.mark()
+        snapshot = {"1": dict(users["1"])}
+        store.patch("1", {"total_entries": 1})
+        store.put("2", {"id": "2", "name": "Bruno"})
+        store.compact(snapshot, mark)
+
+        self.assertEqual(store.journal_entries, 2)
+        self.assertEqual(UserStore(self.users_file).load(), {
+            "1": {"id": "1", "name": "Ana", "total_entries": 1},
+            "2": {"id": "2", "name": "Bruno"},
+        })
+
+    def test_compact_without_new_records_drops_journal(self):
+        store = UserStore(self.users_file)
+        store.put("1", {"id": "1", "name": "Ana"})
+        store.compact({"1": {"id": "1", "name": "Ana"}}, store.mark())
+        self.assertFalse(store.journal_file.exists())
+        self.assertEqual(store.journal_entries, 0)
+
+    def test_torn_tail_is_ignored(self):
+        store = UserStore(self.users_file)
+        store.put("1", {"id": "1", "name": "Ana"})
+        with open(store.journal_file, 'a', encoding='utf-8') as f:
+            f.write('{"op": "put", "id": "2", "da')  # Queda no meio da escrita
+
+        store = UserStore(self.users_file)
+        self.assertEqual(list(store.load()), ["1"])
+        store.put("3", {"id": "3", "name": "Carla"})
+        self.assertEqual(sorted(UserStore(self.users_file).load()), ["1", "3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
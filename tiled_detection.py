@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Detecção em Blocos
+Cascata Haar em blocos sobrepostos executados em paralelo, para câmeras
+de alta resolução (1080p/4K)
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import cv2
+
+
+def non_max_suppression(boxes, iou_threshold=0.3, containment_threshold=0.7):
+    """Remove caixas (x, y, w, h) duplicadas, mantendo as maiores
+
+    A cascata não fornece confiança, então a área é usada como
+    prioridade. Uma caixa é descartada se sua IoU com uma caixa mantida
+    passar de iou_threshold ou se estiver quase toda (containment_threshold)
+    dentro dela, o caso típico de uma face detectada em dois blocos.
+    """
+    boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+    if len(boxes) < 2:
+        return boxes
+
+    x1, y1 = boxes[:, 0], boxes[:, 1]
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    areas = boxes[:, 2].astype(np.int64) * boxes[:, 3]
+    order = np.argsort(-areas, kind='stable')
+
+    keep = []
+    while len(order):
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        width = np.clip(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None)
+        height = np.clip(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None)
+        inter = width.astype(np.int64) * height
+        iou = inter / (areas[best] + areas[rest] - inter)
+        contained = inter / np.minimum(areas[best], areas[rest])
+        order = rest[(iou <= iou_threshold) & (contained <= containment_threshold)]
+    return boxes[np.array(keep)]
+
+
+class TiledCascadeDetector:
+    """Executa detectMultiScale em blocos sobrepostos em um pool de threads
+
+    O quadro é dividido em rows x cols blocos que se sobrepõem em overlap
+    pixels; toda face de até overlap pixels cabe inteira em algum bloco,
+    então os blocos procuram só faces até esse tamanho. Faces maiores são
+    procuradas por uma passada extra no quadro inteiro limitada a tamanhos
+    acima de overlap (barata, pois só percorre as escalas grandes). As
+    caixas dos blocos voltam para coordenadas do quadro e as repetidas nas
+    emendas são removidas por NMS. O OpenCV libera o GIL durante a
+    detecção; cada thread usa seu próprio CascadeClassifier.
+    """
+
+    def __init__(self, cascade_path, rows=2, cols=2, overlap=240, threads=4,
+                 scale_factor=1.1, min_neighbors=4):
+        """Configura os blocos e o pool de threads"""
+        self.cascade_path = cascade_path
+        self.rows = max(1, int(rows))
+        self.cols = max(1, int(cols))
+        self.overlap = max(1, int(overlap))
+        self.threads = max(1, int(threads))
+        self.scale_factor = float(scale_factor)
+        self.min_neighbors = int(min_neighbors)
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="detface-tile")
+
+    def _cascade(self):
+        """CascadeClassifier da thread atual"""
+        cascade = getattr(self._local, 'cascade', None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(self.cascade_path)
+            self._local.cascade = cascade
+        return cascade
+
+    def tiles(self, width, height):
+        """Retângulos (x, y, w, h) dos blocos sobrepostos de um quadro"""
+        tiles = []
+        for row in range(self.rows):
+            for col in range(self.cols):
+                x0 = col * width // self.cols
+                y0 = row * height // self.rows
+                x1 = (col + 1) * width // self.cols
+                y1 = (row + 1) * height // self.rows
+                # Expandir metade da sobreposição para cada lado interno
+                x0 = max(0, x0 - self.overlap // 2)
+                y0 = max(0, y0 - self.overlap // 2)
+                x1 = min(width, x1 + (self.overlap + 1) // 2)
+                y1 = min(height, y1 + (self.overlap + 1) // 2)
+                tiles.append((x0, y0, x1 - x0, y1 - y0))
+        return tiles
+
+    def _detect_tile(self, gray, tile):
+        x, y, w, h = tile
+        found = self._cascade().detectMultiScale(gray[y:y+h, x:x+w], self.scale_factor,
+                                                 self.min_neighbors, maxSize=(self.overlap, self.overlap))
+        if len(found) == 0:
+            return np.empty((0, 4), dtype=np.int32)
+        found = np.asarray(found, dtype=np.int32)
+        found[:, 0] += x
+        found[:, 1] += y
+        return found
+
+    def _detect_large(self, gray):
+        found = self._cascade().detectMultiScale(gray, self.scale_factor, self.min_neighbors,
+                                                 minSize=(self.overlap, self.overlap))
+        if len(found) == 0:
+            return np.empty((0, 4), dtype=np.int32)
+        return np.asarray(found, dtype=np.int32)
+
+    def detect(self, gray):
+        """Detecta faces no quadro inteiro e retorna as caixas (x, y, w, h)"""
+        height, width = gray.shape[:2]
+        futures = [self._executor.submit(self._detect_tile, gray, tile) for tile in self.tiles(width, height)]
+        if min(width, height) > self.overlap:
+            futures.append(self._executor.submit(self._detect_large, gray))
+        boxes = np.vstack([future.result() for future in futures])
+        return non_max_suppression(boxes)
+
+    def shutdown(self):
+        """Encerra o pool de threads"""
+        self._executor.shutdown(wait=False)
@@ -7,8 +7,13 @@ Responsável pelo cadastro, remoção e gerenciamento de usuários do sistema
 import json
 import os
 import datetime
+import threading
+import copy
+import atexit
 from pathlib import Path
 import shutil
+from user_store import UserStore
+from user_search import UserSearchIndex
 
 class UserManager:
     """Classe responsável pelo gerenciamento de usuários"""
@@ -17,29 +22,153 @@ class UserManager:
         """Inicializa o gerenciador de usuários"""
         self.users_file = "users.json"
         self.faces_dir = Path("faces")
+        self.store = UserStore(self.users_file)
+        # Protege users_data (alterações e cópias para gravação) e as
+        # estatísticas pendentes; a thread de gravação adiada compacta o
+        # cadastro enquanto o reconhecimento altera os usuários
+        self._dirty_lock = threading.RLock()
+        self._compact_lock = threading.Lock()
         self.users_data = self.load_users()
         
-    def load_users(self):
-        """Carrega dados dos usuários do arquivo JSON"""
-        if not os.path.exists(self.users_file):
+        # Compactar diário acumulado em execuções anteriores
+        if self.store.needs_compaction():
+            self.save_users()
+            
+        # Gravação adiada (write-behind) das estatísticas de reconhecimento
+        self.write_behind = False
+        self.flush_interval = 5.0
+        self.flush_events = 50
+        self._dirty_stats = {}
+        self._dirty_events = 0
+        self._flush_requested = threading.Event()
+        self._stop_flusher = threading.Event()
+        self._flush_thread = None
+        self._change_listeners = []
+        self._search_index = None
+        self.add_change_listener(self._update_search_index)
+        
+        storage_settings = self.load_storage_settings()
+        if storage_settings.get('statistics_write_behind', False):
+            self.enable_write_behind(
+                storage_settings.get('statistics_flush_interval_seconds', self.flush_interval),
+                storage_settings.get('statistics_flush_events', self.flush_events)
+            )
+        
+    def add_change_listener(self, callback):
+        """Registra callback(user_ids) chamado quando usuários são alterados"""
+        self._change_listeners.append(callback)
+        
+    def notify_change(self, user_ids):
+        """Notifica os interessados sobre usuários alterados"""
+        for callback in self._change_listeners:
+            try:
+                callback(list(user_ids))
+            except Exception as e:
+                print(f"Erro ao notificar alteração de usuários: {e}")
+                
+    def load_storage_settings(self):
+        """Carrega as configurações de armazenamento do config.json"""
+        try:
+            with open('config.json', 'r', encoding='utf-8') as f:
+                return json.load(f).get('storage_settings', {})
+        except (FileNotFoundError, json.JSONDecodeError):
             return {}
             
+    def enable_write_behind(self, flush_interval=5.0, flush_events=50):
+        """Ativa a gravação adiada das estatísticas de reconhecimento
+        
+        As estatísticas ficam marcadas como pendentes em memória e são
+        gravadas em lote a cada flush_interval segundos ou a cada
+        flush_events reconhecimentos, por uma thread própria.
+        """
+        self.flush_interval = float(flush_interval)
+        self.flush_events = max(1, int(flush_events))
+        self.write_behind = True
+        
+        if self._flush_thread is None or not self._flush_thread.is_alive():
+            self._stop_flusher.clear()
+            self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flush_thread.start()
+            atexit.register(self.close)
+            
+    def _flush_loop(self):
+        """Loop da thread de gravação adiada"""
+        while not self._stop_flusher.is_set():
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            self.flush()
+            
+    def flush(self):
+        """Grava no diário as estatísticas pendentes"""
+        with self._dirty_lock:
+            if not self._dirty_stats:
+                return True
+            pending = self._dirty_stats
+            self._dirty_stats = {}
+            self._dirty_events = 0
+            
+        records = [{'op': 'patch', 'id': user_id, 'fields': fields}
+                   for user_id, fields in pending.items()]
+        if self.save_changes(records):
+            return True
+            
+        # Falhou - devolver para a fila, sem sobrescrever alterações mais novas
+        with self._dirty_lock:
+            for user_id, fields in pending.items():
+                self._dirty_stats[user_id] = {**fields, **self._dirty_stats.get(user_id, {})}
+        return False
+        
+    def close(self):
+        """Encerra a gravação adiada garantindo o flush final"""
+        if self._flush_thread is not None:
+            self._stop_flusher.set()
+            self._flush_requested.set()
+            self._flush_thread.join(timeout=5)
+            self._flush_thread = None
+        self.write_behind = False
+        self.flush()
+        
+    def load_users(self):
+        """Carrega dados dos usuários (snapshot JSON + diário de alterações)"""
         try:
-            with open(self.users_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
+            return self.store.load()
+        except OSError as e:
+            print(f"❌ Erro ao carregar usuários: {str(e)}")
             return {}
             
     def save_users(self):
-        """Salva dados dos usuários no arquivo JSON"""
+        """Salva o cadastro completo de forma atômica e compacta o diário"""
         try:
-            with open(self.users_file, 'w', encoding='utf-8') as f:
-                json.dump(self.users_data, f, indent=4, ensure_ascii=False)
+            # Uma compactação por vez; a marca do diário é tomada junto com a
+            # cópia, então alterações gravadas durante a serialização (ex.:
+            # pela thread de gravação adiada) continuam no diário
+            with self._compact_lock:
+                with self._dirty_lock:
+                    mark = self.store.mark()
+                    users = self.snapshot_users()
+                self.store.compact(users, mark)
             return True
         except Exception as e:
             print(f"❌ Erro ao salvar usuários: {str(e)}")
             return False
             
+    def snapshot_users(self):
+        """Cópia profunda e consistente do cadastro (para serializar fora do lock)"""
+        with self._dirty_lock:
+            return copy.deepcopy(self.users_data)
+            
+    def save_changes(self, records):
+        """Acrescenta alterações ao diário, compactando quando necessário"""
+        try:
+            self.store.append(records)
+        except Exception as e:
+            print(f"❌ Erro ao salvar usuários: {str(e)}")
+            return False
+            
+        if self.store.needs_compaction():
+            self.save_users()
+        return True
+            
     def add_user(self, name, user_id, additional_info=None):
         """Adiciona um novo usuário ao sistema"""
         # Verificar se usuário já existe
@@ -63,15 +192,18 @@ class UserManager:
             user_data.update(additional_info)
             
         # Salvar no dicionário
-        self.users_data[user_id] = user_data
+        with self._dirty_lock:
+            self.users_data[user_id] = user_data
         
         # Salvar no arquivo
-        if self.save_users():
+        if self.save_changes([{'op': 'put', 'id': user_id, 'data': user_data}]):
             print(f"✅ Usuário '{name}' adicionado com sucesso!")
+            self.notify_change([user_id])
             return True
         else:
             # Reverter se falhou ao salvar
-            del self.users_data[user_id]
+            with self._dirty_lock:
+                del self.users_data[user_id]
             return False
             
     def remove_user(self, user_id):
@@ -85,7 +217,9 @@ class UserManager:
             user_data = self.users_data[user_id].copy()
             
             # Remover do dicionário
-            del self.users_data[user_id]
+            with self._dirty_lock:
+                del self.users_data[user_id]
+                self._dirty_stats.pop(user_id, None)
             
             # Remover arquivo de imagem se existir
             image_files = [
@@ -100,13 +234,21 @@ class UserManager:
                     image_file.unlink()
                     print(f"🗑️ Imagem removida: {image_file}")
                     
+            # Remover amostras do usuário (faces/<id>/)
+            samples_dir = self.faces_dir / user_id
+            if samples_dir.is_dir():
+                shutil.rmtree(samples_dir)
+                print(f"🗑️ Amostras removidas: {samples_dir}")
+                    
             # Salvar alterações
-            if self.save_users():
+            if self.save_changes([{'op': 'delete', 'id': user_id}]):
                 print(f"✅ Usuário '{user_data['name']}' removido com sucesso!")
+                self.notify_change([user_id])
                 return True
             else:
                 # Reverter se falhou ao salvar
-                self.users_data[user_id] = user_data
+                with self._dirty_lock:
+                    self.users_data[user_id] = user_data
                 return False
                 
         except Exception as e:
@@ -120,14 +262,20 @@ class UserManager:
             return False
             
         # Atualizar campos fornecidos
+        changes = {}
         for key, value in kwargs.items():
             if key in self.users_data[user_id]:
-                self.users_data[user_id][key] = value
+                changes[key] = value
                 
         # Atualizar timestamp de modificação
-        self.users_data[user_id]['modified_date'] = datetime.datetime.now().isoformat()
+        changes['modified_date'] = datetime.datetime.now().isoformat()
+        with self._dirty_lock:
+            self.users_data[user_id].update(changes)
         
-        return self.save_users()
+        if not self.save_changes([{'op': 'patch', 'id': user_id, 'fields': changes}]):
+            return False
+        self.notify_change([user_id])
+        return True
         
     def get_user(self, user_id):
         """Retorna dados de um usuário específico"""
@@ -149,19 +297,30 @@ class UserManager:
         if user_id not in self.users_data:
             return False
             
-        self.users_data[user_id]['active'] = False
-        self.users_data[user_id]['deactivated_date'] = datetime.datetime.now().isoformat()
-        return self.save_users()
+        changes = {
+            'active': False,
+            'deactivated_date': datetime.datetime.now().isoformat()
+        }
+        with self._dirty_lock:
+            self.users_data[user_id].update(changes)
+        if not self.save_changes([{'op': 'patch', 'id': user_id, 'fields': changes}]):
+            return False
+        self.notify_change([user_id])
+        return True
         
     def activate_user(self, user_id):
         """Reativa um usuário"""
         if user_id not in self.users_data:
             return False
             
-        self.users_data[user_id]['active'] = True
-        if 'deactivated_date' in self.users_data[user_id]:
-            del self.users_data[user_id]['deactivated_date']
-        return self.save_users()
+        with self._dirty_lock:
+            self.users_data[user_id]['active'] = True
+            self.users_data[user_id].pop('deactivated_date', None)
+        if not self.save_changes([{'op': 'patch', 'id': user_id, 'fields': {'active': True},
+                                   'unset': ['deactivated_date']}]):
+            return False
+        self.notify_change([user_id])
+        return True
         
     def update_user_statistics(self, user_id, entry_type):
         """Atualiza estatísticas do usuário após registro de presença"""
@@ -169,15 +328,27 @@ class UserManager:
             return False
             
         # Atualizar última vez visto
-        self.users_data[user_id]['last_seen'] = datetime.datetime.now().isoformat()
+        changes = {'last_seen': datetime.datetime.now().isoformat()}
         
-        # Atualizar contadores
-        if entry_type == "ENTRADA":
-            self.users_data[user_id]['total_entries'] = self.users_data[user_id].get('total_entries', 0) + 1
-        elif entry_type == "SAÍDA":
-            self.users_data[user_id]['total_exits'] = self.users_data[user_id].get('total_exits', 0) + 1
+        # Atualizar contadores (valores absolutos, para o diário ser idempotente)
+        entry_type = entry_type.upper()
+        with self._dirty_lock:
+            if entry_type == "ENTRADA":
+                changes['total_entries'] = self.users_data[user_id].get('total_entries', 0) + 1
+            elif entry_type == "SAÍDA":
+                changes['total_exits'] = self.users_data[user_id].get('total_exits', 0) + 1
+                
+            self.users_data[user_id].update(changes)
             
-        return self.save_users()
+            if self.write_behind:
+                # Apenas marcar como pendente - a gravação ocorre em lote
+                self._dirty_stats.setdefault(user_id, {}).update(changes)
+                self._dirty_events += 1
+                if self._dirty_events >= self.flush_events:
+                    self._flush_requested.set()
+                return True
+                
+        return self.save_changes([{'op': 'patch', 'id': user_id, 'fields': changes}])
         
     def validate_user_data(self, name, user_id):
         """Valida dados do usuário antes do cadastro"""
@@ -209,15 +380,28 @@ class UserManager:
         
     def search_users(self, query):
         """Busca usuários por nome ou ID"""
-        query = query.lower().strip()
-        results = []
+        return [self.users_data[user_id]
+                for user_id in self.search_user_ids(query, fields=('name', 'id'))]
         
-        for user_data in self.users_data.values():
-            if (query in user_data['name'].lower() or 
-                query in user_data['id'].lower()):
-                results.append(user_data)
-                
-        return results
+    def search_user_ids(self, query, fields=None):
+        """Retorna os IDs dos usuários que contêm a consulta (via índice)
+        
+        Sem fields, busca em nome, ID, departamento e cargo (lista do desktop).
+        """
+        if self._search_index is None:
+            self._search_index = UserSearchIndex()
+            self._search_index.build(self.users_data)
+        return self._search_index.search(query, fields)
+        
+    def _update_search_index(self, user_ids):
+        """Mantém o índice de busca sincronizado com o cadastro"""
+        if self._search_index is None:
+            return
+        for user_id in user_ids:
+            if user_id in self.users_data:
+                self._search_index.add(user_id, self.users_data[user_id])
+            else:
+                self._search_index.remove(user_id)
         
     def export_users(self, filepath=None):
         """Exporta dados dos usuários para arquivo"""
@@ -229,7 +413,7 @@ class UserManager:
             Path(filepath).parent.mkdir(exist_ok=True)
             
             with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(self.users_data, f, indent=4, ensure_ascii=False)
+                json.dump(self.snapshot_users(), f, indent=4, ensure_ascii=False)
                 
             print(f"✅ Usuários exportados para: {filepath}")
             return True
@@ -261,16 +445,20 @@ class UserManager:
             # Importar dados
             conflicts = []
             imported_count = 0
+            records = []
             
             for user_id, user_data in imported_data.items():
                 if user_id in self.users_data:
                     conflicts.append(user_id)
                 else:
-                    self.users_data[user_id] = user_data
+                    with self._dirty_lock:
+                        self.users_data[user_id] = user_data
+                    records.append({'op': 'put', 'id': user_id, 'data': user_data})
                     imported_count += 1
                     
             # Salvar dados
-            if self.save_users():
+            if self.save_changes(records):
+                self.notify_change(record['id'] for record in records)
                 print(f"✅ {imported_count} usuários importados com sucesso!")
                 if conflicts:
                     print(f"⚠️ {len(conflicts)} usuários ignorados (IDs já existem): {', '.join(conflicts)}")
@@ -316,18 +504,24 @@ class UserManager:
         removed_count = 0
         
         for image_file in self.faces_dir.iterdir():
-            if image_file.is_file():
-                # Extrair ID do nome do arquivo
-                user_id = image_file.stem
+            # Diretórios internos (ex.: .templates) não são imagens de usuários
+            if image_file.name.startswith('.'):
+                continue
                 
-                # Verificar se usuário existe
-                if user_id not in self.users_data:
-                    try:
+            # Extrair ID do nome do arquivo (ou do diretório de amostras)
+            user_id = image_file.name if image_file.is_dir() else image_file.stem
+            
+            # Verificar se usuário existe
+            if user_id not in self.users_data:
+                try:
+                    if image_file.is_dir():
+                        shutil.rmtree(image_file)
+                    else:
                         image_file.unlink()
-                        print(f"🗑️ Imagem órfã removida: {image_file.name}")
-                        removed_count += 1
-                    except Exception as e:
-                        print(f"❌ Erro ao remover {image_file.name}: {str(e)}")
+                    print(f"🗑️ Imagem órfã removida: {image_file.name}")
+                    removed_count += 1
+                except Exception as e:
+                    print(f"❌ Erro ao remover {image_file.name}: {str(e)}")
                         
         if removed_count > 0:
             print(f"✅ {removed_count} imagem(ns) órfã(s) removida(s)")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Índice de Busca de Usuários
+Busca por substring em nome, ID, departamento e cargo sem varrer o cadastro
+"""
+
+
+class UserSearchIndex:
+    """Índice de trigramas para busca de usuários por substring
+
+    Consultas com 3 ou mais caracteres usam a interseção das listas de
+    trigramas e conferem o resultado nos campos já em minúsculas. Consultas
+    mais curtas casam com boa parte do cadastro de qualquer forma, então
+    varrem apenas os textos pré-processados.
+    """
+
+    FIELDS = ('name', 'id', 'department', 'position')
+    NGRAM = 3
+
+    def __init__(self):
+        """Inicializa o índice vazio"""
+        self._postings = {}     # trigrama -> conjunto de IDs
+        self._fields = {}       # ID -> campos em minúsculas
+        self._order = {}        # ID -> posição de inserção (ordem estável)
+        self._next_order = 0
+
+    def __len__(self):
+        return len(self._fields)
+
+    def build(self, users_data):
+        """Reconstrói o índice a partir do cadastro completo"""
+        self._postings = {}
+        self._fields = {}
+        self._order = {}
+        self._next_order = 0
+        for user_id, user_data in users_data.items():
+            self.add(user_id, user_data)
+
+    def add(self, user_id, user_data):
+        """Indexa (ou reindexa) um usuário"""
+        if user_id in self._fields:
+            self._unlink(user_id)
+        else:
+            self._order[user_id] = self._next_order
+            self._next_order += 1
+
+        fields = tuple(str(user_data.get(field) or '').lower() for field in self.FIELDS)
+        self._fields[user_id] = fields
+        for gram in self._grams(fields):
+            self._postings.setdefault(gram, set()).add(user_id)
+
+    def remove(self, user_id):
+        """Remove um usuário do índice"""
+        if user_id in self._fields:
+            self._unlink(user_id)
+            del self._fields[user_id]
+            del self._order[user_id]
+
+    def search(self, query, fields=None):
+        """Retorna os IDs dos usuários cujos campos contêm a consulta
+
+        fields restringe a busca a alguns dos FIELDS (padrão: todos).
+        """
+        query = query.lower().strip()
+        positions = [self.FIELDS.index(field) for field in (fields or self.FIELDS)]
+
+        def matches(user_id):
+            values = self._fields[user_id]
+            return any(query in values[position] for position in positions)
+
+        if not query:
+            candidates = self._fields.keys()
+        elif len(query) < self.NGRAM:
+            candidates = [user_id for user_id in self._fields if matches(user_id)]
+        else:
+            postings = []
+            for gram in {query[i:i + self.NGRAM] for i in range(len(query) - self.NGRAM + 1)}:
+                posting = self._postings.get(gram)
+                if not posting:
+                    return []
+                postings.append(posting)
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            # Trigramas em comum não garantem a substring completa
+            candidates = [user_id for user_id in candidates if matches(user_id)]
+
+        return sorted(candidates, key=self._order.__getitem__)
+
+    def _unlink(self, user_id):
+        """Remove o usuário das listas de trigramas"""
+        for gram in self._grams(self._fields[user_id]):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(user_id)
+                if not posting:
+                    del self._postings[gram]
+
+    def _grams(self, fields):
+        """Trigramas distintos dos campos (sem atravessar campos)"""
+        grams = set()
+        for field in fields:
+            for i in range(len(field) - self.NGRAM + 1):
+                grams.add(field[i:i + self.NGRAM])
+        return grams
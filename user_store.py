@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Armazenamento de Usuários
+Persiste o cadastro em um snapshot JSON mais um diário (journal) de alterações
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+
+
+# IDs viram nomes de diretório em faces/<id>/: letras, dígitos, "_" e "-"
+USER_ID_PATTERN = re.compile(r'[\w-]{1,64}')
+
+
+def is_valid_user_id(user_id):
+    """True se user_id pode ser usado como ID (e nome de diretório) de usuário"""
+    return isinstance(user_id, str) and USER_ID_PATTERN.fullmatch(user_id) is not None
+
+
+class UserStore:
+    """Armazenamento de usuários baseado em snapshot + diário de alterações
+
+    Cada alteração é acrescentada ao diário como uma linha JSON, de modo que
+    atualizar um único usuário custa uma escrita pequena. Periodicamente o
+    diário é compactado: o cadastro completo é gravado de forma atômica
+    (arquivo temporário + rename) e o diário é descartado.
+
+    Formato das linhas do diário:
+        {"op": "put", "id": "...", "data": {...}}
+        {"op": "patch", "id": "...", "fields": {...}, "unset": [...]}
+        {"op": "delete", "id": "..."}
+    """
+
+    DEFAULT_COMPACT_THRESHOLD = 500  # Registros no diário antes de compactar
+
+    def __init__(self, users_file="users.json", journal_file=None,
+                 compact_threshold=DEFAULT_COMPACT_THRESHOLD):
+        """Inicializa o armazenamento"""
+        self.users_file = Path(users_file)
+        self.journal_file = Path(journal_file) if journal_file else self.users_file.with_suffix('.journal')
+        self.compact_threshold = compact_threshold
+        self.journal_entries = 0
+        self._torn_tail = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Carrega o snapshot e reaplica o diário de alterações"""
+        users = {}
+        if self.users_file.exists():
+            try:
+                with open(self.users_file, 'r', encoding='utf-8') as f:
+                    users = json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                users = {}
+
+        entries = 0
+        torn_tail = False
+        if self.journal_file.exists():
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    torn_tail = not line.endswith('\n')
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Linha incompleta (queda durante a escrita) - ignorar
+                        continue
+                    self.apply_record(users, record)
+                    entries += 1
+
+        self.journal_entries = entries
+        self._torn_tail = torn_tail
+        return users
+
+    @staticmethod
+    def apply_record(users, record):
+        """Aplica um registro do diário ao dicionário de usuários"""
+        op = record.get('op')
+        user_id = record.get('id')
+
+        if op == 'put':
+            users[user_id] = record['data']
+        elif op == 'patch' and user_id in users:
+            users[user_id].update(record.get('fields', {}))
+            for key in record.get('unset', []):
+                users[user_id].pop(key, None)
+        elif op == 'delete':
+            users.pop(user_id, None)
+
+    def append(self, records):
+        """Acrescenta registros ao diário com uma única escrita sincronizada"""
+        if not records:
+            return
+
+        payload = ''.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+                          for record in records)
+
+        with self._lock:
+            if self._torn_tail:
+                # Isolar a linha incompleta deixada por uma queda anterior
+                payload = '\n' + payload
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            self._torn_tail = False
+            self.journal_entries += len(records)
+
+    def put(self, user_id, data):
+        """Registra o cadastro completo de um usuário"""
+        self.append([{'op': 'put', 'id': user_id, 'data': data}])
+
+    def patch(self, user_id, fields, unset=None):
+        """Registra a alteração de alguns campos de um usuário"""
+        record = {'op': 'patch', 'id': user_id, 'fields': fields}
+        if unset:
+            record['unset'] = list(unset)
+        self.append([record])
+
+    def delete(self, user_id):
+        """Registra a remoção de um usuário"""
+        self.append([{'op': 'delete', 'id': user_id}])
+
+    def needs_compaction(self):
+        """Indica se o diário cresceu o bastante para ser compactado"""
+        return self.journal_entries >= self.compact_threshold
+
+    def mark(self):
+        """Posição atual do diário, a ser obtida antes de copiar o cadastro
+
+        compact(users, mark) mantém os registros acrescentados depois dela,
+        que a cópia pode não ter visto.
+        """
+        with self._lock:
+            try:
+                size = self.journal_file.stat().st_size
+            except FileNotFoundError:
+                size = 0
+            return size, self.journal_entries
+
+    def compact(self, users, mark=None):
+        """Grava o snapshot completo de forma atômica e descarta o diário
+
+        Com mark, os registros acrescentados depois da marca continuam no
+        diário (reescrito de forma atômica) em vez de serem descartados.
+        """
+        with self._lock:
+            tail = b''
+            if mark is not None and self.journal_file.exists():
+                with open(self.journal_file, 'rb') as f:
+                    f.seek(mark[0])
+                    tail = f.read()
+
+            write_json_atomic(self.users_file, users)
+            # Se houver queda aqui, reaplicar o diário sobre o novo snapshot
+            # produz o mesmo resultado (os registros gravam valores absolutos)
+            if tail:
+                write_bytes_atomic(self.journal_file, tail)
+                self.journal_entries = max(0, self.journal_entries - mark[1])
+            else:
+                if self.journal_file.exists():
+                    self.journal_file.unlink()
+                self.journal_entries = 0
+            # A linha incompleta, se havia, ficou antes da marca
+            self._torn_tail = False
+
+
+def write_json_atomic(filepath, data):
+    """Grava JSON em arquivo temporário e substitui o destino atomicamente"""
+    write_bytes_atomic(filepath, json.dumps(data, indent=4, ensure_ascii=False).encode('utf-8'))
+
+
+def write_bytes_atomic(filepath, payload):
+    """Grava bytes em arquivo temporário e substitui o destino atomicamente"""
+    filepath = Path(filepath)
+    fd, tmp_path = tempfile.mkstemp(dir=str(filepath.parent.resolve()),
+                                    prefix=f".{filepath.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
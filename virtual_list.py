@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+DETFACE - Lista Virtual para Tkinter
+Treeview que materializa apenas as linhas visíveis de listas muito grandes
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTreeview:
+    """Adaptador de lista virtual sobre um ttk.Treeview
+
+    Os dados ficam em memória como pares (chave, valores) e apenas a janela
+    visível (mais uma pequena margem) existe como itens do Treeview. A
+    rolagem reaproveita esses itens trocando seus valores, e atualizações
+    nos dados são aplicadas como diferenças: só as linhas visíveis que
+    mudaram tocam no widget.
+
+    Métodos não definidos aqui (heading, column, item, selection, bind...)
+    são repassados ao Treeview interno.
+    """
+
+    DEFAULT_ROW_HEIGHT = 20
+
+    def __init__(self, parent, columns, height=15, margin=5, **kwargs):
+        """Cria o Treeview e a barra de rolagem controlada pelo adaptador"""
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings",
+                                 height=height, selectmode="browse", **kwargs)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self._on_scrollbar)
+
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.visible_rows = height
+        self.margin = margin
+
+        self._keys = []          # Ordem das linhas
+        self._rows = {}          # chave -> valores
+        self._positions = {}     # chave -> posição em _keys
+        self._offset = 0         # Primeira linha visível
+        self._pool = []          # Itens do Treeview reaproveitados
+        self._pool_state = {}    # item -> (chave, valores) exibidos
+        self._attached = set()
+        self._selected_key = None
+        self._rendering = False
+
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        self.tree.bind("<Up>", lambda event: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda event: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda event: self._move_selection(-self.visible_rows))
+        self.tree.bind("<Next>", lambda event: self._move_selection(self.visible_rows))
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+
+    def __getattr__(self, name):
+        if name == "tree":
+            raise AttributeError(name)
+        return getattr(self.tree, name)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def pack(self, **kwargs):
+        """Posiciona o adaptador com pack"""
+        self.frame.pack(**kwargs)
+
+    def grid(self, **kwargs):
+        """Posiciona o adaptador com grid"""
+        self.frame.grid(**kwargs)
+
+    # ------------------------------------------------------------------
+    # Dados
+    # ------------------------------------------------------------------
+
+    def set_rows(self, rows):
+        """Substitui o conteúdo da lista aplicando apenas as diferenças
+
+        rows é uma sequência de (chave, valores). Retorna a quantidade de
+        linhas (inseridas, atualizadas, removidas).
+        """
+        new_keys = []
+        new_rows = {}
+        for key, values in rows:
+            new_keys.append(key)
+            new_rows[key] = tuple(values)
+
+        inserted = sum(1 for key in new_keys if key not in self._rows)
+        updated = sum(1 for key in new_keys
+                      if key in self._rows and self._rows[key] != new_rows[key])
+        removed = sum(1 for key in self._keys if key not in new_rows)
+
+        self._keys = new_keys
+        self._rows = new_rows
+        self._positions = {key: pos for pos, key in enumerate(new_keys)}
+        if self._selected_key not in new_rows:
+            self._selected_key = None
+
+        self._render()
+        return inserted, updated, removed
+
+    def upsert(self, key, values, position=None):
+        """Insere ou atualiza uma linha"""
+        values = tuple(values)
+        if key in self._rows:
+            self._rows[key] = values
+        else:
+            self._rows[key] = values
+            if position is None or position >= len(self._keys):
+                self._keys.append(key)
+                self._positions[key] = len(self._keys) - 1
+            else:
+                self._keys.insert(position, key)
+                self._positions = {k: pos for pos, k in enumerate(self._keys)}
+        self._render()
+
+    def delete_row(self, key):
+        """Remove uma linha"""
+        if key not in self._rows:
+            return
+        del self._rows[key]
+        self._keys.pop(self._positions[key])
+        self._positions = {k: pos for pos, k in enumerate(self._keys)}
+        if self._selected_key == key:
+            self._selected_key = None
+        self._render()
+
+    def clear(self):
+        """Remove todas as linhas"""
+        self.set_rows([])
+
+    def selected_key(self):
+        """Retorna a chave da linha selecionada (ou None)"""
+        return self._selected_key
+
+    # ------------------------------------------------------------------
+    # Rolagem e renderização
+    # ------------------------------------------------------------------
+
+    def scroll(self, delta):
+        """Rola a janela visível em delta linhas"""
+        self._set_offset(self._offset + delta)
+        return "break"
+
+    def see(self, key):
+        """Rola a lista para exibir a linha da chave informada"""
+        position = self._positions.get(key)
+        if position is None:
+            return
+        if position < self._offset:
+            self._set_offset(position)
+        elif position >= self._offset + self.visible_rows:
+            self._set_offset(position - self.visible_rows + 1)
+
+    def _set_offset(self, offset):
+        """Ajusta a primeira linha visível e redesenha"""
+        max_offset = max(0, len(self._keys) - self.visible_rows)
+        offset = max(0, min(int(offset), max_offset))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    def _render(self):
+        """Sincroniza os itens do Treeview com a janela visível"""
+        self._offset = max(0, min(self._offset, max(0, len(self._keys) - self.visible_rows)))
+
+        pool_size = self.visible_rows + self.margin
+        while len(self._pool) < pool_size:
+            item = self.tree.insert("", tk.END, values=())
+            self._pool.append(item)
+            self._attached.add(item)
+
+        self._rendering = True
+        try:
+            selected_item = None
+            for index, item in enumerate(self._pool):
+                position = self._offset + index
+                if index < pool_size and position < len(self._keys):
+                    key = self._keys[position]
+                    values = self._rows[key]
+                    if self._pool_state.get(item) != (key, values):
+                        self.tree.item(item, values=values)
+                        self._pool_state[item] = (key, values)
+                    if item not in self._attached:
+                        self.tree.move(item, "", index)
+                        self._attached.add(item)
+                    if key == self._selected_key:
+                        selected_item = item
+                elif item in self._attached:
+                    self.tree.detach(item)
+                    self._attached.discard(item)
+
+            if selected_item is not None:
+                if self.tree.selection() != (selected_item,):
+                    self.tree.selection_set(selected_item)
+                self.tree.focus(selected_item)
+            elif self.tree.selection():
+                self.tree.selection_remove(*self.tree.selection())
+        finally:
+            self._rendering = False
+
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        """Atualiza a posição da barra de rolagem"""
+        total = len(self._keys)
+        if total <= self.visible_rows:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self._offset / total, (self._offset + self.visible_rows) / total)
+
+    def _on_scrollbar(self, *args):
+        """Trata comandos da barra de rolagem"""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self._set_offset(float(args[1]) * len(self._keys))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self.visible_rows
+            self._set_offset(self._offset + amount)
+
+    def _on_mousewheel(self, event):
+        """Rolagem pelo mouse (Windows/macOS)"""
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_configure(self, event):
+        """Recalcula quantas linhas cabem quando o widget muda de tamanho"""
+        style = ttk.Style()
+        row_height = style.lookup("Treeview", "rowheight")
+        try:
+            row_height = int(row_height)
+        except (TypeError, ValueError):
+            row_height = self.DEFAULT_ROW_HEIGHT
+        # Descontar o cabeçalho (aproximadamente uma linha)
+        visible = max(1, event.height // row_height - 1)
+        if visible != self.visible_rows:
+            self.visible_rows = visible
+            self._render()
+
+    def _on_select(self, event):
+        """Guarda a chave selecionada para manter a seleção durante a rolagem"""
+        if self._rendering:
+            return
+        selection = self.tree.selection()
+        if selection and selection[0] in self._pool_state:
+            self._selected_key = self._pool_state[selection[0]][0]
+
+    def _move_selection(self, delta):
+        """Move a seleção pelo teclado rolando a janela quando necessário"""
+        if not self._keys:
+            return "break"
+        position = self._positions.get(self._selected_key, self._offset - 1 if delta > 0 else self._offset)
+        position = max(0, min(position + delta, len(self._keys) - 1))
+        self._selected_key = self._keys[position]
+        self.see(self._selected_key)
+        self._render()
+        self.tree.event_generate("<<TreeviewSelect>>")
+        return "break"
@@ -10,36 +10,52 @@ import base64
 import numpy as np
 import threading
 import time
+import os
 import json
 from face_detector import FaceDetector
+from face_engines import configure_opencv_threads
 from user_manager import UserManager
+from user_store import is_valid_user_id
+from frame_sources import CameraSource, create_frame_source
+from camera_discovery import CameraDiscovery
+import startup_profile
 
 app = Flask(__name__)
 
 class WebCamera:
-    def __init__(self):
-        self.face_detector = FaceDetector()
+    def __init__(self, source_spec=None):
+        self.face_detector = FaceDetector(load_gallery=False)
         self.user_manager = UserManager()
+        self.face_detector.attach_user_manager(self.user_manager)
+        # Galeria em segundo plano: o servidor responde antes de ela terminar
+        self.face_detector.start_gallery_loading()
+        # Fonte de quadros (DETFACE_SOURCE ou camera_settings.frame_source); None = câmera
+        self.source_spec = source_spec or self.face_detector.frame_source_spec
         self.camera = None
         self.is_capturing = False
         self.frame = None
         
     def init_camera(self):
-        """Inicializa a câmera"""
-        # Tentar diferentes índices de câmera
-        for i in range(3):
+        """Inicializa a fonte de quadros (câmera: descoberta paralela com cache)"""
+        if self.source_spec:
             try:
-                cap = cv2.VideoCapture(i)
-                if cap.isOpened():
-                    ret, frame = cap.read()
-                    if ret:
-                        self.camera = cap
-                        print(f"Câmera inicializada no índice {i}")
-                        return True
-                    cap.release()
-            except:
-                continue
-        return False
+                cap = create_frame_source(self.source_spec)
+            except (ValueError, OSError) as e:
+                print(f"❌ Erro ao abrir fonte de quadros '{self.source_spec}': {e}")
+                return False
+        else:
+            info = CameraDiscovery.from_config().discover()
+            if info is None:
+                return False
+            cap = CameraSource(info)
+        
+        if cap is None or not cap.isOpened():
+            if cap is not None:
+                cap.release()
+            return False
+        self.camera = cap
+        print(f"Fonte inicializada: {cap.describe()}")
+        return True
     
     def start_capture(self):
         """Inicia captura de vídeo"""
@@ -57,6 +73,8 @@ class WebCamera:
             ret, frame = self.camera.read()
             if ret:
                 self.frame = frame
+            elif not isinstance(self.camera, CameraSource):
+                break  # Fim do vídeo, das imagens ou da sessão gravada
             time.sleep(0.1)
     
     def stop_capture(self):
@@ -86,7 +104,7 @@ class WebCamera:
             print(f"Erro ao processar frame: {e}")
             return None
 
-web_camera = WebCamera()
+web_camera = WebCamera(os.environ.get('DETFACE_SOURCE'))
 
 @app.route('/')
 def index():
@@ -95,27 +113,52 @@ def index():
 
 @app.route('/api/capture_frame', methods=['POST'])
 def capture_frame():
-    """Captura frame para cadastro"""
+    """Captura frame para cadastro
+    
+    Para um ID já cadastrado a imagem só vira nova amostra do rosto se o
+    pedido trouxer add_sample=true (senão responde 409, como a confirmação
+    da aplicação desktop).
+    """
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         frame_data = data.get('frame')
         name = data.get('name')
         user_id = data.get('user_id')
         
-        if not frame_data or not name:
-            return jsonify({'success': False, 'error': 'Dados incompletos'})
+        if not frame_data or not name or not user_id:
+            return jsonify({'success': False, 'error': 'Dados incompletos'}), 400
+        if not is_valid_user_id(user_id):
+            return jsonify({'success': False,
+                            'error': 'ID inválido: use letras, números, _ ou - (até 64)'}), 400
+        
+        existing_user = web_camera.user_manager.get_user(user_id)
+        if existing_user is not None and not data.get('add_sample'):
+            return jsonify({'success': False, 'exists': True,
+                            'error': f"Usuário com ID '{user_id}' já existe"}), 409
         
         frame = web_camera.process_frame_data(frame_data)
         if frame is None:
-            return jsonify({'success': False, 'error': 'Erro ao processar imagem'})
+            return jsonify({'success': False, 'error': 'Erro ao processar imagem'}), 400
         
-        # Salvar imagem
-        filename = f"faces/{user_id}.jpg"
+        # Salvar e validar a imagem como na aplicação desktop
+        detector = web_camera.face_detector
+        filename = detector.new_sample_path(user_id)
         cv2.imwrite(filename, frame)
+        if not detector.validate_captured_image(filename):
+            os.remove(filename)
+            return jsonify({'success': False, 'error': 'Nenhuma face válida detectada na imagem!'}), 400
+        
+        # Usuário já cadastrado: a imagem vira uma nova amostra do rosto
+        if existing_user is not None:
+            detector.start_gallery_loading()
+            return jsonify({'success': True,
+                            'message': f"Nova amostra adicionada para {existing_user['name']}!"})
         
         # Cadastrar usuário
-        web_camera.user_manager.add_user(name, user_id)
-        web_camera.face_detector.load_known_faces()
+        if not web_camera.user_manager.add_user(name, user_id):
+            os.remove(filename)
+            return jsonify({'success': False, 'error': 'Erro ao cadastrar usuário'}), 500
+        detector.start_gallery_loading()
         
         return jsonify({'success': True, 'message': f'Usuário {name} cadastrado com sucesso!'})
         
@@ -132,71 +175,51 @@ def recognize_frame():
         if not frame_data:
             return jsonify({'success': False, 'error': 'Frame não fornecido'})
         
+        # Galeria ainda carregando: o navegador tenta de novo e liga sozinho
+        detector = web_camera.face_detector
+        if not detector.gallery_ready.is_set():
+            return jsonify({'success': False, 'loading': True,
+                            'error': detector.gallery_status_text(),
+                            'gallery': detector.gallery_status()})
+        
         frame = web_camera.process_frame_data(frame_data)
         if frame is None:
             return jsonify({'success': False, 'error': 'Erro ao processar imagem'})
         
-        # Detectar faces
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = web_camera.face_detector.face_cascade.detectMultiScale(gray, 1.1, 4)
-        
+        # Detectar e identificar todas as faces do frame contra uma mesma galeria
         results = []
-        for (x, y, w, h) in faces:
-            face_roi = gray[y:y+h, x:x+w]
-            features = web_camera.face_detector.extract_face_features(face_roi)
-            
-            if features is not None and len(web_camera.face_detector.known_face_features) > 0:
-                from sklearn.metrics.pairwise import cosine_similarity
-                similarities = []
-                for known_features in web_camera.face_detector.known_face_features:
-                    similarity = cosine_similarity([features], [known_features])[0][0]
-                    similarities.append(similarity)
-                
-                best_match_idx = np.argmax(similarities)
-                best_similarity = similarities[best_match_idx]
-                
-                if best_similarity > web_camera.face_detector.recognition_threshold:
-                    name = web_camera.face_detector.known_face_names[best_match_idx]
-                    user_id = web_camera.face_detector.known_face_ids[best_match_idx]
-                    
-                    # Registrar presença
-                    web_camera.face_detector.register_attendance(user_id, name)
-                    
-                    results.append({
-                        'x': int(x),
-                        'y': int(y),
-                        'width': int(w),
-                        'height': int(h),
-                        'name': name,
-                        'confidence': float(best_similarity),
-                        'recognized': True
-                    })
-                else:
-                    results.append({
-                        'x': int(x),
-                        'y': int(y),
-                        'width': int(w),
-                        'height': int(h),
-                        'name': 'Desconhecido',
-                        'confidence': float(best_similarity),
-                        'recognized': False
-                    })
+        for face in detector.recognize_faces(frame):
+            x, y, w, h = face['box']
+            if face['similarity'] is None:
+                name, confidence, recognized = 'Sem dados', 0.0, False
+            elif face['user_id'] is not None:
+                name, confidence, recognized = face['name'], face['similarity'], True
+                # Registrar presença
+                detector.register_attendance(face['user_id'], name)
             else:
-                results.append({
-                    'x': int(x),
-                    'y': int(y),
-                    'width': int(w),
-                    'height': int(h),
-                    'name': 'Sem dados',
-                    'confidence': 0.0,
-                    'recognized': False
-                })
+                name, confidence, recognized = 'Desconhecido', face['similarity'], False
+            results.append({
+                'x': x,
+                'y': y,
+                'width': w,
+                'height': h,
+                'name': name,
+                'confidence': float(confidence),
+                'recognized': recognized
+            })
         
         return jsonify({'success': True, 'faces': results})
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/gallery_status')
+def gallery_status():
+    """Progresso do carregamento da galeria"""
+    detector = web_camera.face_detector
+    return jsonify({'success': True, 'message': detector.gallery_status_text(),
+                    **detector.gallery_status()})
+
 @app.route('/api/users')
 def get_users():
     """Lista usuários cadastrados"""
@@ -207,4 +230,10 @@ def get_users():
         return jsonify({'success': False, 'error': str(e)})
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    startup_profile.run_if_requested("web_camera")
+    configure_opencv_threads()
+    try:
+        app.run(host='0.0.0.0', port=5000, debug=True)
+    finally:
+        web_camera.stop_capture()
+        web_camera.face_detector.close()
\ No newline at end of file
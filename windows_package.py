@@ -25,6 +25,22 @@ def create_windows_package():
         'face_detector.py', 
         'user_manager.py',
         'report_generator.py',
+        'user_store.py',
+        'user_search.py',
+        'virtual_list.py',
+        'preview_renderer.py',
+        'face_descriptors.py',
+        'template_cache.py',
+        'face_engines.py',
+        'gallery_index.py',
+        'camera_discovery.py',
+        'frame_sources.py',
+        'session_recorder.py',
+        'motion_gate.py',
+        'frame_scheduler.py',
+        'tiled_detection.py',
+        'buffer_pool.py',
+        'startup_profile.py',
         'web_camera.py',
         'main.py'
     ]
@@ -48,7 +64,7 @@ def create_windows_package():
                 f.write('')
     
     # Copiar arquivos de configuração
-    config_files = ['config.json', 'users.json', 'registro_presenca.csv']
+    config_files = ['config.json', 'users.json', 'users.journal', 'registro_presenca.csv']
     for config_file in config_files:
         if os.path.exists(config_file):
             shutil.copy2(config_file, package_name)